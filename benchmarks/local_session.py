@@ -0,0 +1,709 @@
+"""Local stand-in for a Snowpark session, backed by SQLite.
+
+Emulates the parts of Snowflake the Database Explorer relies on: SHOW DATABASES, SHOW TABLES, SHOW PRIMARY KEYS,
+search optimization (DESCRIBE and ALTER TABLE ... ADD SEARCH OPTIMIZATION ON FULL_TEXT),
+CREATE TABLE IF NOT EXISTS, INSERT, DELETE and MERGE on three-part names, BEGIN/COMMIT/ROLLBACK,
+CREATE TEMPORARY TABLE, HASH(*), TO_JSON, TO_VARCHAR, LEFT, CONTAINS, COUNT_IF, ARRAY_AGG, OBJECT_AGG,
+the INFORMATION_SCHEMA SCHEMATA/TABLES/COLUMNS views, SNOWFLAKE.ACCOUNT_USAGE TABLES/COLUMNS, three-part table names,
+ILIKE ANY, SEARCH() with the default analyzer's any-token matching, OBJECT_CONSTRUCT_KEEP_NULL(*),
+SAMPLE SYSTEM (p) SEED (s), bind parameters (?), result schemas, async jobs and query history. An
+optional per-query latency stands in for the warehouse round trip, and an optional compile latency is
+charged once per distinct statement text, standing in for compiling a plan that later runs of the same
+text reuse.
+"""
+import hashlib
+import json
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from data_access import SEARCHABLE_DATA_TYPES
+
+IDENTIFIER = r'(?:"(?:[^"]|"")+"|\w+)'
+ACCOUNT_USAGE_VIEW = re.compile(r'\bSNOWFLAKE\.ACCOUNT_USAGE\.(TABLES|COLUMNS)\b', re.IGNORECASE)
+ILIKE_ANY = re.compile(
+    r"(\S+)\s+ILIKE\s+ANY\s*\(((?:\s*'(?:[^']|'')*'\s*,?)+)\)(?:\s*ESCAPE\s*'([^']+)')?", re.IGNORECASE
+)
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+INFORMATION_SCHEMA_VIEW = re.compile(rf'({IDENTIFIER})\.INFORMATION_SCHEMA\.(\w+)', re.IGNORECASE)
+DATA_TABLE = re.compile(
+    rf'\bFROM\s+({IDENTIFIER})\.({IDENTIFIER})\.({IDENTIFIER})'
+    r'(?:\s+SAMPLE\s+SYSTEM\s*\((\d+)\)\s*SEED\s*\((\d+)\))?',
+    re.IGNORECASE
+)
+SEARCH_CALL = re.compile(r"\bSEARCH\(\s*\(([^()]*)\)\s*,\s*('(?:[^']|'')*'|\?\d*)\s*\)", re.IGNORECASE)
+PLACEHOLDER = re.compile(r"('(?:[^']|'')*')|\?")
+HASH_ALL = re.compile(r'\bHASH\(\s*\*\s*\)', re.IGNORECASE)
+INSERT_INTO = re.compile(rf'\bINSERT\s+INTO\s+({IDENTIFIER})\.({IDENTIFIER})\.({IDENTIFIER})', re.IGNORECASE)
+CREATE_TABLE = re.compile(
+    rf'\s*CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+({IDENTIFIER})\.({IDENTIFIER})\.({IDENTIFIER})\s*\((.*?)\)'
+    r'(?:\s*CLUSTER\s+BY\s*\(([^()]*)\))?\s*$',
+    re.IGNORECASE | re.DOTALL
+)
+HASHED_ROWS_CTE = re.compile(r'(\b\w+\s+AS\s+)(\(\s*SELECT\s+HASH\(\s*\*\s*\))', re.IGNORECASE)
+OBJECT_CONSTRUCT_ALL = re.compile(r'\bOBJECT_CONSTRUCT_KEEP_NULL\(\s*\*\s*\)', re.IGNORECASE)
+UNION_ALL = re.compile(r'\bUNION\s+ALL\b', re.IGNORECASE)
+SHOW_PRIMARY_KEYS = re.compile(rf'\s*SHOW\s+PRIMARY\s+KEYS\s+IN\s+DATABASE\s+({IDENTIFIER})\s*$', re.IGNORECASE)
+LEFT_CALL = re.compile(r'\bLEFT\(', re.IGNORECASE)
+SHOW_TABLES = re.compile(rf'\s*SHOW\s+TABLES\s+IN\s+SCHEMA\s+({IDENTIFIER})\.({IDENTIFIER})\s*$', re.IGNORECASE)
+DESCRIBE_SEARCH_OPTIMIZATION = re.compile(
+    rf'\s*DESC(?:RIBE)?\s+SEARCH\s+OPTIMIZATION\s+ON\s+({IDENTIFIER})\.({IDENTIFIER})\.({IDENTIFIER})\s*$',
+    re.IGNORECASE
+)
+CREATE_TEMPORARY_TABLE = re.compile(rf'(\s*CREATE\s+)TEMPORARY\s+(TABLE\s+{IDENTIFIER}\s*\()', re.IGNORECASE)
+MERGE_INTO = re.compile(
+    rf'\s*MERGE\s+INTO\s+({IDENTIFIER})\.({IDENTIFIER})\.({IDENTIFIER})\s+(?:AS\s+)?({IDENTIFIER})\s+'
+    rf'USING\s+\((.*)\)\s*(?:AS\s+)?({IDENTIFIER})\s+ON\s+(.*?)\s+'
+    r'WHEN\s+MATCHED(?:\s+AND\s+(.*?))?\s+THEN\s+DELETE\s+'
+    r'WHEN\s+NOT\s+MATCHED(?:\s+AND\s+(.*?))?\s+THEN\s+INSERT\s*\(([^()]*)\)\s*VALUES\s*\((.*)\)\s*$',
+    re.IGNORECASE | re.DOTALL
+)
+ADD_SEARCH_OPTIMIZATION = re.compile(
+    rf'\s*ALTER\s+TABLE\s+({IDENTIFIER})\.({IDENTIFIER})\.({IDENTIFIER})\s+ADD\s+SEARCH\s+OPTIMIZATION'
+    r'\s+ON\s+FULL_TEXT\s*\((.*)\)\s*$',
+    re.IGNORECASE | re.DOTALL
+)
+
+# INFORMATION_SCHEMA views and the column holding their database name
+CATALOG_VIEWS = {'SCHEMATA': 'CATALOG_NAME', 'TABLES': 'TABLE_CATALOG', 'COLUMNS': 'TABLE_CATALOG'}
+MAX_FUNCTION_ARGS = 120  # SQLite rejects calls with more than 127 arguments
+MAX_COMPILED_STATEMENTS = 10_000
+FETCH_BATCH_ROWS = 10_000
+TOKEN = re.compile(r'\w+')
+
+
+def unquote(identifier):
+    """Identifier text without surrounding double quotes"""
+    if identifier.startswith('"'):
+        return identifier[1:-1].replace('""', '"')
+    return identifier
+
+
+def quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+@lru_cache(maxsize=256)
+def search_tokens(term):
+    return frozenset(TOKEN.findall(term.lower()))
+
+
+def search_udf(term, *values):
+    """SEARCH() with the default analyzer: true when any token of term appears as a token of any value"""
+    tokens = search_tokens(term)
+    for value in values:
+        if value is not None and not tokens.isdisjoint(TOKEN.findall(str(value).lower())):
+            return 1
+    return 0
+
+
+def merge_objects_udf(*objects):
+    merged = {}
+    for obj in objects:
+        merged.update(json.loads(obj))
+    return json.dumps(merged)
+
+
+def hash_udf(*values):
+    """Signed 64-bit hash of a row's values, standing in for HASH(*)"""
+    digest = hashlib.blake2b(json.dumps(values, default=str).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def to_json_udf(value):
+    return value if value is None or isinstance(value, str) else json.dumps(value)
+
+
+class CountIf:
+    """COUNT_IF(condition) aggregate"""
+
+    def __init__(self):
+        self.count = 0
+
+    def step(self, condition):
+        self.count += bool(condition)
+
+    def finalize(self):
+        return self.count
+
+
+def semi_structured(value):
+    """Value as it would sit in an ARRAY or OBJECT: JSON object text (OBJECT_CONSTRUCT output) is decoded"""
+    if isinstance(value, str) and value.startswith('{'):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def contains_udf(value, substring):
+    return None if value is None or substring is None else substring in value
+
+
+def to_varchar_udf(value):
+    return value if value is None else str(value)
+
+
+class ArrayAgg:
+    """ARRAY_AGG(value) aggregate, returning the array as JSON text like Snowpark does"""
+
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        if value is not None:
+            self.values.append(semi_structured(value))
+
+    def finalize(self):
+        return json.dumps(self.values)
+
+
+class ObjectAgg:
+    """OBJECT_AGG(key, value) aggregate, returning the object as JSON text"""
+
+    def __init__(self):
+        self.items = {}
+
+    def step(self, key, value):
+        if key is not None and value is not None:
+            self.items[key] = semi_structured(value)
+
+    def finalize(self):
+        return json.dumps(self.items)
+
+
+def snowflake_type(dtype):
+    """Snowflake DATA_TYPE reported for a pandas column"""
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'BOOLEAN'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'NUMBER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'FLOAT'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP_NTZ'
+    return 'TEXT'
+
+
+class LocalDataType:
+    """Base of the Snowpark data type stand-ins LocalDataFrame.schema reports, which share Snowpark's class names"""
+
+
+class StringType(LocalDataType):
+    pass
+
+
+class LongType(LocalDataType):
+    pass
+
+
+class DoubleType(LocalDataType):
+    pass
+
+
+# Snowpark data type reported for the Python type of a SQLite value
+LOCAL_DATA_TYPES = {int: LongType, float: DoubleType}
+
+
+class LocalStructField:
+    def __init__(self, name, datatype):
+        self.name = name
+        self.datatype = datatype
+
+
+class LocalStructType:
+    def __init__(self, fields):
+        self.fields = fields
+
+
+class LocalRow(dict):
+    """Result row supporting row['COLUMN'] and asDict() like snowflake.snowpark.Row"""
+
+    def asDict(self):
+        return dict(self)
+
+
+class QueryRecord:
+    def __init__(self, query_id, sql_text):
+        self.query_id = query_id
+        self.sql_text = sql_text
+
+
+class QueryHistory:
+    def __init__(self):
+        self.queries = []
+
+
+class LocalAsyncJob:
+    """Mirrors snowflake.snowpark.AsyncJob: is_done(), result(), cancel() and query_id"""
+
+    def __init__(self, future, query_id, cancelled):
+        self._future = future
+        self._cancelled = cancelled
+        self.query_id = query_id
+
+    def is_done(self):
+        return self._future.done()
+
+    def result(self):
+        return self._future.result()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._future.cancel()
+
+
+class LocalDataFrame:
+    """The result side of session.sql(): collect, to_pandas and their async and batched variants"""
+
+    def __init__(self, session, query, params=None):
+        self._session = session
+        self._query = query
+        self._params = params or []
+
+    def collect(self):
+        return self._session._run(self._query, self._params, self._rows)
+
+    def collect_nowait(self):
+        return self._session._submit(self._query, self._params, self._rows)
+
+    def to_pandas(self, block=True):
+        if block:
+            return self._session._run(self._query, self._params, self._frame)
+        return self._session._submit(self._query, self._params, self._frame)
+
+    @property
+    def schema(self):
+        """Result columns and types like DataFrame.schema.
+
+        SQLite keeps no declared type for expressions, so each column's type is read from its
+        first non-NULL value; columns that are NULL throughout are reported as strings.
+        """
+        def describe(cursor):
+            columns = [description[0] for description in cursor.description]
+            data_types = [None] * len(columns)
+            for row in cursor:
+                for position, value in enumerate(row):
+                    if data_types[position] is None and value is not None:
+                        data_types[position] = LOCAL_DATA_TYPES.get(type(value), StringType)
+                if all(data_types):
+                    break
+            return LocalStructType([LocalStructField(column, (data_type or StringType)())
+                                    for column, data_type in zip(columns, data_types)])
+
+        return self._session._run(self._query, self._params, describe)
+
+    def to_pandas_batches(self):
+        cursor = self._session._run(self._query, self._params, lambda cursor: cursor)
+        columns = [description[0] for description in cursor.description]
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_ROWS)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    @staticmethod
+    def _rows(cursor):
+        columns = [description[0] for description in cursor.description or ()]
+        return [LocalRow(zip(columns, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _frame(cursor):
+        columns = [description[0] for description in cursor.description or ()]
+        return pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+
+
+class LocalSession:
+    """SQLite-backed session for running the data-access layer without a Snowflake account.
+
+    Register tables with add_table(); latency seconds are added to every query to model the
+    round trip to a warehouse, compile_latency seconds to the first run of each distinct statement
+    text, and async queries run on a thread pool of max_workers.
+    """
+
+    def __init__(self, latency=0.0, max_workers=32, role='LOCAL_ROLE', compile_latency=0.0):
+        self.latency = latency
+        self.compile_latency = compile_latency
+        self._compiled = {}
+        self.role = role
+        self._dir = tempfile.mkdtemp(prefix='database_explorer_')
+        self._path = str(Path(self._dir) / 'local.db')
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._histories = []
+        self._columns = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._writer = self._connect()
+        self._writer.executescript("""
+            CREATE TABLE __databases (name TEXT);
+            CREATE TABLE __schemata (CATALOG_NAME TEXT, SCHEMA_NAME TEXT);
+            CREATE TABLE __tables (TABLE_ID INTEGER, TABLE_CATALOG TEXT, TABLE_SCHEMA TEXT, TABLE_NAME TEXT,
+                                   TABLE_TYPE TEXT, ROW_COUNT INTEGER, BYTES INTEGER, LAST_ALTERED TEXT,
+                                   DELETED TEXT);
+            CREATE TABLE __columns (TABLE_ID INTEGER, TABLE_CATALOG TEXT, TABLE_SCHEMA TEXT, TABLE_NAME TEXT,
+                                    COLUMN_NAME TEXT, ORDINAL_POSITION INTEGER, DATA_TYPE TEXT, DELETED TEXT);
+            CREATE TABLE __search_optimization (TABLE_ID INTEGER, METHOD TEXT, TARGET TEXT);
+            CREATE TABLE __primary_keys (TABLE_ID INTEGER, COLUMN_NAME TEXT, KEY_SEQUENCE INTEGER);
+            CREATE INDEX __columns_table ON __columns (TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME);
+            CREATE INDEX __tables_table ON __tables (TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME);
+            CREATE INDEX __columns_table_id ON __columns (TABLE_ID);
+            CREATE INDEX __tables_table_id ON __tables (TABLE_ID);
+        """)
+
+    def _connect(self):
+        connection = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=MAX_COMPILED_STATEMENTS)
+        connection.create_function('SEARCH', -1, search_udf, deterministic=True)
+        connection.create_function('__MERGE_OBJECTS', -1, merge_objects_udf, deterministic=True)
+        connection.create_function('__HASH', -1, hash_udf, deterministic=True)
+        connection.create_function('TO_JSON', 1, to_json_udf, deterministic=True)
+        connection.create_aggregate('COUNT_IF', 1, CountIf)
+        connection.create_aggregate('ARRAY_AGG', 1, ArrayAgg)
+        connection.create_aggregate('OBJECT_AGG', 2, ObjectAgg)
+        connection.create_function('CONTAINS', 2, contains_udf, deterministic=True)
+        connection.create_function('TO_VARCHAR', 1, to_varchar_udf, deterministic=True)
+        connection.create_function('TO_VARIANT', 1, lambda value: value, deterministic=True)
+        # LEFT is a join keyword in SQLite, so LEFT() calls are renamed during translation
+        connection.create_function('__LEFT', 2, lambda value, length: None if value is None else str(value)[:length],
+                                   deterministic=True)
+        return connection
+
+    def _connection(self):
+        """One read connection per thread so async queries run in parallel"""
+        if not hasattr(self._local, 'connection'):
+            self._local.connection = self._connect()
+        return self._local.connection
+
+    def add_table(self, database, schema, table, data, data_types=None, last_altered=None,
+                  full_text_columns=None, primary_key=None):
+        """Register a DataFrame as database.schema.table, listing it in INFORMATION_SCHEMA.
+
+        data_types maps column names to the Snowflake DATA_TYPE reported for them; other
+        columns get one derived from their pandas dtype. full_text_columns (column names,
+        or ['*']) adds FULL_TEXT search optimization on them, and primary_key (column names)
+        is reported by SHOW PRIMARY KEYS.
+        """
+        data_types = data_types or {}
+        column_types = [(column, data_types.get(column, snowflake_type(dtype)))
+                        for column, dtype in data.dtypes.items()]
+        name = quote(f"{database}.{schema}.{table}")
+        with self._lock:
+            self._begin()
+            if not self._writer.execute("SELECT 1 FROM __databases WHERE name = ?", [database]).fetchone():
+                self._writer.execute("INSERT INTO __databases VALUES (?)", [database])
+            if not self._writer.execute("SELECT 1 FROM __schemata WHERE CATALOG_NAME = ? AND SCHEMA_NAME = ?",
+                                        [database, schema]).fetchone():
+                self._writer.execute("INSERT INTO __schemata VALUES (?, ?)", [database, schema])
+            self._writer.execute(f"CREATE TABLE {name} ({', '.join(quote(column) for column, _ in column_types)})")
+            placeholders = ', '.join('?' * len(column_types))
+            self._writer.executemany(
+                f"INSERT INTO {name} VALUES ({placeholders})",
+                data.astype(object).where(data.notna(), None).itertuples(index=False, name=None)
+            )
+            table_id = len(self._columns) + 1
+            self._writer.execute(
+                "INSERT INTO __tables VALUES (?, ?, ?, ?, 'BASE TABLE', ?, ?, ?, NULL)",
+                [table_id, database, schema, table, len(data), int(data.memory_usage(index=False, deep=True).sum()),
+                 str(last_altered or pd.Timestamp.now())]
+            )
+            self._writer.executemany(
+                "INSERT INTO __columns VALUES (?, ?, ?, ?, ?, ?, ?, NULL)",
+                [(table_id, database, schema, table, column, position, data_type)
+                 for position, (column, data_type) in enumerate(column_types, start=1)]
+            )
+            self._writer.executemany(
+                "INSERT INTO __primary_keys VALUES (?, ?, ?)",
+                [(table_id, column, position) for position, column in enumerate(primary_key or [], start=1)]
+            )
+            self._columns[(database.upper(), schema.upper(), table.upper())] = column_types
+        if full_text_columns:
+            self.add_search_optimization(database, schema, table, full_text_columns)
+
+    def add_search_optimization(self, database, schema, table, columns):
+        """Record FULL_TEXT search optimization on columns of a registered table"""
+        with self._lock:
+            self._begin()
+            row = self._writer.execute(
+                "SELECT TABLE_ID FROM __tables WHERE upper(TABLE_CATALOG) = upper(?) AND upper(TABLE_SCHEMA) = upper(?)"
+                " AND upper(TABLE_NAME) = upper(?)", [database, schema, table]
+            ).fetchone()
+            if row is None:
+                raise LookupError(f"Object '{database}.{schema}.{table}' does not exist")
+            self._writer.execute("INSERT INTO __search_optimization VALUES (?, 'FULL_TEXT', ?)",
+                                 [row[0], ', '.join(columns)])
+        self._commit()
+
+    def _begin(self):
+        # Registrations are committed in one transaction before the next query runs
+        if not self._writer.in_transaction:
+            self._writer.execute("BEGIN")
+
+    def _commit(self):
+        with self._lock:
+            if self._writer.in_transaction:
+                self._writer.execute("COMMIT")
+
+    def translate(self, query):
+        """Rewrite the Snowflake SQL the app generates into SQLite"""
+        # Number the ? placeholders so ones that translation repeats still bind the same parameter
+        count = iter(range(1, query.count('?') + 1))
+        query = PLACEHOLDER.sub(lambda match: match.group(1) or f"?{next(count)}", query)
+        if re.match(r'\s*SHOW\s+DATABASES\b', query, re.IGNORECASE):
+            return "SELECT name FROM __databases ORDER BY name"
+        if re.match(r'\s*COPY\s+INTO\b', query, re.IGNORECASE):
+            raise NotImplementedError("COPY INTO is not supported by the local session")
+        if CREATE_TEMPORARY_TABLE.match(query):
+            # SQLite temporary tables are private to one connection; async queries use others
+            return CREATE_TEMPORARY_TABLE.sub(r'\1\2', query, count=1)
+        show_tables = SHOW_TABLES.match(query)
+        if show_tables:
+            database, schema = (unquote(part).replace("'", "''") for part in show_tables.groups())
+            return f"""
+            SELECT t.TABLE_NAME AS name, t.TABLE_CATALOG AS database_name, t.TABLE_SCHEMA AS schema_name,
+                   'TABLE' AS kind, t.ROW_COUNT AS rows, t.BYTES AS bytes,
+                   CASE WHEN so.TABLE_ID IS NULL THEN 'OFF' ELSE 'ON' END AS search_optimization,
+                   CASE WHEN so.TABLE_ID IS NULL THEN NULL ELSE 100 END AS search_optimization_progress
+            FROM __tables t
+            LEFT JOIN (SELECT DISTINCT TABLE_ID FROM __search_optimization) so ON so.TABLE_ID = t.TABLE_ID
+            WHERE upper(t.TABLE_CATALOG) = upper('{database}') AND upper(t.TABLE_SCHEMA) = upper('{schema}')
+            ORDER BY t.TABLE_NAME
+            """
+        show_primary_keys = SHOW_PRIMARY_KEYS.match(query)
+        if show_primary_keys:
+            database = unquote(show_primary_keys.group(1)).replace("'", "''")
+            return f"""
+            SELECT t.TABLE_CATALOG AS database_name, t.TABLE_SCHEMA AS schema_name, t.TABLE_NAME AS table_name,
+                   pk.COLUMN_NAME AS column_name, pk.KEY_SEQUENCE AS key_sequence
+            FROM __primary_keys pk
+            JOIN __tables t ON t.TABLE_ID = pk.TABLE_ID
+            WHERE upper(t.TABLE_CATALOG) = upper('{database}')
+            """
+        describe = DESCRIBE_SEARCH_OPTIMIZATION.match(query)
+        if describe:
+            database, schema, table = (unquote(part).replace("'", "''") for part in describe.groups())
+            return f"""
+            SELECT so.rowid AS expression_id, so.METHOD AS method, so.TARGET AS target,
+                   'VARCHAR' AS target_data_type, 'true' AS active
+            FROM __search_optimization so
+            JOIN __tables t ON t.TABLE_ID = so.TABLE_ID
+            WHERE upper(t.TABLE_CATALOG) = upper('{database}') AND upper(t.TABLE_SCHEMA) = upper('{schema}')
+              AND upper(t.TABLE_NAME) = upper('{table}')
+            """
+        return ' UNION ALL '.join(self._translate_select(branch) for branch in UNION_ALL.split(query))
+
+    def _translate_select(self, query):
+        def catalog_view(match):
+            view = match.group(2).upper()
+            if view not in CATALOG_VIEWS:
+                raise NotImplementedError(f"INFORMATION_SCHEMA.{view} is not supported by the local session")
+            database = unquote(match.group(1)).replace("'", "''")
+            return f"(SELECT * FROM __{view.lower()} WHERE {CATALOG_VIEWS[view]} = '{database}')"
+
+        def ilike_any(match):
+            escape = f" ESCAPE '{match.group(3)}'" if match.group(3) else ""
+            patterns = STRING_LITERAL.findall(match.group(2))
+            # SQLite's LIKE already ignores ASCII case
+            return '(' + ' OR '.join(f"{match.group(1)} LIKE {pattern}{escape}" for pattern in patterns) + ')'
+
+        query = INFORMATION_SCHEMA_VIEW.sub(catalog_view, query)
+        query = ACCOUNT_USAGE_VIEW.sub(lambda match: f"__{match.group(1).lower()}", query)
+        query = ILIKE_ANY.sub(ilike_any, query)
+        query = LEFT_CALL.sub('__LEFT(', query)
+        # SQLite flattens single-use CTEs and would then hash a row once per reference; Snowflake hashes it once
+        query = HASHED_ROWS_CTE.sub(r'\1MATERIALIZED \2', query)
+
+        query = INSERT_INTO.sub(
+            lambda match: f"INSERT INTO {quote('.'.join(unquote(part) for part in match.group(1, 2, 3)))}", query
+        )
+
+        tables = []
+        for table_match in DATA_TABLE.finditer(query):
+            database, schema, table = (unquote(part) for part in table_match.group(1, 2, 3))
+            column_types = self._columns.get((database.upper(), schema.upper(), table.upper()))
+            if column_types is None:
+                raise LookupError(f"Object '{database}.{schema}.{table}' does not exist")
+            source = quote(f"{database}.{schema}.{table}")
+            if table_match.group(4):
+                percent, seed = table_match.group(4, 5)
+                source = f"(SELECT * FROM {source} WHERE abs((rowid * 2654435761 + {seed}) % 100) < {percent})"
+            tables.append((table_match, f"FROM {source} AS {quote(table)}", column_types))
+        if not tables:
+            return query
+
+        def hash_all(column_types):
+            arguments = [quote(column) for column, _ in column_types]
+            while len(arguments) > MAX_FUNCTION_ARGS:
+                arguments = [f"__HASH({', '.join(arguments[start:start + MAX_FUNCTION_ARGS])})"
+                             for start in range(0, len(arguments), MAX_FUNCTION_ARGS)]
+            return f"__HASH({', '.join(arguments)})"
+
+        # HASH(*) hashes the table of the FROM that follows it, or the last one when none follows
+        pieces = []
+        position = 0
+        for table_match, replacement, column_types in tables:
+            pieces.append(HASH_ALL.sub(lambda _: hash_all(column_types), query[position:table_match.start()]))
+            pieces.append(replacement)
+            position = table_match.end()
+        pieces.append(HASH_ALL.sub(lambda _: hash_all(tables[-1][2]), query[position:]))
+        query = ''.join(pieces)
+
+        column_types = tables[0][2]
+        columns = [quote(column) for column, _ in column_types]
+        searchable = [quote(column) for column, data_type in column_types if data_type in SEARCHABLE_DATA_TYPES]
+
+        def search_call(match):
+            targets = []
+            for target in match.group(1).split(','):
+                target = target.strip()
+                targets.extend(searchable if target.endswith('.*') else [target])
+            chunks = [targets[start:start + MAX_FUNCTION_ARGS] for start in range(0, len(targets), MAX_FUNCTION_ARGS)]
+            calls = [f"SEARCH({match.group(2)}, {', '.join(chunk)})" for chunk in chunks or [['NULL']]]
+            return '(' + ' OR '.join(calls) + ')'
+
+        def object_construct(match):
+            pairs = [f"'{unquote(column)}', {column}" for column in columns]
+            step = MAX_FUNCTION_ARGS // 2
+            objects = [f"json_object({', '.join(pairs[start:start + step])})" for start in range(0, len(pairs), step)]
+            return objects[0] if len(objects) == 1 else f"__MERGE_OBJECTS({', '.join(objects)})"
+
+        query = SEARCH_CALL.sub(search_call, query)
+        return OBJECT_CONSTRUCT_ALL.sub(object_construct, query)
+
+    def _record(self, query):
+        query_id = str(uuid.uuid4())
+        with self._lock:
+            for history in self._histories:
+                history.queries.append(QueryRecord(query_id, query))
+        return query_id
+
+    def _execute(self, query, params, handler, cancelled=None):
+        if self.latency:
+            if cancelled is not None and cancelled.wait(self.latency):
+                raise RuntimeError("query cancelled")
+            if cancelled is None:
+                time.sleep(self.latency)
+        create_table = CREATE_TABLE.match(query)
+        if create_table:
+            database, schema, table = (unquote(part) for part in create_table.group(1, 2, 3))
+            if (database.upper(), schema.upper(), table.upper()) not in self._columns:
+                definitions = [definition.split() for definition in create_table.group(4).split(',')]
+                data_types = {unquote(name): 'TEXT' if data_type.upper() == 'VARCHAR' else data_type.upper()
+                              for name, data_type, *_ in definitions}
+                self.add_table(database, schema, table, pd.DataFrame({name: pd.Series(dtype=object) for name in data_types}),
+                               data_types)
+                if create_table.group(5):
+                    # Clustering keys become an index, standing in for micro-partition pruning
+                    cluster_columns = ', '.join(quote(unquote(column.strip())) for column in create_table.group(5).split(','))
+                    with self._lock:
+                        self._begin()
+                        self._writer.execute(f"CREATE INDEX {quote(f'{database}.{schema}.{table}.cluster')} "
+                                             f"ON {quote(f'{database}.{schema}.{table}')} ({cluster_columns})")
+                self._commit()
+            return handler(self._connection().execute("SELECT 'Statement executed successfully.' AS status"))
+        add_search_optimization = ADD_SEARCH_OPTIMIZATION.match(query)
+        if add_search_optimization:
+            database, schema, table = (unquote(part) for part in add_search_optimization.group(1, 2, 3))
+            self.add_search_optimization(database, schema, table,
+                                         [unquote(column.strip()) for column in add_search_optimization.group(4).split(',')])
+            return handler(self._connection().execute("SELECT 'Statement executed successfully.' AS status"))
+        merge = MERGE_INTO.match(query)
+        if merge:
+            return handler(self._merge(merge, params))
+        cursor = self._connection().execute(self._compile(query), params)
+        return handler(cursor)
+
+    def _merge(self, merge, params):
+        """MERGE ... WHEN MATCHED THEN DELETE WHEN NOT MATCHED THEN INSERT, as SQLite statements.
+
+        The source is materialized with a flag recording whether it matched the target before
+        any change, so rows deleted by the MERGE do not turn into inserts.
+        """
+        database, schema, table, alias, source, source_alias, condition, matched, not_matched, columns, values = (
+            merge.groups()
+        )
+        target = quote('.'.join(unquote(part) for part in (database, schema, table)))
+        connection = self._connection()
+        connection.execute("DROP TABLE IF EXISTS temp.__merge_source")
+        connection.execute(f"""
+            CREATE TEMP TABLE __merge_source AS
+            SELECT {source_alias}.*, EXISTS (SELECT 1 FROM {target} AS {alias} WHERE {condition}) AS __MATCHED
+            FROM ({self.translate(source)}) AS {source_alias}
+        """, params)
+        deleted = connection.execute(f"""
+            DELETE FROM {target}
+            WHERE rowid IN (SELECT {alias}.rowid FROM temp.__merge_source AS {source_alias}
+                            JOIN {target} AS {alias} ON {condition}
+                            WHERE {source_alias}.__MATCHED AND ({matched or 'TRUE'}))
+        """).rowcount
+        inserted = connection.execute(f"""
+            INSERT INTO {target} ({columns})
+            SELECT {values} FROM temp.__merge_source AS {source_alias}
+            WHERE NOT __MATCHED AND ({not_matched or 'TRUE'})
+        """).rowcount
+        connection.execute("DROP TABLE temp.__merge_source")
+        return connection.execute("SELECT ? AS \"number of rows inserted\", ? AS \"number of rows deleted\"",
+                                  [inserted, deleted])
+
+    def _compile(self, query):
+        """Translate a statement, charging compile_latency the first time its text is seen"""
+        with self._lock:
+            translated = self._compiled.get(query)
+        if translated is None:
+            translated = self.translate(query)
+            if self.compile_latency:
+                time.sleep(self.compile_latency)
+            with self._lock:
+                if len(self._compiled) >= MAX_COMPILED_STATEMENTS:
+                    self._compiled.clear()
+                self._compiled[query] = translated
+        return translated
+
+    def _run(self, query, params, handler):
+        self._commit()
+        self._record(query)
+        return self._execute(query, params, handler)
+
+    def _submit(self, query, params, handler):
+        self._commit()
+        cancelled = threading.Event()
+        future = self._pool.submit(self._execute, query, params, handler, cancelled)
+        return LocalAsyncJob(future, self._record(query), cancelled)
+
+    def sql(self, query, params=None):
+        return LocalDataFrame(self, query, params)
+
+    def get_current_role(self):
+        return self.role
+
+    @contextmanager
+    def query_history(self):
+        history = QueryHistory()
+        with self._lock:
+            self._histories.append(history)
+        try:
+            yield history
+        finally:
+            with self._lock:
+                self._histories.remove(history)
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._writer.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
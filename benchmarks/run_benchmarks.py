@@ -0,0 +1,504 @@
+"""Offline benchmarks for the Database Explorer data-access layer, run against the local stand-in session.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks              # full suite
+    python -m benchmarks.run_benchmarks --quick      # smaller sizes, for CI
+    python -m benchmarks.run_benchmarks --only search export --json results.json
+
+Each benchmark reports p50/p95/max latency over --repeat timed runs, then one extra run under
+tracemalloc for the peak Python heap (pandas/NumPy buffers included, SQLite's own memory not).
+"""
+import argparse
+import gc
+import io
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.local_session import LocalSession
+from data_access import (
+    RESULT_PREVIEW_CHARS, SEARCH_PAGE_SIZE, CatalogPrefetcher, LabelIndex, build_account_table_specs,
+    build_batched_search_query, build_columns_query, build_export_file, build_projection, build_search_query,
+    column_label, dataframe_size, discover_account_columns, format_bytes, load_columns, load_schemas,
+    load_search_index_state, load_table_stats, load_tables, refresh_search_index, run_account_search,
+    run_batched_search, run_index_search, run_match_summaries, run_queries_concurrently, run_term_search,
+    split_batched_results, to_results_page, write_export
+)
+
+DATABASE = 'BENCH'
+INDEX_TABLE = 'BENCH.SEARCH.SEARCH_INDEX'
+SEARCH_TERM = 'needle'
+WORDS = ('alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel', 'india', 'juliet')
+TABLES_PER_SCHEMA = 500
+
+
+def measure(benchmark, fn, repeat, **params):
+    """Time fn() repeat times, then measure its peak traced memory in one more run"""
+    timings = []
+    outcome = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        outcome = fn()
+        timings.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    timings = pd.Series(timings)
+    return {
+        'benchmark': benchmark, **params,
+        'p50_ms': timings.median() * 1000,
+        'p95_ms': timings.quantile(0.95) * 1000,
+        'max_ms': timings.max() * 1000,
+        'peak_mb': peak / 1024 ** 2,
+        'result': outcome
+    }
+
+
+def measure_or_fail(benchmark, fn, repeat, **params):
+    """measure(), reporting a failing variant instead of stopping the suite"""
+    try:
+        return measure(benchmark, fn, repeat, **params)
+    except Exception as e:
+        return {'benchmark': benchmark, **params, 'result': f"error: {str(e)[:60]}"}
+
+
+def make_table(rows, match_rate, text_columns=4, number_columns=2, seed=0):
+    """Synthetic table where about match_rate of the rows contain SEARCH_TERM in the NOTES column"""
+    every = max(1, round(1 / match_rate)) if match_rate else None
+    data = {'ID': range(rows)}
+    for column in range(text_columns):
+        data[f"TEXT_{column}"] = [f"{WORDS[(row + column + seed) % len(WORDS)]} {row}" for row in range(rows)]
+    data['NOTES'] = [
+        f"{WORDS[(row + seed) % len(WORDS)]} {SEARCH_TERM}" if every and row % every == 0 else WORDS[row % len(WORDS)]
+        for row in range(rows)
+    ]
+    for column in range(number_columns):
+        data[f"AMOUNT_{column}"] = [row * (column + 1) for row in range(rows)]
+    return pd.DataFrame(data)
+
+
+def make_catalog(session, tables, rows_per_table, match_rate=0.0):
+    """Register tables spread over schemas of TABLES_PER_SCHEMA, returning their (schema, table) tuples"""
+    table_keys = []
+    for index in range(tables):
+        schema, table = f"SCHEMA_{index // TABLES_PER_SCHEMA:03d}", f"TABLE_{index:05d}"
+        session.add_table(DATABASE, schema, table, make_table(rows_per_table, match_rate, seed=index))
+        table_keys.append((schema, table))
+    return table_keys
+
+
+def legacy_columns_query(database, tables):
+    """Column discovery with one OR'd predicate per table, as used before VALUES-list discovery"""
+    table_conditions = " OR ".join(
+        f"(c.TABLE_SCHEMA = '{schema}' AND c.TABLE_NAME = '{table}')" for schema, table in tables
+    )
+    return f"""
+        SELECT c.TABLE_SCHEMA, c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE
+        FROM {database}.INFORMATION_SCHEMA.COLUMNS c
+        WHERE ({table_conditions})
+        ORDER BY c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION
+        """
+
+
+def bench_metadata(args):
+    """Discovery as a schema -> table -> column cascade and as one catalog prefetch; VALUES list vs OR predicates"""
+    results = []
+    for tables in ([10, 1000] if args.quick else [10, 100, 1000, 10000]):
+        with LocalSession(latency=args.latency) as session:
+            table_keys = make_catalog(session, tables, rows_per_table=1)
+
+            def discover():
+                schemas = load_schemas(session, DATABASE)
+                return len(load_columns(session, DATABASE, load_tables(session, DATABASE, schemas)))
+
+            def prefetch():
+                prefetcher = CatalogPrefetcher(session, DATABASE)
+                while not prefetcher.done():
+                    time.sleep(0.001)
+                if prefetcher.error is not None:
+                    raise prefetcher.error
+                return len(prefetcher.catalog['columns'])
+
+            results.append(measure_or_fail('metadata.discover', discover, args.repeat, tables=tables, variant='cascade'))
+            results.append(measure_or_fail('metadata.discover', prefetch, args.repeat, tables=tables,
+                                           variant='catalog prefetch'))
+            results.append(measure_or_fail(
+                'metadata.columns', lambda: len(session.sql(build_columns_query(DATABASE, table_keys)).collect()),
+                args.repeat, tables=tables, variant='values list'
+            ))
+            if tables <= 1000:
+                results.append(measure_or_fail(
+                    'metadata.columns', lambda: len(session.sql(legacy_columns_query(DATABASE, table_keys)).collect()),
+                    args.repeat, tables=tables, variant='or predicates'
+                ))
+    return results
+
+
+def bench_search(args):
+    """Searching 1-50 tables one at a time, concurrently and batched, at low and high match rates"""
+    results = []
+    rows_per_table = 500 if args.quick else 2000
+    page_size = 1000
+    for match_rate in (0.001, 0.1):
+        with LocalSession(latency=args.latency) as session:
+            table_keys = make_catalog(session, 50, rows_per_table, match_rate)
+            for width in (1, 10, 50):
+                specs = [(schema, table, 'TEXT_0, TEXT_1, TEXT_2, TEXT_3, NOTES', None)
+                         for schema, table in table_keys[:width]]
+                queries = {
+                    f"{schema}.{table}": build_search_query(DATABASE, schema, table, clause, SEARCH_TERM,
+                                                            limit=page_size + 1, sample_percent=sample)
+                    for schema, table, clause, sample in specs
+                }
+
+                def per_table(max_concurrency):
+                    return sum(len(to_results_page(df, 'NOTES', 0, page_size)) for _, df, _ in run_queries_concurrently(
+                        session, queries, max_concurrency=max_concurrency, result_format='pandas'))
+
+                def batched():
+                    return sum(len(df) for _, df, _ in run_batched_search(session, DATABASE, SEARCH_TERM, specs,
+                                                                           limit=page_size) if df is not None)
+
+                for mode, fn in (('sequential', lambda: per_table(1)), ('concurrent', lambda: per_table(8)),
+                                 ('batched', batched)):
+                    results.append(measure_or_fail('search', fn, args.repeat, tables=width,
+                                                   match_pct=match_rate * 100, mode=mode))
+    return results
+
+
+def bench_summary(args):
+    """Match counts per table and column computed in the warehouse against fetching each table's first page"""
+    results = []
+    rows_per_table = 2000 if args.quick else 20000
+    page_size = 1000
+    columns = ['TEXT_0', 'TEXT_1', 'TEXT_2', 'TEXT_3', 'NOTES']
+    with LocalSession(latency=args.latency) as session:
+        table_keys = make_catalog(session, 10, rows_per_table, 0.1)
+        specs = [(schema, table, ', '.join(columns), None) for schema, table in table_keys]
+        queries = {
+            f"{schema}.{table}": build_search_query(DATABASE, schema, table, clause, SEARCH_TERM, limit=page_size + 1)
+            for schema, table, clause, _ in specs
+        }
+
+        def first_pages():
+            frames = [df for _, df, _ in run_queries_concurrently(session, queries, result_format='pandas')]
+            return f"{sum(len(df) for df in frames):,} rows, {format_bytes(sum(map(dataframe_size, frames)))}"
+
+        def match_counts():
+            summaries = [summary for _, summary, _ in run_match_summaries(
+                session, DATABASE, SEARCH_TERM, [spec + (columns,) for spec in specs])]
+            return (f"{sum(summary['match_count'] for summary in summaries):,} matches, "
+                    f"{format_bytes(sum(dataframe_size(summary['samples']) for summary in summaries))}")
+
+        for mode, fn in (('first page per table', first_pages), ('match counts', match_counts)):
+            results.append(measure_or_fail('summary', fn, args.repeat, tables=len(table_keys),
+                                           rows_per_table=rows_per_table, mode=mode))
+    return results
+
+
+def bench_terms(args):
+    """A list of terms over 10 tables: one SEARCH query per term and table against one term-table join per table"""
+    results = []
+    rows_per_table = 500 if args.quick else 2000
+    columns = [(column, 'TEXT') for column in ('TEXT_0', 'TEXT_1', 'TEXT_2', 'TEXT_3', 'NOTES')]
+    clause = ', '.join(column for column, _ in columns)
+    with LocalSession(latency=args.latency) as session:
+        table_keys = make_catalog(session, 10, rows_per_table, 0.01)
+        for term_count in (20, 100):
+            terms = [f"{WORDS[index % len(WORDS)]} {index * 7}" for index in range(term_count)]
+
+            def per_term():
+                queries = {
+                    (term, schema, table): build_search_query(DATABASE, schema, table, clause, term,
+                                                              limit=SEARCH_PAGE_SIZE + 1)
+                    for term in terms for schema, table in table_keys
+                }
+                with session.query_history() as history:
+                    for _ in run_queries_concurrently(session, queries, result_format='pandas'):
+                        pass
+                return f"{len(history.queries):,} statement(s)"
+
+            def term_table():
+                with session.query_history() as history:
+                    for _ in run_term_search(session, DATABASE, terms, {table_key: columns for table_key in table_keys}):
+                        pass
+                return f"{len(history.queries):,} statement(s)"
+
+            for mode, fn in (('SEARCH per term', per_term), ('term table join', term_table)):
+                results.append(measure_or_fail('terms', fn, args.repeat, tables=len(table_keys), terms=term_count,
+                                               mode=mode))
+    return results
+
+
+def bench_projection(args):
+    """One results page of a wide table with large VARIANT columns: SELECT * against key and searched columns"""
+    results = []
+    rows = 2000 if args.quick else 20000
+    page_size = 1000
+    data = make_table(rows, 0.5)
+    payload_columns = [f"PAYLOAD_{column}" for column in range(10)]
+    for column in payload_columns:
+        data[column] = [json.dumps({'id': row, 'items': [WORDS[(row + item) % len(WORDS)] * 8 for item in range(40)]})
+                        for row in range(rows)]
+    data_types = {column: 'VARIANT' for column in payload_columns}
+    searched = [('NOTES', 'TEXT'), ('PAYLOAD_0', 'VARIANT')]
+    with LocalSession() as session:
+        session.add_table(DATABASE, 'PUBLIC', 'WIDE', data, data_types, primary_key=['ID'])
+        variants = {
+            'all columns': None,
+            'key + searched columns': build_projection(searched, ['ID']),
+            f"key + searched, {RESULT_PREVIEW_CHARS}-char preview": build_projection(searched, ['ID'],
+                                                                                   RESULT_PREVIEW_CHARS),
+        }
+        for variant, projection in variants.items():
+            query, params = build_search_query(DATABASE, 'PUBLIC', 'WIDE', '"NOTES", "PAYLOAD_0"', SEARCH_TERM,
+                                               limit=page_size + 1, projection=projection)
+
+            def fetch_page():
+                df = session.sql(query, params=params).to_pandas()
+                return f"{len(df):,} rows, {format_bytes(dataframe_size(df))}"
+
+            results.append(measure_or_fail('projection', fetch_page, args.repeat, rows=rows, variant=variant))
+    return results
+
+
+def bench_index(args):
+    """Searching 10-50 tables through a search index table versus one query per table, plus refresh cost"""
+    results = []
+    rows_per_table = 500 if args.quick else 2000
+    page_size = 1000
+    with LocalSession(latency=args.latency) as session:
+        table_keys = make_catalog(session, 50, rows_per_table, 0.001)
+        columns = load_columns(session, DATABASE, table_keys)
+        table_stats = load_table_stats(session, DATABASE, table_keys)
+        results.append(measure('index', lambda: sum(1 for _ in refresh_search_index(
+            session, INDEX_TABLE, DATABASE, columns, table_stats, {}, force=True)), 1, tables=50, mode='refresh (full)'))
+        state = load_search_index_state(session, INDEX_TABLE, DATABASE)
+        results.append(measure('index', lambda: sum(1 for _ in refresh_search_index(
+            session, INDEX_TABLE, DATABASE, columns, table_stats, state)), args.repeat, tables=50,
+            mode='refresh (unchanged)'))
+        results.append(measure('index', lambda: sum(1 for _ in refresh_search_index(
+            session, INDEX_TABLE, DATABASE, columns, table_stats, state, force=True)), args.repeat, tables=50,
+            mode='refresh (forced, rows unchanged)'))
+        for width in (10, 50):
+            searched = {table_key for table_key in table_keys[:width]}
+            queries = {
+                f"{schema}.{table}": build_search_query(DATABASE, schema, table, 'TEXT_0, TEXT_1, TEXT_2, TEXT_3, NOTES',
+                                                        SEARCH_TERM, limit=page_size + 1)
+                for schema, table in searched
+            }
+            table_columns = [column[:3] for column in columns if column[:2] in searched]
+            results.append(measure_or_fail('index', lambda: sum(len(df) for _, df, _ in run_queries_concurrently(
+                session, queries, max_concurrency=8, result_format='pandas')), args.repeat, tables=width,
+                mode='per-table concurrent'))
+            results.append(measure_or_fail('index', lambda: sum(len(df) for df in run_index_search(
+                session, INDEX_TABLE, DATABASE, SEARCH_TERM, table_columns, limit=page_size + 1).values()),
+                args.repeat, tables=width, mode='index lookup'))
+    return results
+
+
+def bench_statements(args):
+    """Repeated searches with the term inlined against bound as a parameter, with and without a compile cost"""
+    results = []
+    rows_per_table = 200 if args.quick else 1000
+    tables, terms_per_run = 20, 5
+    for compile_latency in sorted({0.0, args.compile_latency}):
+        with LocalSession(latency=args.latency, compile_latency=compile_latency) as session:
+            table_keys = make_catalog(session, tables, rows_per_table, 0.01)
+            terms = (f"{SEARCH_TERM} {WORDS[index % len(WORDS)]}{index}" for index in range(10 ** 6))
+            for bind in (False, True):
+                def search_terms():
+                    # Every run searches new terms, as a user moving from one search to the next would
+                    with session.query_history() as history:
+                        for term in [next(terms) for _ in range(terms_per_run)]:
+                            queries = {
+                                f"{schema}.{table}": build_search_query(
+                                    DATABASE, schema, table, 'TEXT_0, TEXT_1, TEXT_2, TEXT_3, NOTES', term,
+                                    limit=SEARCH_PAGE_SIZE + 1, bind=bind)
+                                for schema, table in table_keys
+                            }
+                            for _ in run_queries_concurrently(session, queries, max_concurrency=8,
+                                                              result_format='pandas'):
+                                pass
+                    return f"{len({query.sql_text for query in history.queries})} distinct statement(s)"
+
+                results.append(measure_or_fail('statements', search_terms, args.repeat, tables=tables,
+                                               terms=terms_per_run, compile_ms=compile_latency * 1000,
+                                               mode='bound' if bind else 'inlined'))
+    return results
+
+
+def bench_conversion(args):
+    """Turning result rows into DataFrames: Row objects, direct fetch and batched JSON rows"""
+    results = []
+    for rows in ([1000, 10000] if args.quick else [1000, 10000, 100000]):
+        with LocalSession() as session:
+            session.add_table(DATABASE, 'PUBLIC', 'DATA', make_table(rows, 1.0))
+            query, params = build_search_query(DATABASE, 'PUBLIC', 'DATA', 'NOTES', SEARCH_TERM)
+            batched_query, batched_params = build_batched_search_query(
+                DATABASE, SEARCH_TERM, [('PUBLIC', 'DATA', 'NOTES', None)], limit=rows)
+            batched_rows = session.sql(batched_query, params=batched_params).collect()
+            variants = {
+                'rows + asDict': lambda: len(pd.DataFrame([row.asDict()
+                                                           for row in session.sql(query, params=params).collect()])),
+                'to_pandas': lambda: len(session.sql(query, params=params).to_pandas()),
+                'batched json': lambda: len(split_batched_results(batched_rows)['PUBLIC.DATA'])
+            }
+            for variant, fn in variants.items():
+                results.append(measure_or_fail('conversion', fn, args.repeat, rows=rows, variant=variant))
+    return results
+
+
+def bench_paging(args):
+    """Memory for fetching every match of a large table against one results page"""
+    results = []
+    rows = 20000 if args.quick else 200000
+    with LocalSession() as session:
+        session.add_table(DATABASE, 'PUBLIC', 'DATA', make_table(rows, 1.0))
+        full_query = build_search_query(DATABASE, 'PUBLIC', 'DATA', 'NOTES', SEARCH_TERM)
+        page_query = build_search_query(DATABASE, 'PUBLIC', 'DATA', 'NOTES', SEARCH_TERM, limit=1001, offset=1000)
+        for variant, (query, params) in (('all rows', full_query), ('one page', page_query)):
+            results.append(measure_or_fail('paging', lambda: len(session.sql(query, params=params).to_pandas()),
+                                           args.repeat, rows=rows, variant=variant))
+    return results
+
+
+def bench_export(args):
+    """Export of every match of one table: eager CSV string against the streamed writers"""
+    results = []
+    rows = 20000 if args.quick else 100000
+    with LocalSession() as session:
+        session.add_table(DATABASE, 'PUBLIC', 'DATA', make_table(rows, 1.0))
+        query, params = build_search_query(DATABASE, 'PUBLIC', 'DATA', 'NOTES', SEARCH_TERM)
+        first_page = session.sql(query + "LIMIT 1000\n", params=params).to_pandas()
+        first_page.attrs['search_clause'] = 'NOTES'
+        search_results = {'database': DATABASE, 'search_string': SEARCH_TERM, 'tables': {'PUBLIC.DATA': first_page}}
+
+        results.append(measure_or_fail(
+            'export', lambda: len(session.sql(query, params=params).to_pandas().to_csv(index=False).encode('utf-8')),
+            args.repeat, rows=rows, variant='eager CSV'
+        ))
+        for file_format in ('CSV', 'CSV (gzip)', 'Parquet'):
+            results.append(measure_or_fail(
+                'export', lambda: len(build_export_file(session, search_results, ['PUBLIC.DATA'], file_format,
+                                                        all_rows=True)[0]),
+                args.repeat, rows=rows, variant=f"streamed {file_format}"
+            ))
+
+        def frames_only():
+            out = io.BytesIO()
+            write_export(session.sql(query, params=params).to_pandas_batches(), 'CSV', out)
+            return out.tell()
+
+        results.append(measure_or_fail('export', frames_only, args.repeat, rows=rows, variant='write_export CSV'))
+    return results
+
+
+def bench_account(args):
+    """Account-wide discovery and search over several databases through one concurrency-limited pool"""
+    results = []
+    databases, tables_per_database = (4, 50) if args.quick else (5, 400)
+    name_filters = {'schemas': ([], []), 'tables': ([], ['*9'])}
+    with LocalSession(latency=args.latency) as session:
+        for database_index in range(databases):
+            for index in range(tables_per_database):
+                session.add_table(f"DB_{database_index}", f"SCHEMA_{index // TABLES_PER_SCHEMA:03d}",
+                                  f"TABLE_{index:05d}", make_table(20, 0.1, seed=index))
+        database_names = [f"DB_{database_index}" for database_index in range(databases)]
+        for variant, use_account_usage in (('information_schema', False), ('account_usage', True)):
+            results.append(measure_or_fail(
+                'account.discover',
+                lambda: len(discover_account_columns(session, database_names, name_filters, use_account_usage)[0]),
+                args.repeat, tables=databases * tables_per_database, variant=variant
+            ))
+        account_specs = build_account_table_specs(
+            discover_account_columns(session, database_names, name_filters)[0])
+        for max_concurrency in (8, 32):
+            results.append(measure_or_fail(
+                'account.search',
+                lambda: sum(1 for _, df, _ in run_account_search(session, SEARCH_TERM, account_specs,
+                                                                 max_concurrency=max_concurrency) if df is not None),
+                args.repeat, tables=len(account_specs), variant=f"concurrency {max_concurrency}"
+            ))
+    return results
+
+
+def bench_picker(args):
+    """Column picker label handling: label scans per rerun against a LabelIndex built once"""
+    results = []
+    columns = [(f"SCHEMA_{index // 2000:02d}", f"TABLE_{index // 40:04d}", f"COLUMN_{index % 40:02d}", 'VARCHAR')
+               for index in range(5000 if args.quick else 20000)]
+    selected = [column_label(*column) for column in columns[::len(columns) // 300]]
+
+    def label_scan():
+        labels = [f"{schema}.{table}.{column} ({data_type})" for schema, table, column, data_type in columns]
+        picked = []
+        for display_name in selected:
+            for schema, table, column, data_type in columns:
+                if display_name.startswith(f"{schema}.{table}.{column}"):
+                    picked.append((schema, table, column, data_type))
+                    break
+        return len(labels), len(picked)
+
+    index = LabelIndex(columns, column_label)
+    variants = {
+        'label scan per rerun': label_scan,
+        'index build': lambda: len(LabelIndex(columns, column_label)),
+        'index lookups per rerun': lambda: (len(index.keys_for(selected)), len(index.filter('table_0042', 500)))
+    }
+    for variant, fn in variants.items():
+        results.append(measure_or_fail('picker', fn, args.repeat, columns=len(columns), selected=len(selected),
+                                       variant=variant))
+    return results
+
+
+BENCHMARKS = {
+    'metadata': bench_metadata,
+    'search': bench_search,
+    'summary': bench_summary,
+    'terms': bench_terms,
+    'index': bench_index,
+    'statements': bench_statements,
+    'conversion': bench_conversion,
+    'paging': bench_paging,
+    'projection': bench_projection,
+    'export': bench_export,
+    'picker': bench_picker,
+    'account': bench_account,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="benchmarks to run (default: all)")
+    parser.add_argument('--quick', action='store_true', help="smaller data sizes for CI")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="seconds added per query to model the warehouse round trip (metadata and search)")
+    parser.add_argument('--compile-latency', type=float, default=0.05,
+                        help="seconds charged to the first run of each distinct statement text (statements)")
+    parser.add_argument('--json', help="also write the results to this file as JSON")
+    args = parser.parse_args()
+
+    all_results = []
+    for name in args.only or BENCHMARKS:
+        results = BENCHMARKS[name](args)
+        all_results.extend(results)
+        print(f"\n== {name}: {BENCHMARKS[name].__doc__}")
+        print(pd.DataFrame(results).drop(columns='benchmark').to_string(index=False, float_format='{:,.1f}'.format))
+
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(all_results, out, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1699 @@
+"""Snowflake data access for the Database Explorer: metadata discovery, search execution and export.
+
+Everything here takes the Snowpark session as an argument and has no Streamlit dependency, so it
+runs against a live session or the local stand-in in benchmarks/local_session.py.
+"""
+import bisect
+import csv
+import gzip
+import io
+import itertools
+import fnmatch
+import json
+import logging
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Search execution defaults (adjustable from the sidebar)
+SEARCH_MAX_CONCURRENCY = 8
+SEARCH_TABLE_TIMEOUT_SECONDS = 300
+SEARCH_POLL_INTERVAL_SECONDS = (0.02, 0.5)  # initial and maximum wait between status checks
+SEARCH_PAGE_SIZE = 1000  # rows fetched per table per page
+SUMMARY_SAMPLE_ROWS = 3  # sample rows returned per table by match counts
+RESULT_PREVIEW_CHARS = 200  # characters kept per value when results are trimmed to a preview
+
+# Batched search: tables are combined into UNION ALL statements up to these limits
+BATCH_MAX_TABLES = 50
+BATCH_MAX_SQL_CHARS = 200_000
+
+# Term list search: terms per run, and terms per INSERT when loading them into a temporary table
+BATCH_TERMS_MAX = 10_000
+BATCH_TERMS_INSERT_ROWS = 1000
+SEARCH_TERM_SEPARATORS = re.compile(r'[\r\n,;\t]+')
+TERM_FILE_SNIFF_CHARS = 64 * 1024  # start of an uploaded term list used to detect its delimiter
+
+# Column discovery: data types the SEARCH function can look in, and tables per INFORMATION_SCHEMA query
+SEARCHABLE_DATA_TYPES = ('VARCHAR', 'VARIANT', 'ARRAY', 'TEXT', 'OBJECT')
+COLUMN_DISCOVERY_CHUNK_SIZE = 1000
+
+# Export formats: file extension, MIME type and the matching COPY INTO file format
+EXPORT_FORMATS = {
+    'CSV': ('.csv', 'text/csv', "TYPE = CSV COMPRESSION = NONE FIELD_OPTIONALLY_ENCLOSED_BY = '\"'"),
+    'CSV (gzip)': ('.csv.gz', 'application/gzip', "TYPE = CSV COMPRESSION = GZIP FIELD_OPTIONALLY_ENCLOSED_BY = '\"'"),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet', "TYPE = PARQUET"),
+}
+EXPORT_SPOOL_BYTES = 32 * 1024 * 1024  # export parts larger than this are spooled to disk while building
+# Stage unloads: @[database.][schema.]stage, @[database.][schema.]%table or @~, then an optional /path
+STAGE_NAME_PART = r'(?:[A-Za-z_][A-Za-z0-9_$]*|"(?:[^"\n]|"")+")'
+STAGE_LOCATION = re.compile(rf'@(?:~|(?:{STAGE_NAME_PART}\.){{0,2}}%?{STAGE_NAME_PART})(?:/[A-Za-z0-9_.=-]*)*')
+FILE_NAME_UNSAFE = re.compile(r'[^A-Za-z0-9_-]+')
+# Parquet column types by Snowpark data type; semi-structured values arrive as JSON text
+ARROW_EXPORT_TYPES = {
+    'StringType': pa.string(), 'VariantType': pa.string(), 'ArrayType': pa.string(), 'MapType': pa.string(),
+    'StructType': pa.string(), 'GeographyType': pa.string(), 'GeometryType': pa.string(),
+    'BooleanType': pa.bool_(), 'ByteType': pa.int64(), 'ShortType': pa.int64(), 'IntegerType': pa.int64(),
+    'LongType': pa.int64(), 'FloatType': pa.float64(), 'DoubleType': pa.float64(), 'DateType': pa.date32(),
+    'TimeType': pa.time64('us'), 'BinaryType': pa.binary(),
+}
+
+# Catalog prefetch: rows fetched per bulk catalog query; larger catalogs are loaded per selection instead
+CATALOG_PREFETCH_MAX_ROWS = 200_000
+
+# Search planning: a fixed seed keeps sampled pages consistent between page fetches
+SEARCH_SAMPLE_PERCENT = 10
+SEARCH_SAMPLE_SEED = 42
+
+# Search optimization: columns per recommended FULL_TEXT index and tables kept in the shared search history
+SEARCH_OPTIMIZATION_MAX_COLUMNS = 10
+SEARCH_HISTORY_MAX_TABLES = 500
+
+# Search index: one table of (table, column, row key, value) entries answers searches over many tables;
+# index tables are named DATABASE.SCHEMA.TABLE and keep their watermarks in a companion _STATE table
+SEARCH_INDEX_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_$]*(\.[A-Za-z_][A-Za-z0-9_$]*){2}')
+SEARCH_INDEX_STATE_SUFFIX = '_STATE'
+
+# Account-wide search: tables searched per run unless raised in the UI
+ACCOUNT_SEARCH_MAX_TABLES = 2000
+
+# Names shown without quotes in table keys and picker labels; anything else is double-quoted
+SIMPLE_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_$]*')
+TABLE_KEY_PART = re.compile(r'"((?:[^"]|"")*)"|([^."]+)')
+
+# Performance instrumentation: spans kept per session for the performance panel
+PERF_MAX_SPANS = 2000
+perf_logger = logging.getLogger("database_explorer.perf")
+PERF_LOG_HANDLER = "database_explorer.perf.stderr"
+
+def enable_perf_log():
+    """Send perf_logger's INFO lines to stderr, where the app log collects them.
+    
+    Streamlit only configures its own loggers, so without this the logger stays at the
+    WARNING level it inherits and drops every span.
+    """
+    if not any(handler.get_name() == PERF_LOG_HANDLER for handler in perf_logger.handlers):
+        handler = logging.StreamHandler()
+        handler.set_name(PERF_LOG_HANDLER)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        perf_logger.addHandler(handler)
+        perf_logger.propagate = False
+    perf_logger.setLevel(logging.INFO)
+
+class PerfRecorder:
+    """Collects timing spans for the performance panel, optionally logging each span as a JSON line"""
+    
+    def __init__(self, max_spans=PERF_MAX_SPANS, json_log=False):
+        self.spans = deque(maxlen=max_spans)
+        self.json_log = json_log
+    
+    @property
+    def json_log(self):
+        return self._json_log
+    
+    @json_log.setter
+    def json_log(self, enabled):
+        self._json_log = enabled
+        if enabled:
+            enable_perf_log()
+    
+    def record(self, stage, seconds, **fields):
+        """Store a finished span; fields such as table, query_id or rows are kept alongside the timing"""
+        span = {'stage': stage, 'seconds': seconds, 'at': time.time(), **fields}
+        self.spans.append(span)
+        if self.json_log:
+            perf_logger.info(json.dumps(span, default=str))
+    
+    @contextmanager
+    def span(self, stage, **fields):
+        """Time a block; the yielded dict can be filled with extra fields before the block ends"""
+        started = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.record(stage, time.perf_counter() - started, **fields)
+    
+    def summary(self):
+        """Per-stage count, total and percentile timings as a DataFrame"""
+        if not self.spans:
+            return pd.DataFrame()
+        seconds = pd.DataFrame(list(self.spans)).groupby('stage')['seconds']
+        return pd.DataFrame({
+            'count': seconds.count(),
+            'total_s': seconds.sum(),
+            'p50_s': seconds.median(),
+            'p95_s': seconds.quantile(0.95),
+            'max_s': seconds.max()
+        }).sort_values('total_s', ascending=False)
+    
+    def clear(self):
+        self.spans.clear()
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ttl seconds after they are stored.
+    
+    When max_bytes is set, sizeof(value) is charged per entry and least recently used
+    entries are evicted until the total fits.
+    """
+    
+    def __init__(self, ttl, max_entries, max_bytes=None, sizeof=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return (found, value) and mark the entry as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return False, None
+    
+    def set(self, key, value):
+        """Store a value, evicting least recently used entries beyond max_entries or max_bytes"""
+        size = self.sizeof(value) if self.sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.total_bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key):
+        self.total_bytes -= self._entries.pop(key)[2]
+    
+    def __contains__(self, key):
+        """True when key holds an unexpired entry; not counted as a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() - entry[0] < self.ttl
+    
+    def invalidate(self, predicate=None):
+        """Drop every entry, or only those whose key matches predicate"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate is None or predicate(key)]:
+                self._remove(key)
+    
+    def stats(self):
+        """Return hit/miss counters, the current entry count and the bytes held"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                    'bytes': self.total_bytes}
+
+def dataframe_size(df):
+    """Approximate memory held by a cached search result"""
+    return 0 if df is None else int(df.memory_usage(deep=True).sum())
+
+def collect_rows(session, query, recorder=None, stage='query'):
+    """Run a query synchronously, recording its duration, row count and Snowflake query ID with a recorder"""
+    if recorder is None:
+        return session.sql(query).collect()
+    with recorder.span(stage) as span_fields:
+        with session.query_history() as history:
+            rows = session.sql(query).collect()
+        span_fields['rows'] = len(rows)
+        if history.queries:
+            span_fields['query_id'] = history.queries[-1].query_id
+    return rows
+
+def load_databases(session, recorder=None):
+    """Names of all databases visible to the session's role"""
+    return [row['name'] for row in collect_rows(session, "SHOW DATABASES", recorder, 'metadata.query')]
+
+def build_schemas_query(database):
+    """Schema names in a database, excluding INFORMATION_SCHEMA"""
+    return f"""
+    SELECT SCHEMA_NAME 
+    FROM {quote_identifier(database)}.INFORMATION_SCHEMA.SCHEMATA 
+    WHERE SCHEMA_NAME NOT IN ('INFORMATION_SCHEMA')
+    ORDER BY SCHEMA_NAME
+    """
+
+def build_tables_query(database, schemas=None):
+    """Base tables in the given schemas, or in every schema but INFORMATION_SCHEMA when schemas is None"""
+    if schemas is None:
+        schema_condition = "TABLE_SCHEMA NOT IN ('INFORMATION_SCHEMA')"
+    else:
+        schema_condition = f"TABLE_SCHEMA IN ({sql_list(schemas)})"
+    return f"""
+    SELECT DISTINCT TABLE_SCHEMA, TABLE_NAME 
+    FROM {quote_identifier(database)}.INFORMATION_SCHEMA.TABLES 
+    WHERE {schema_condition}
+    AND TABLE_TYPE = 'BASE TABLE'
+    ORDER BY TABLE_SCHEMA, TABLE_NAME
+    """
+
+def load_schemas(session, database, recorder=None):
+    """Schema names in a database, excluding INFORMATION_SCHEMA"""
+    return [row['SCHEMA_NAME'] for row in collect_rows(session, build_schemas_query(database), recorder, 'metadata.query')]
+
+def load_tables(session, database, schemas, recorder=None):
+    """(schema, table) tuples for the base tables in the given schemas"""
+    return [(row['TABLE_SCHEMA'], row['TABLE_NAME'])
+            for row in collect_rows(session, build_tables_query(database, schemas), recorder, 'metadata.query')]
+
+def build_columns_query(database, tables):
+    """Build a column discovery query for a list of (schema, table) tuples.
+    
+    Tables are joined in as a VALUES list and the scan is limited to their schemas, so the
+    statement grows by one short row per table instead of one OR'd predicate per table.
+    """
+    table_values = ", ".join(f"({sql_literal(schema)}, {sql_literal(table)})" for schema, table in tables)
+    return f"""
+        SELECT c.TABLE_SCHEMA, c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE
+        FROM {quote_identifier(database)}.INFORMATION_SCHEMA.COLUMNS c
+        JOIN (VALUES {table_values}) t
+            ON c.TABLE_SCHEMA = t.column1 AND c.TABLE_NAME = t.column2
+        WHERE c.TABLE_SCHEMA IN ({sql_list(sorted({schema for schema, _ in tables}))})
+        AND c.DATA_TYPE IN ({sql_list(SEARCHABLE_DATA_TYPES)})
+        ORDER BY c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION
+        """
+
+def load_columns(session, database, tables, chunk_size=COLUMN_DISCOVERY_CHUNK_SIZE,
+                 max_concurrency=SEARCH_MAX_CONCURRENCY, recorder=None):
+    """Fetch searchable columns for any number of tables, chunking the lookup above chunk_size tables.
+    
+    Returns (schema, table, column, data_type) tuples ordered by schema, table and column position.
+    """
+    tables = sorted(set(tables))
+    chunk_queries = {
+        index: build_columns_query(database, tables[start:start + chunk_size])
+        for index, start in enumerate(range(0, len(tables), chunk_size))
+    }
+    
+    chunk_rows = {}
+    for index, result, _ in run_queries_concurrently(session, chunk_queries, max_concurrency=max_concurrency,
+                                                     recorder=recorder, stage='metadata.columns'):
+        if isinstance(result, Exception):
+            raise result
+        chunk_rows[index] = result
+    
+    # Schema, table and type names repeat on every row, so each distinct string is stored once
+    return [(sys.intern(row['TABLE_SCHEMA']), sys.intern(row['TABLE_NAME']), row['COLUMN_NAME'],
+             sys.intern(row['DATA_TYPE']))
+            for index in sorted(chunk_rows) for row in chunk_rows[index]]
+
+class CatalogPrefetcher:
+    """Loads a database's schemas, tables and searchable columns on a background thread.
+    
+    Three bulk INFORMATION_SCHEMA queries run as concurrent async jobs; once they finish,
+    catalog holds {'schemas', 'tables', 'columns'} in the order load_schemas(), load_tables()
+    and load_columns() return them, or error holds the exception. A part with more than
+    max_rows rows is left as None (columns too, when the tables overflow) so lookups of that
+    part fall back to per-selection queries. cancel() stops waiting and cancels the jobs.
+    """
+    
+    def __init__(self, session, database, max_rows=CATALOG_PREFETCH_MAX_ROWS, recorder=None):
+        self.database = database
+        self.max_rows = max_rows
+        self.catalog = None
+        self.error = None
+        self._session = session
+        self._recorder = recorder
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"catalog-prefetch-{database}", daemon=True)
+        self._thread.start()
+    
+    def _queries(self):
+        limit = f"LIMIT {self.max_rows + 1}\n"
+        no_filters = {'schemas': ((), ()), 'tables': ((), ())}
+        return {
+            'schemas': build_schemas_query(self.database) + limit,
+            'tables': build_tables_query(self.database) + limit,
+            'columns': build_database_columns_query(self.database, no_filters) + limit
+        }
+    
+    def _run(self):
+        started = time.perf_counter()
+        jobs = {}
+        min_wait, max_wait = SEARCH_POLL_INTERVAL_SECONDS
+        wait = min_wait
+        try:
+            for key, query in self._queries().items():
+                jobs[key] = self._session.sql(query).collect_nowait()
+            while not all(job.is_done() for job in jobs.values()):
+                if self._cancelled.wait(wait):
+                    return
+                wait = min(wait * 2, max_wait)
+            results = {key: job.result() for key, job in jobs.items()}
+        except Exception as prefetch_error:
+            self.error = prefetch_error
+            return
+        finally:
+            for job in jobs.values():
+                if not job.is_done():
+                    cancel_job(job)
+        
+        schemas = [row['SCHEMA_NAME'] for row in results['schemas']]
+        tables = [(sys.intern(row['TABLE_SCHEMA']), sys.intern(row['TABLE_NAME'])) for row in results['tables']]
+        columns = [(sys.intern(row['TABLE_SCHEMA']), sys.intern(row['TABLE_NAME']), row['COLUMN_NAME'],
+                    sys.intern(row['DATA_TYPE'])) for row in results['columns']]
+        self.catalog = {
+            'schemas': schemas if len(schemas) <= self.max_rows else None,
+            'tables': tables if len(tables) <= self.max_rows else None,
+            'columns': columns if len(columns) <= self.max_rows and len(tables) <= self.max_rows else None
+        }
+        if self._recorder is not None:
+            self._recorder.record('prefetch.catalog', time.perf_counter() - started, key=self.database,
+                                  rows=len(schemas) + len(tables) + len(columns))
+    
+    def done(self):
+        return not self._thread.is_alive()
+    
+    def cancel(self):
+        self._cancelled.set()
+
+def load_table_stats(session, database, tables, recorder=None):
+    """Return {table_key: {'row_count', 'bytes', 'last_altered'}} for (schema, table) tuples in one query"""
+    if not tables:
+        return {}
+    table_values = ", ".join(f"({sql_literal(schema)}, {sql_literal(table)})" for schema, table in tables)
+    query = f"""
+    SELECT t.TABLE_SCHEMA, t.TABLE_NAME, t.ROW_COUNT, t.BYTES, t.LAST_ALTERED
+    FROM {quote_identifier(database)}.INFORMATION_SCHEMA.TABLES t
+    JOIN (VALUES {table_values}) v
+        ON t.TABLE_SCHEMA = v.column1 AND t.TABLE_NAME = v.column2
+    WHERE t.TABLE_SCHEMA IN ({sql_list(sorted({schema for schema, _ in tables}))})
+    """
+    return {
+        format_table_key(row['TABLE_SCHEMA'], row['TABLE_NAME']): {
+            'row_count': row['ROW_COUNT'],
+            'bytes': row['BYTES'],
+            'last_altered': str(row['LAST_ALTERED'])
+        }
+        for row in collect_rows(session, query, recorder, 'metadata.table_stats')
+    }
+
+def parse_search_optimization_target(target):
+    """Column names from a DESCRIBE SEARCH OPTIMIZATION target such as 'PLAY, LINE' or 'FULL_TEXT(PLAY, LINE)'"""
+    text = str(target).strip()
+    inner = re.fullmatch(r'FULL_TEXT\s*\((.*)\)', text, re.IGNORECASE | re.DOTALL)
+    if inner:
+        text = inner.group(1)
+    columns = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part or '=>' in part:
+            continue
+        columns.append(part[1:-1].replace('""', '"') if part.startswith('"') and part.endswith('"') else part)
+    return columns
+
+def load_search_optimization(session, database, tables, max_concurrency=SEARCH_MAX_CONCURRENCY, recorder=None):
+    """Return {table_key: {'enabled', 'progress', 'full_text_columns'}} for (schema, table) tuples.
+    
+    SHOW TABLES reports which tables have search optimization, one query per schema, and
+    DESCRIBE SEARCH OPTIMIZATION lists the active FULL_TEXT columns of each enabled table.
+    full_text_columns contains '*' when the whole table is covered.
+    """
+    wanted = {format_table_key(schema, table) for schema, table in tables}
+    show_queries = {
+        schema: f"SHOW TABLES IN SCHEMA {qualified_name(database, schema)}"
+        for schema in sorted({schema for schema, _ in tables})
+    }
+    info = {}
+    for schema, result, _ in run_queries_concurrently(session, show_queries, max_concurrency=max_concurrency,
+                                                       recorder=recorder, stage='metadata.search_optimization'):
+        if isinstance(result, Exception):
+            raise result
+        for row in result:
+            table_key = format_table_key(row['schema_name'], row['name'])
+            if table_key in wanted:
+                info[table_key] = {
+                    'enabled': str(row['search_optimization']).upper() == 'ON',
+                    'progress': row['search_optimization_progress'],
+                    'full_text_columns': frozenset()
+                }
+    
+    describe_queries = {
+        table_key: f"DESCRIBE SEARCH OPTIMIZATION ON {qualified_name(database, *parse_table_key(table_key))}"
+        for table_key, table_info in info.items() if table_info['enabled']
+    }
+    for table_key, result, _ in run_queries_concurrently(session, describe_queries, max_concurrency=max_concurrency,
+                                                          recorder=recorder, stage='metadata.search_optimization'):
+        if isinstance(result, Exception):
+            continue  # enabled but not describable by this role; treated as not covering any column
+        info[table_key]['full_text_columns'] = frozenset(
+            column
+            for row in result
+            if str(row['method']).upper() == 'FULL_TEXT' and str(row['active']).lower() == 'true'
+            for column in parse_search_optimization_target(row['target'])
+        )
+    return info
+
+def load_primary_keys(session, database, recorder=None):
+    """Return {table_key: [column, ...]} with the declared primary key columns of a database's tables"""
+    primary_keys = {}
+    for row in sorted(collect_rows(session, f"SHOW PRIMARY KEYS IN DATABASE {quote_identifier(database)}",
+                                   recorder=recorder, stage='metadata.primary_keys'),
+                      key=lambda row: int(row['key_sequence'])):
+        primary_keys.setdefault(format_table_key(row['schema_name'], row['table_name']), []).append(row['column_name'])
+    return primary_keys
+
+def search_optimization_coverage(selected_columns, search_optimization, table_specs=(), table_columns=()):
+    """Return {table_key: 'full' | 'partial'} for tables whose searched columns have FULL_TEXT search optimization.
+    
+    Tables that table_specs (build_table_specs() output) searches with the wildcard clause search
+    every searchable column, not just the selected ones, so they are fully covered only when
+    FULL_TEXT is on '*' or on all of their searchable columns, given as (schema, table, column,
+    data_type) tuples in table_columns; without those they are at most partially covered.
+    """
+    searched = {}
+    for schema, table, column, _ in selected_columns:
+        searched.setdefault(format_table_key(schema, table), set()).add(column)
+    all_columns = {}
+    for schema, table, column, _ in table_columns:
+        all_columns.setdefault(format_table_key(schema, table), set()).add(column)
+    wildcard_tables = {format_table_key(schema, table) for schema, table, _, wildcard_reason in table_specs
+                       if wildcard_reason}
+    coverage = {}
+    for table_key, columns in searched.items():
+        covered = search_optimization.get(table_key, {}).get('full_text_columns')
+        if not covered:
+            continue
+        if table_key in wildcard_tables:
+            columns = all_columns.get(table_key)
+            fully_covered = '*' in covered or (columns is not None and columns <= covered)
+            columns = columns or searched[table_key]
+        else:
+            fully_covered = '*' in covered or columns <= covered
+        if fully_covered:
+            coverage[table_key] = 'full'
+        elif columns & covered:
+            coverage[table_key] = 'partial'
+    return coverage
+
+def load_query_stats(session, database, query_ids):
+    """Look up Snowflake execution statistics for queries run by this session"""
+    query = f"""
+    SELECT QUERY_ID, TOTAL_ELAPSED_TIME, COMPILATION_TIME, QUEUED_OVERLOAD_TIME, EXECUTION_TIME,
+           BYTES_SCANNED, PARTITIONS_SCANNED, PARTITIONS_TOTAL, ROWS_PRODUCED
+    FROM TABLE({quote_identifier(database)}.INFORMATION_SCHEMA.QUERY_HISTORY_BY_SESSION(RESULT_LIMIT => 10000))
+    WHERE QUERY_ID IN ({sql_list(query_ids)})
+    """
+    return session.sql(query).to_pandas()
+
+def normalize_search_string(search_string):
+    """SEARCH's default analyzer ignores case and extra whitespace, so equivalent terms share cache entries"""
+    return ' '.join(search_string.split()).casefold()
+
+def cancel_job(job):
+    """Cancel an async Snowflake query, ignoring jobs that already finished"""
+    try:
+        if not job.is_done():
+            job.cancel()
+    except Exception:
+        pass
+
+def run_queries_concurrently(session, queries, max_concurrency=SEARCH_MAX_CONCURRENCY,
+                             timeout=SEARCH_TABLE_TIMEOUT_SECONDS, job_registry=None, result_format='rows',
+                             recorder=None, stage='query'):
+    """Run queries ({key: sql} or {key: (sql, params)}) as async jobs with at most max_concurrency in flight.
+
+    Yields (key, result, elapsed_seconds) as each query finishes, where result is the
+    list of rows (or a pandas DataFrame when result_format is 'pandas', fetched through
+    Arrow without building Row objects) or the exception raised by that query. Queries running longer than
+    timeout seconds are cancelled and yield a TimeoutError. Jobs still running when
+    the generator is closed are cancelled. With a recorder, each query records a
+    '<stage>.execute' span (submit to completion) and a '<stage>.fetch' span (result
+    transfer and conversion), both tagged with the key and Snowflake query ID.
+    """
+    pending = deque(queries.items())
+    running = {}
+    min_wait, max_wait = SEARCH_POLL_INTERVAL_SECONDS
+    wait = min_wait
+    
+    try:
+        while pending or running:
+            # Keep the worker pool full
+            while pending and len(running) < max_concurrency:
+                key, query = pending.popleft()
+                query, params = query if isinstance(query, tuple) else (query, None)
+                started = time.monotonic()
+                try:
+                    if result_format == 'pandas':
+                        job = session.sql(query, params=params).to_pandas(block=False)
+                    else:
+                        job = session.sql(query, params=params).collect_nowait()
+                except Exception as submit_error:
+                    yield key, submit_error, time.monotonic() - started
+                    continue
+                running[key] = (job, started)
+                if job_registry is not None:
+                    job_registry.append(job)
+            
+            finished_any = False
+            for key, (job, started) in list(running.items()):
+                elapsed = time.monotonic() - started
+                if job.is_done():
+                    del running[key]
+                    fetch_started = time.perf_counter()
+                    try:
+                        result = job.result()
+                    except Exception as query_error:
+                        result = query_error
+                    if recorder is not None:
+                        recorder.record(f"{stage}.execute", elapsed, key=str(key), query_id=job.query_id,
+                                        error=isinstance(result, Exception))
+                        recorder.record(f"{stage}.fetch", time.perf_counter() - fetch_started, key=str(key),
+                                        query_id=job.query_id, rows=None if isinstance(result, Exception) else len(result))
+                    finished_any = True
+                    yield key, result, elapsed
+                elif timeout and elapsed > timeout:
+                    del running[key]
+                    cancel_job(job)
+                    if recorder is not None:
+                        recorder.record(f"{stage}.execute", elapsed, key=str(key), query_id=job.query_id, timed_out=True)
+                    finished_any = True
+                    yield key, TimeoutError(f"query cancelled after {timeout}s timeout"), elapsed
+            
+            # Back off while nothing completes so long searches don't flood status checks
+            if finished_any:
+                wait = min_wait
+            elif running:
+                time.sleep(wait)
+                wait = min(wait * 2, max_wait)
+    finally:
+        for job, _ in running.values():
+            cancel_job(job)
+
+def table_source(database, schema, table, sample_percent=None):
+    """FROM clause target for a search, with block sampling when the plan samples the table"""
+    source = qualified_name(database, schema, table)
+    if sample_percent:
+        source += f" SAMPLE SYSTEM ({sample_percent}) SEED ({SEARCH_SAMPLE_SEED})"
+    return source
+
+def build_projection(columns, key_columns=(), preview_chars=None):
+    """Build a SELECT list returning only key columns and the searched columns instead of every column.
+    
+    columns is a list of (column, data_type). Searched values are cut to preview_chars characters
+    on the server (semi-structured values as their JSON text), and ROW_KEY, the HASH(*) of the
+    row, lets build_indexed_rows_query() fetch the full row later.
+    """
+    select_list = ["HASH(*) AS ROW_KEY"] + [quote_identifier(column) for column in key_columns]
+    for column, data_type in columns:
+        if column in key_columns:
+            continue
+        value = quote_identifier(column)
+        if preview_chars:
+            if data_type not in ('VARCHAR', 'TEXT'):
+                value = f"TO_VARCHAR({value})"
+            value = f"LEFT({value}, {int(preview_chars)}) AS {quote_identifier(column)}"
+        select_list.append(value)
+    return ", ".join(select_list)
+
+def build_order_by(key_columns=()):
+    """ORDER BY list giving a table's result pages a stable order.
+    
+    Snowflake doesn't keep row order between statements, so LIMIT/OFFSET pages need one to avoid
+    repeating or skipping rows. Rows are ordered by the primary key columns, when declared, then by
+    HASH(*), which breaks ties between rows sharing a key (primary keys are not enforced).
+    """
+    return ", ".join([quote_identifier(column) for column in key_columns] + ["HASH(*)"])
+
+def build_search_query(database, schema, table, search_clause, search_string, limit=None, offset=0,
+                       sample_percent=None, bind=True, projection=None, order_by=None):
+    """Build the search query for one page of matches in a single table (all matches when limit is None).
+    
+    Returns (sql, params). The search string is a bind parameter, so a table's statement text is
+    the same for every search and Snowflake can reuse its compiled plan; with bind=False it is
+    inlined as an escaped literal instead, for statements such as COPY INTO that take no binds.
+    projection is a build_projection() SELECT list; every column is returned when it is None.
+    order_by is a build_order_by() list, needed for pages after the first to follow on from it;
+    without one, LIMIT returns whichever matches the warehouse finds first.
+    """
+    query = f"""
+    SELECT 
+        {sql_literal(schema)} as SCHEMA_NAME,
+        {sql_literal(table)} as TABLE_NAME,
+        {projection or '*'}
+    FROM {table_source(database, schema, table, sample_percent)}
+    WHERE SEARCH(({search_clause}), {'?' if bind else sql_literal(search_string)})
+    """
+    if order_by:
+        query += f"ORDER BY {order_by}\n"
+    if limit is not None:
+        query += f"LIMIT {limit} OFFSET {offset}\n"
+    return query, [search_string] if bind else []
+
+def to_results_page(df, search_clause, page, page_size, sample_percent=None, projection=None, order_by=None):
+    """Trim a fetch of page_size + 1 rows to one page and record paging state in df.attrs"""
+    has_more = len(df) > page_size
+    df = df.iloc[:page_size].reset_index(drop=True)
+    df.attrs.update({'search_clause': search_clause, 'sample_percent': sample_percent, 'projection': projection,
+                     'order_by': order_by, 'page': page, 'page_size': page_size, 'has_more': has_more})
+    return df
+
+def arrow_export_type(data_type):
+    """Parquet column type for a Snowpark data type, or None when it has no fixed mapping"""
+    type_name = type(data_type).__name__
+    if type_name == 'DecimalType':
+        return pa.int64() if data_type.scale == 0 else pa.float64()
+    if type_name == 'TimestampType':
+        time_zone = getattr(getattr(data_type, 'tz', None), 'value', 'default')
+        return pa.timestamp('ns', tz='UTC') if time_zone in ('ltz', 'tz') else pa.timestamp('ns')
+    return ARROW_EXPORT_TYPES.get(type_name)
+
+def arrow_export_schema(df, fields=()):
+    """Arrow schema for a Parquet export whose first chunk is df.
+    
+    Column types come from the result's Snowpark schema fields where they map to one, and from df
+    otherwise. Inferring them from the first chunk alone breaks on sparse columns: a column that is
+    NULL throughout that chunk gets Arrow's null type, which rejects the values of later chunks, so
+    such a column without a mapped type is written as text.
+    """
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    declared = [arrow_export_type(field.datatype) for field in fields]
+    if len(declared) != len(inferred):
+        declared = [None] * len(inferred)
+    return pa.schema([
+        pa.field(field.name, declared_type or (pa.string() if pa.types.is_null(field.type) else field.type))
+        for field, declared_type in zip(inferred, declared)
+    ])
+
+def write_export(frames, file_format, out, fields=()):
+    """Write an iterable of DataFrame chunks to the binary file object out, one chunk at a time.
+    
+    fields are the Snowpark schema fields of the result, used to type Parquet columns.
+    """
+    if file_format == 'Parquet':
+        writer = None
+        try:
+            for df in frames:
+                if writer is None:
+                    writer = pq.ParquetWriter(out, arrow_export_schema(df, fields))
+                writer.write_table(pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False))
+        finally:
+            if writer is not None:
+                writer.close()
+        return
+    
+    stream = gzip.GzipFile(fileobj=out, mode='wb') if file_format == 'CSV (gzip)' else out
+    header = True
+    for df in frames:
+        stream.write(df.to_csv(index=False, header=header).encode('utf-8'))
+        header = False
+    if stream is not out:
+        stream.close()
+
+def export_frames(session, search_results, table_key, all_rows):
+    """A table's results for export as (frames, fields): the loaded page, or every match streamed in batches.
+    
+    fields are the result's Snowpark schema fields for streamed exports, read from the statement's
+    metadata before any rows are fetched, and empty for the loaded page.
+    """
+    df = search_results['tables'][table_key]
+    if not all_rows:
+        return [df], ()
+    schema, table = parse_table_key(table_key)
+    query, params = build_search_query(search_results['database'], schema, table, df.attrs['search_clause'],
+                                       search_results['search_string'], sample_percent=df.attrs.get('sample_percent'))
+    result = session.sql(query, params=params)
+    return result.to_pandas_batches(), result.schema.fields
+
+def build_export_file(session, search_results, table_keys, file_format, all_rows=False):
+    """Build a download for the selected tables; several tables are packaged as a zip with one file per table.
+    
+    Returns (data, file_name, mime). Parts are written chunk by chunk to spooled temporary files, so
+    only the finished (compressed) file is held in memory.
+    """
+    extension, mime, _ = EXPORT_FORMATS[file_format]
+    timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+    search_string = search_results['search_string']
+    
+    if len(table_keys) == 1:
+        table_key = table_keys[0]
+        out = io.BytesIO()
+        frames, fields = export_frames(session, search_results, table_key, all_rows)
+        write_export(frames, file_format, out, fields)
+        file_name = file_name_part('search_results', *parse_table_key(table_key), search_string, timestamp)
+        return out.getvalue(), file_name + extension, mime
+    
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED if file_format == 'CSV' else zipfile.ZIP_STORED) as archive:
+        for table_key in table_keys:
+            with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as part:
+                frames, fields = export_frames(session, search_results, table_key, all_rows)
+                write_export(frames, file_format, part, fields)
+                part.seek(0)
+                with archive.open(f"{file_name_part(*parse_table_key(table_key))}{extension}", 'w') as member:
+                    shutil.copyfileobj(part, member)
+    return out.getvalue(), file_name_part('search_results_all', search_string, timestamp) + '.zip', 'application/zip'
+
+def is_stage_location(stage_location):
+    """Whether stage_location is a stage reference that can be placed in COPY INTO as written"""
+    return STAGE_LOCATION.fullmatch(stage_location) is not None
+
+def file_name_part(*names):
+    """Names joined with underscores, with any character that is unsafe in a file or stage path replaced"""
+    return FILE_NAME_UNSAFE.sub('_', '_'.join(names))
+
+def unload_to_stage(session, search_results, table_keys, stage_location, file_format,
+                    max_concurrency=SEARCH_MAX_CONCURRENCY):
+    """Unload every match of the selected tables to a stage with COPY INTO, bypassing the app process.
+    
+    Files are named after each table, with unsafe characters replaced; tables whose names
+    collapse to the same prefix get a numbered suffix so they don't overwrite each other.
+    Yields (table_key, rows unloaded | Exception, elapsed_seconds) as each unload finishes.
+    """
+    if not is_stage_location(stage_location):
+        raise ValueError(f"Stage location must look like @database.schema.stage/path, got '{stage_location}'")
+    _, _, copy_format = EXPORT_FORMATS[file_format]
+    stage_location = stage_location.rstrip('/')
+    copy_queries = {}
+    prefixes = set()
+    for table_key in table_keys:
+        schema, table = parse_table_key(table_key)
+        prefix = base_prefix = file_name_part(schema, table)
+        number = 1
+        while prefix in prefixes:
+            number += 1
+            prefix = f"{base_prefix}_{number}"
+        prefixes.add(prefix)
+        table_attrs = search_results['tables'][table_key].attrs
+        query, _ = build_search_query(search_results['database'], schema, table, table_attrs['search_clause'],
+                                      search_results['search_string'], sample_percent=table_attrs.get('sample_percent'),
+                                      bind=False)
+        copy_queries[table_key] = f"""
+        COPY INTO {stage_location}/{prefix}_
+        FROM ({query})
+        FILE_FORMAT = ({copy_format})
+        HEADER = TRUE
+        OVERWRITE = TRUE
+        """
+    
+    for table_key, result, elapsed in run_queries_concurrently(session, copy_queries, max_concurrency=max_concurrency):
+        if isinstance(result, Exception):
+            yield table_key, result, elapsed
+        else:
+            yield table_key, sum(row['rows_unloaded'] for row in result), elapsed
+
+def build_batched_search_query(database, search_string, table_specs, limit=SEARCH_PAGE_SIZE, order_by=None):
+    """Build one UNION ALL statement returning the match count and top matches of each table.
+    
+    table_specs is a list of (schema, table, search_clause, sample_percent). Rows are serialised with
+    OBJECT_CONSTRUCT_KEEP_NULL(*) so tables with different columns can share one result set.
+    order_by maps table keys to build_order_by() lists, so the rows returned are the first page
+    of build_search_query() with the same order. Returns (sql, params) with the search string
+    bound once per table.
+    """
+    branches = []
+    for schema, table, search_clause, sample_percent in table_specs:
+        table_order = (order_by or {}).get(format_table_key(schema, table))
+        order_clause = f"\n                ORDER BY {table_order}" if table_order else ""
+        branches.append(f"""
+            SELECT {sql_literal(schema)} AS SCHEMA_NAME, {sql_literal(table)} AS TABLE_NAME, MATCH_COUNT, ROW_DATA
+            FROM (
+                SELECT COUNT(*) OVER () AS MATCH_COUNT, OBJECT_CONSTRUCT_KEEP_NULL(*) AS ROW_DATA
+                FROM {table_source(database, schema, table, sample_percent)}
+                WHERE SEARCH(({search_clause}), ?){order_clause}
+                LIMIT {limit}
+            )""")
+    return "\nUNION ALL".join(branches), [search_string] * len(table_specs)
+
+def build_batched_search_queries(database, search_string, table_specs, limit=SEARCH_PAGE_SIZE,
+                                 max_tables=BATCH_MAX_TABLES, max_sql_chars=BATCH_MAX_SQL_CHARS, order_by=None):
+    """Split table_specs into chunks that each fit in one batched statement.
+    
+    Returns a list of ((sql, params), [table_key, ...]) in table order.
+    """
+    chunks = []
+    current = []
+    current_chars = 0
+    for spec in table_specs:
+        spec_chars = len(build_batched_search_query(database, search_string, [spec], limit, order_by)[0])
+        if current and (len(current) >= max_tables or current_chars + spec_chars > max_sql_chars):
+            chunks.append(current)
+            current = []
+            current_chars = 0
+        current.append(spec)
+        current_chars += spec_chars
+    if current:
+        chunks.append(current)
+    
+    return [
+        (build_batched_search_query(database, search_string, chunk, limit, order_by),
+         [format_table_key(spec[0], spec[1]) for spec in chunk])
+        for chunk in chunks
+    ]
+
+def split_batched_results(rows):
+    """Turn batched search rows back into {table_key: DataFrame}, keeping the match count in df.attrs"""
+    records = {}
+    match_counts = {}
+    for row in rows:
+        table_key = format_table_key(row['SCHEMA_NAME'], row['TABLE_NAME'])
+        record = {'SCHEMA_NAME': row['SCHEMA_NAME'], 'TABLE_NAME': row['TABLE_NAME']}
+        record.update(json.loads(row['ROW_DATA']))
+        records.setdefault(table_key, []).append(record)
+        match_counts[table_key] = row['MATCH_COUNT']
+    
+    table_results = {}
+    for table_key, table_records in records.items():
+        df = pd.DataFrame(table_records)
+        df.attrs['match_count'] = match_counts[table_key]
+        table_results[table_key] = df
+    return table_results
+
+def run_batched_search(session, database, search_string, table_specs, limit=SEARCH_PAGE_SIZE,
+                       max_concurrency=SEARCH_MAX_CONCURRENCY, timeout=SEARCH_TABLE_TIMEOUT_SECONDS,
+                       job_registry=None, recorder=None, order_by=None):
+    """Search many tables with a few UNION ALL statements instead of one query per table.
+    
+    Yields (table_key, DataFrame | None | Exception, elapsed_seconds) for every table. When a
+    batched statement fails, its tables are retried one by one so the error can be pinned
+    to the table that caused it. order_by is passed on to build_batched_search_query().
+    """
+    specs_by_key = {format_table_key(spec[0], spec[1]): spec for spec in table_specs}
+    batches = build_batched_search_queries(database, search_string, table_specs, limit, order_by=order_by)
+    batch_queries = {index: sql for index, (sql, _) in enumerate(batches)}
+    retry_queries = {}
+    
+    for index, result, elapsed in run_queries_concurrently(
+        session, batch_queries, max_concurrency=max_concurrency, timeout=timeout, job_registry=job_registry,
+        recorder=recorder, stage='search.batch'
+    ):
+        table_keys = batches[index][1]
+        if isinstance(result, Exception):
+            if len(table_keys) == 1:
+                yield table_keys[0], result, elapsed
+            else:
+                for table_key in table_keys:
+                    retry_queries[table_key] = build_batched_search_query(
+                        database, search_string, [specs_by_key[table_key]], limit, order_by
+                    )
+            continue
+        
+        split_started = time.perf_counter()
+        batch_results = split_batched_results(result)
+        if recorder is not None:
+            recorder.record('search.batch.split', time.perf_counter() - split_started, key=str(index), rows=len(result))
+        for table_key in table_keys:
+            yield table_key, batch_results.get(table_key), elapsed
+    
+    for table_key, result, elapsed in run_queries_concurrently(
+        session, retry_queries, max_concurrency=max_concurrency, timeout=timeout, job_registry=job_registry,
+        recorder=recorder, stage='search.batch'
+    ):
+        if isinstance(result, Exception):
+            yield table_key, result, elapsed
+        else:
+            yield table_key, split_batched_results(result).get(table_key), elapsed
+
+def build_match_summary_query(database, schema, table, search_clause, columns, search_string,
+                              sample_rows=SUMMARY_SAMPLE_ROWS, sample_percent=None):
+    """Build a query counting a table's matches in the warehouse instead of returning them.
+    
+    The single result row holds the total MATCH_COUNT, COLUMN_MATCHES_<n> with the rows matching
+    in the n-th of columns, and SAMPLE_ROWS, an array of at most sample_rows matching rows.
+    Returns (sql, params).
+    """
+    column_counts = "".join(
+        f",\n            COUNT_IF(SEARCH(({quote_identifier(column)}), ?)) AS COLUMN_MATCHES_{position}"
+        for position, column in enumerate(columns)
+    )
+    return f"""
+    WITH matches AS (
+        SELECT *
+        FROM {table_source(database, schema, table, sample_percent)}
+        WHERE SEARCH(({search_clause}), ?)
+    )
+    SELECT {sql_literal(schema)} AS SCHEMA_NAME, {sql_literal(table)} AS TABLE_NAME, counts.*, samples.SAMPLE_ROWS
+    FROM (
+        SELECT COUNT(*) AS MATCH_COUNT{column_counts}
+        FROM matches
+    ) counts
+    CROSS JOIN (
+        SELECT ARRAY_AGG(OBJECT_CONSTRUCT_KEEP_NULL(*)) AS SAMPLE_ROWS
+        FROM (SELECT * FROM matches LIMIT {sample_rows})
+    ) samples
+    """, [search_string] * (len(columns) + 1)
+
+def parse_match_summary(row, columns):
+    """Turn a match summary row into {'match_count', 'column_matches': {column: count}, 'samples': DataFrame}"""
+    samples = [{'SCHEMA_NAME': row['SCHEMA_NAME'], 'TABLE_NAME': row['TABLE_NAME'], **sample}
+               for sample in json.loads(row['SAMPLE_ROWS'] or '[]')]
+    return {
+        'match_count': int(row['MATCH_COUNT']),
+        'column_matches': {column: int(row[f"COLUMN_MATCHES_{position}"] or 0)
+                           for position, column in enumerate(columns)},
+        'samples': pd.DataFrame(samples)
+    }
+
+def run_match_summaries(session, database, search_string, summary_specs, sample_rows=SUMMARY_SAMPLE_ROWS,
+                        max_concurrency=SEARCH_MAX_CONCURRENCY, timeout=SEARCH_TABLE_TIMEOUT_SECONDS,
+                        job_registry=None, recorder=None):
+    """Count matches per table and per column without fetching the matching rows.
+    
+    summary_specs is a list of (schema, table, search_clause, sample_percent, columns). Yields
+    (table_key, parse_match_summary() dict | Exception, elapsed_seconds) as each table finishes.
+    """
+    columns_by_key = {}
+    queries = {}
+    for schema, table, search_clause, sample_percent, columns in summary_specs:
+        table_key = format_table_key(schema, table)
+        columns_by_key[table_key] = columns
+        queries[table_key] = build_match_summary_query(database, schema, table, search_clause, columns,
+                                                       search_string, sample_rows, sample_percent)
+    for table_key, result, elapsed in run_queries_concurrently(
+        session, queries, max_concurrency=max_concurrency, timeout=timeout, job_registry=job_registry,
+        recorder=recorder, stage='search.summary'
+    ):
+        if isinstance(result, Exception):
+            yield table_key, result, elapsed
+        else:
+            yield table_key, parse_match_summary(result[0], columns_by_key[table_key]), elapsed
+
+def unique_search_terms(terms):
+    """Strip terms and drop empty and repeated ones, keeping the first spelling in input order"""
+    unique_terms = {}
+    for term in terms:
+        term = term.strip().strip('"').strip()
+        if term:
+            # Matching ignores case, so terms differing only in case are searched once
+            unique_terms.setdefault(term.lower(), term)
+    return list(unique_terms.values())
+
+def parse_search_terms(text):
+    """Split pasted text into unique terms (one per line, or comma, semicolon or tab separated)"""
+    return unique_search_terms(SEARCH_TERM_SEPARATORS.split(text))
+
+def read_term_file(text, header=False):
+    """Parse an uploaded term list as CSV, so quoted values may contain the delimiter.
+    
+    The delimiter (comma, semicolon or tab) is sniffed from the start of the file; a file with
+    none is read as one term per line. Returns (column labels, rows): labels come from the
+    header row when header is set, else "Column 1", "Column 2", ...; blank rows are skipped.
+    """
+    try:
+        dialect = csv.Sniffer().sniff(text[:TERM_FILE_SNIFF_CHARS], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    rows = [row for row in csv.reader(io.StringIO(text), dialect) if any(cell.strip() for cell in row)]
+    labels = []
+    if header and rows:
+        labels = [label.strip() for label in rows.pop(0)]
+    width = max([len(labels)] + [len(row) for row in rows])
+    labels += [f"Column {position}" for position in range(len(labels) + 1, width + 1)]
+    return [label or f"Column {position}" for position, label in enumerate(labels, start=1)], rows
+
+def create_terms_table(session, terms, insert_rows=BATCH_TERMS_INSERT_ROWS):
+    """Load terms into a new temporary table in the session's current schema and return its name.
+    
+    The table holds TERM and TERM_KEY, the lower-cased term used for matching; terms are sent as
+    bind parameters, insert_rows per statement.
+    """
+    terms_table = quote_identifier(f"SEARCH_TERMS_{uuid.uuid4().hex[:12].upper()}")
+    session.sql(f"CREATE TEMPORARY TABLE {terms_table} (TERM VARCHAR, TERM_KEY VARCHAR)").collect()
+    for start in range(0, len(terms), insert_rows):
+        chunk = terms[start:start + insert_rows]
+        session.sql(f"""
+        INSERT INTO {terms_table} (TERM, TERM_KEY)
+        SELECT column1, LOWER(column1) FROM (VALUES {', '.join(['(?)'] * len(chunk))})
+        """, params=chunk).collect()
+    return terms_table
+
+def build_term_search_query(database, schema, table, columns, terms_table, limit=SEARCH_PAGE_SIZE):
+    """Build one query matching every term of terms_table against a table's columns at once.
+    
+    columns is a list of (column, data_type). A row matches a term when any column contains it as a
+    substring, ignoring case; each term is matched on its own, so no SEARCH prefilter narrows the rows
+    (its token matching would drop substring hits). Result rows are matching rows (at most limit) with MATCHED_TERMS, the array of
+    terms they contain, and TERM_COUNTS, an object of matching rows per term over the whole table.
+    """
+    conditions = []
+    for column, data_type in columns:
+        value = quote_identifier(column)
+        if data_type not in ('VARCHAR', 'TEXT'):
+            value = f"TO_VARCHAR({value})"
+        conditions.append(f"CONTAINS(LOWER({value}), t.TERM_KEY)")
+    conditions = "\n            OR ".join(conditions)
+    return f"""
+    WITH source_rows AS (
+        SELECT HASH(*) AS BATCH_ROW_KEY, {quote_identifier(table)}.*
+        FROM {qualified_name(database, schema, table)}
+    ),
+    hits AS (
+        SELECT r.BATCH_ROW_KEY, t.TERM
+        FROM source_rows r
+        JOIN {terms_table} t ON {conditions}
+    ),
+    matched AS (
+        SELECT BATCH_ROW_KEY, ARRAY_AGG(DISTINCT TERM) AS MATCHED_TERMS
+        FROM hits
+        GROUP BY BATCH_ROW_KEY
+    ),
+    term_counts AS (
+        SELECT OBJECT_AGG(TERM, TO_VARIANT(MATCHES)) AS TERM_COUNTS
+        FROM (SELECT TERM, COUNT(*) AS MATCHES FROM hits GROUP BY TERM)
+    )
+    SELECT {sql_literal(schema)} AS SCHEMA_NAME, {sql_literal(table)} AS TABLE_NAME, c.TERM_COUNTS, m.MATCHED_TERMS, r.*
+    FROM matched m
+    JOIN source_rows r ON r.BATCH_ROW_KEY = m.BATCH_ROW_KEY
+    CROSS JOIN term_counts c
+    LIMIT {limit}
+    """
+
+def split_term_search_results(df):
+    """Split a term search result into ({term: matching rows}, rows tagged with MATCHED_TERMS)"""
+    if df.empty:
+        return {}, None
+    term_counts = json.loads(df['TERM_COUNTS'].iloc[0])
+    df = df.drop(columns=['TERM_COUNTS', 'BATCH_ROW_KEY'])
+    df['MATCHED_TERMS'] = [', '.join(sorted(json.loads(terms))) for terms in df['MATCHED_TERMS']]
+    df.attrs['term_counts'] = {term: int(count) for term, count in term_counts.items()}
+    return df.attrs['term_counts'], df
+
+def run_term_search(session, database, terms, table_columns, limit=SEARCH_PAGE_SIZE,
+                    max_concurrency=SEARCH_MAX_CONCURRENCY, timeout=SEARCH_TABLE_TIMEOUT_SECONDS,
+                    job_registry=None, recorder=None):
+    """Search many terms at once: load them into a temporary table, then run one join query per table.
+    
+    table_columns maps (schema, table) to [(column, data_type)]. Yields (table_key, ({term: rows},
+    matching rows DataFrame | None) | Exception, elapsed_seconds) as each table finishes; the
+    temporary table is dropped when the search ends.
+    """
+    terms_table = create_terms_table(session, terms)
+    try:
+        queries = {
+            format_table_key(schema, table): build_term_search_query(database, schema, table, columns, terms_table,
+                                                                     limit)
+            for (schema, table), columns in table_columns.items()
+        }
+        for table_key, result, elapsed in run_queries_concurrently(
+            session, queries, max_concurrency=max_concurrency, timeout=timeout, job_registry=job_registry,
+            result_format='pandas', recorder=recorder, stage='search.terms'
+        ):
+            yield table_key, result if isinstance(result, Exception) else split_term_search_results(result), elapsed
+    finally:
+        session.sql(f"DROP TABLE IF EXISTS {terms_table}").collect()
+
+def build_term_hit_matrix(terms, term_counts):
+    """Term x table matrix of matching rows from {table_key: {term: rows}}, terms in input order"""
+    return pd.DataFrame(
+        {table_key: [counts.get(term, 0) for term in terms] for table_key, counts in term_counts.items()},
+        index=pd.Index(terms, name='Term'),
+        dtype='int64'
+    )
+
+def build_table_specs(selected_columns, force_wildcard=False):
+    """Group selected columns by table and choose each table's SEARCH clause.
+    
+    Returns [(schema, table, search_clause, wildcard_reason)] in selection order, where
+    wildcard_reason is 'forced', 'many columns' or None when specific columns are searched.
+    """
+    tables_columns = {}
+    for schema, table, column, data_type in selected_columns:
+        tables_columns.setdefault((schema, table), []).append(column)
+    
+    table_specs = []
+    for (schema, table), columns in tables_columns.items():
+        # Use wildcard syntax if forced, or if there are many columns (> 15) to improve performance 
+        # and avoid "too many columns" errors
+        if force_wildcard:
+            table_specs.append((schema, table, f"{quote_identifier(table)}.*", 'forced'))
+        elif len(columns) > 15:
+            table_specs.append((schema, table, f"{quote_identifier(table)}.*", 'many columns'))
+        else:
+            table_specs.append((schema, table, ', '.join(map(quote_identifier, columns)), None))
+    return table_specs
+
+def build_search_plan(table_specs, table_stats, byte_budget=None, sample_over_bytes=None,
+                      sample_percent=SEARCH_SAMPLE_PERCENT, search_optimization=None):
+    """Build a search plan for build_table_specs() output from load_table_stats() statistics.
+    
+    Tables are ordered smallest first with their estimated bytes scanned. Tables larger than
+    sample_over_bytes are block-sampled, and tables that would push the estimated total past
+    byte_budget are skipped. Tables without statistics run last with an unknown estimate.
+    
+    search_optimization is search_optimization_coverage() output. Fully covered tables run
+    first and are never sampled or skipped, since SEARCH prunes them through the index
+    instead of scanning the estimated bytes.
+    """
+    search_optimization = search_optimization or {}
+    plan = []
+    for schema, table, search_clause, wildcard_reason in table_specs:
+        table_key = format_table_key(schema, table)
+        stats = table_stats.get(table_key, {})
+        table_bytes = stats.get('bytes')
+        coverage = search_optimization.get(table_key)
+        sampled = (bool(sample_over_bytes) and coverage != 'full'
+                   and table_bytes is not None and table_bytes > sample_over_bytes)
+        plan.append({
+            'table_key': table_key,
+            'schema': schema,
+            'table': table,
+            'search_clause': search_clause,
+            'wildcard_reason': wildcard_reason,
+            'row_count': stats.get('row_count'),
+            'bytes': table_bytes,
+            'data_version': stats.get('last_altered'),
+            'sample_percent': sample_percent if sampled else None,
+            'estimated_bytes': None if table_bytes is None else table_bytes * (sample_percent if sampled else 100) / 100,
+            'search_optimization': coverage,
+            'skip_reason': None
+        })
+    
+    plan.sort(key=lambda entry: (entry['search_optimization'] != 'full', entry['estimated_bytes'] is None,
+                                 entry['estimated_bytes'] or 0))
+    
+    if byte_budget:
+        planned_bytes = 0
+        for entry in plan:
+            if entry['estimated_bytes'] is None or entry['search_optimization'] == 'full':
+                continue
+            if planned_bytes + entry['estimated_bytes'] > byte_budget:
+                entry['skip_reason'] = 'over scan budget'
+            else:
+                planned_bytes += entry['estimated_bytes']
+    return plan
+
+def search_index_state_table(index_table):
+    """Name of the table holding an index table's per-table watermarks"""
+    if not SEARCH_INDEX_NAME.fullmatch(index_table):
+        raise ValueError(f"Search index table must be named DATABASE.SCHEMA.TABLE, got '{index_table}'")
+    return index_table + SEARCH_INDEX_STATE_SUFFIX
+
+def build_search_index_ddl(index_table):
+    """CREATE statements for a search index table and its watermark table"""
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {index_table} (
+            TABLE_CATALOG VARCHAR, TABLE_SCHEMA VARCHAR, TABLE_NAME VARCHAR, COLUMN_NAME VARCHAR,
+            ROW_KEY NUMBER, VALUE VARCHAR
+        ) CLUSTER BY (TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME)
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS {search_index_state_table(index_table)} (
+            TABLE_CATALOG VARCHAR, TABLE_SCHEMA VARCHAR, TABLE_NAME VARCHAR, COLUMN_LIST VARCHAR,
+            LAST_ALTERED VARCHAR, INDEXED_AT VARCHAR
+        )
+        """
+    ]
+
+def load_search_index_state(session, index_table, database, recorder=None):
+    """Return {table_key: {'columns', 'last_altered', 'indexed_at'}} for the tables of database in an index"""
+    query = f"""
+    SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_LIST, LAST_ALTERED, INDEXED_AT
+    FROM {search_index_state_table(index_table)}
+    WHERE TABLE_CATALOG = {sql_literal(database)}
+    """
+    return {
+        format_table_key(row['TABLE_SCHEMA'], row['TABLE_NAME']): {
+            'columns': frozenset(json.loads(row['COLUMN_LIST'])),
+            'last_altered': row['LAST_ALTERED'],
+            'indexed_at': row['INDEXED_AT']
+        }
+        for row in collect_rows(session, query, recorder, 'index.state')
+    }
+
+def build_search_index_refresh(index_table, database, schema, table, columns, last_altered):
+    """Statements bringing one table's index entries up to date with its current rows, run as one transaction.
+    
+    Rows are keyed by HASH(*), computed in a single scan of the table and unpivoted into one entry
+    per indexed column. One MERGE then compares those entries with the table's current index
+    entries: entries of deleted or modified rows and of columns no longer indexed are removed and
+    new entries inserted, so unchanged rows are never rewritten. The watermark row is replaced in
+    the same transaction, so a refresh that fails part way leaves both untouched.
+    """
+    source = qualified_name(database, schema, table)
+    table_filter = (f"TABLE_CATALOG = {sql_literal(database)} AND TABLE_SCHEMA = {sql_literal(schema)} "
+                    f"AND TABLE_NAME = {sql_literal(table)}")
+    column_names = ", ".join(f"({sql_literal(column)})" for column, _ in columns)
+    column_values = "\n                    ".join(
+        f"WHEN {sql_literal(column)} THEN {value}"
+        for column, data_type in columns
+        for value in [f"source_row.{quote_identifier(column)}" if data_type in ('VARCHAR', 'TEXT')
+                      else f"TO_JSON(source_row.{quote_identifier(column)})"]
+    )
+    state_table = search_index_state_table(index_table)
+    return [
+        "BEGIN",
+        f"""
+        MERGE INTO {index_table} AS entries
+        USING (
+            WITH source_rows AS (
+                SELECT HASH(*) AS SEARCH_INDEX_ROW_KEY, {quote_identifier(table)}.* FROM {source}
+            ),
+            row_values AS (
+                SELECT indexed_column.column1 AS COLUMN_NAME, source_row.SEARCH_INDEX_ROW_KEY AS ROW_KEY,
+                    CASE indexed_column.column1
+                    {column_values}
+                    END AS VALUE
+                FROM source_rows source_row
+                CROSS JOIN (VALUES {column_names}) indexed_column
+            )
+            SELECT COLUMN_NAME, ROW_KEY, MAX(VALUE) AS VALUE, MAX(VALUE) IS NULL AS IS_STALE
+            FROM (
+                SELECT DISTINCT COLUMN_NAME, ROW_KEY, VALUE FROM row_values WHERE VALUE IS NOT NULL
+                UNION ALL
+                SELECT DISTINCT COLUMN_NAME, ROW_KEY, NULL FROM {index_table} WHERE {table_filter}
+            )
+            GROUP BY COLUMN_NAME, ROW_KEY
+            HAVING COUNT(*) = 1
+        ) changes
+        ON entries.TABLE_CATALOG = {sql_literal(database)} AND entries.TABLE_SCHEMA = {sql_literal(schema)}
+           AND entries.TABLE_NAME = {sql_literal(table)}
+           AND entries.COLUMN_NAME = changes.COLUMN_NAME AND entries.ROW_KEY = changes.ROW_KEY
+        WHEN MATCHED AND changes.IS_STALE THEN DELETE
+        WHEN NOT MATCHED AND NOT changes.IS_STALE THEN
+            INSERT (TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, ROW_KEY, VALUE)
+            VALUES ({sql_literal(database)}, {sql_literal(schema)}, {sql_literal(table)},
+                    changes.COLUMN_NAME, changes.ROW_KEY, changes.VALUE)
+        """,
+        f"DELETE FROM {state_table} WHERE {table_filter}",
+        f"""
+        INSERT INTO {state_table} (TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME, COLUMN_LIST, LAST_ALTERED, INDEXED_AT)
+        VALUES ({sql_literal(database)}, {sql_literal(schema)}, {sql_literal(table)},
+                {sql_literal(json.dumps([column for column, _ in columns]))}, {sql_literal(last_altered)},
+                {sql_literal(time.strftime('%Y-%m-%d %H:%M:%S'))})
+        """,
+        "COMMIT"
+    ]
+
+def refresh_search_index(session, index_table, database, columns, table_stats, state, force=False, recorder=None):
+    """Bring the index entries of every table in columns (load_columns() tuples) up to date.
+    
+    Tables whose LAST_ALTERED (from load_table_stats()) and column set match their watermark
+    in state (from load_search_index_state()) are skipped unless force is set. Yields
+    (table_key, 'refreshed' | 'up to date' | Exception, elapsed_seconds) per table.
+    """
+    for statement in build_search_index_ddl(index_table):
+        collect_rows(session, statement, recorder, 'index.ddl')
+    
+    for (schema, table), table_columns in itertools.groupby(sorted(columns, key=lambda column: column[:2]),
+                                                            key=lambda column: column[:2]):
+        table_columns = [(column, data_type) for _, _, column, data_type in table_columns]
+        table_key = format_table_key(schema, table)
+        last_altered = table_stats.get(table_key, {}).get('last_altered')
+        watermark = state.get(table_key)
+        if (not force and watermark is not None and last_altered is not None
+                and watermark['last_altered'] == last_altered
+                and watermark['columns'] == {column for column, _ in table_columns}):
+            yield table_key, 'up to date', 0.0
+            continue
+        started = time.monotonic()
+        try:
+            for statement in build_search_index_refresh(index_table, database, schema, table, table_columns,
+                                                        last_altered):
+                collect_rows(session, statement, recorder, 'index.refresh')
+        except Exception as refresh_error:
+            collect_rows(session, "ROLLBACK", recorder, 'index.refresh')
+            yield table_key, refresh_error, time.monotonic() - started
+            continue
+        yield table_key, 'refreshed', time.monotonic() - started
+
+def index_search_columns(planned, selected_columns, state, table_columns=()):
+    """Return {table_key: [column]} to look up in a search index for the plan entries it can answer.
+    
+    A table is answered from the index only when it was indexed (state from
+    load_search_index_state()) at its current data_version and with every column its search
+    looks in: the selected columns, or for wildcard entries every searchable column, given as
+    (schema, table, column, data_type) tuples in table_columns. Wildcard tables whose columns
+    are not given are left to be searched directly.
+    """
+    searched = {}
+    for schema, table, column, _ in selected_columns:
+        searched.setdefault(format_table_key(schema, table), []).append(column)
+    all_columns = {}
+    for schema, table, column, _ in table_columns:
+        all_columns.setdefault(format_table_key(schema, table), []).append(column)
+    lookups = {}
+    for entry in planned:
+        watermark = state.get(entry['table_key'])
+        if (watermark is None or entry['data_version'] is None
+                or watermark['last_altered'] != entry['data_version']):
+            continue
+        columns = (all_columns if entry['wildcard_reason'] else searched).get(entry['table_key'])
+        if columns and watermark['columns'].issuperset(columns):
+            lookups[entry['table_key']] = columns
+    return lookups
+
+def build_index_search_query(index_table, database, search_string, table_columns, limit):
+    """Look up matches for (schema, table, column) tuples in a search index, at most limit entries per table.
+    
+    Returns (sql, params) with the search string bound as a parameter.
+    """
+    column_values = ", ".join(f"({sql_literal(schema)}, {sql_literal(table)}, {sql_literal(column)})"
+                              for schema, table, column in table_columns)
+    index_name = index_table.rsplit('.', 1)[1]
+    return f"""
+    SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, ROW_KEY, VALUE
+    FROM (
+        SELECT {index_name}.TABLE_SCHEMA, {index_name}.TABLE_NAME, {index_name}.COLUMN_NAME,
+               {index_name}.ROW_KEY, {index_name}.VALUE,
+               ROW_NUMBER() OVER (PARTITION BY {index_name}.TABLE_SCHEMA, {index_name}.TABLE_NAME
+                                  ORDER BY {index_name}.ROW_KEY, {index_name}.COLUMN_NAME) AS HIT_NUMBER
+        FROM {index_table}
+        JOIN (VALUES {column_values}) v
+            ON {index_name}.TABLE_SCHEMA = v.column1 AND {index_name}.TABLE_NAME = v.column2
+           AND {index_name}.COLUMN_NAME = v.column3
+        WHERE {index_name}.TABLE_CATALOG = {sql_literal(database)} AND SEARCH(({index_name}.VALUE), ?)
+    )
+    WHERE HIT_NUMBER <= {limit}
+    ORDER BY TABLE_SCHEMA, TABLE_NAME, HIT_NUMBER
+    """, [search_string]
+
+def run_index_search(session, index_table, database, search_string, table_columns, limit=SEARCH_PAGE_SIZE,
+                     recorder=None):
+    """Search many tables with one index lookup, returning {table_key: DataFrame of COLUMN_NAME, ROW_KEY, VALUE}"""
+    query, params = build_index_search_query(index_table, database, search_string, table_columns, limit)
+    if recorder is None:
+        hits = session.sql(query, params=params).to_pandas()
+    else:
+        with recorder.span('index.search', tables=len({column[:2] for column in table_columns})) as span_fields:
+            hits = session.sql(query, params=params).to_pandas()
+            span_fields['rows'] = len(hits)
+    return {
+        format_table_key(schema, table): table_hits[['COLUMN_NAME', 'ROW_KEY', 'VALUE']].reset_index(drop=True)
+        for (schema, table), table_hits in hits.groupby(['TABLE_SCHEMA', 'TABLE_NAME'], sort=False)
+    }
+
+def build_indexed_rows_query(database, schema, table, row_keys, search_clause=None, search_string=None,
+                             key_values=None):
+    """Fetch full rows by their HASH(*) row keys (search index hits or trimmed results).
+    
+    With search_clause and search_string, only rows the search matches are hashed, so search
+    optimization can prune instead of every row being hashed; key_values ({column: value} of a
+    declared primary key) narrows them further. Returns (sql, params) with the search string and
+    key values bound as parameters.
+    """
+    key_list = ", ".join(str(int(row_key)) for row_key in sorted(set(row_keys)))
+    conditions = []
+    params = []
+    if search_clause and search_string is not None:
+        conditions.append(f"SEARCH(({search_clause}), ?)")
+        params.append(search_string)
+    for column, value in (key_values or {}).items():
+        conditions.append(f"{quote_identifier(column)} = ?")
+        params.append(value)
+    where_clause = f"\n          WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"""
+    SELECT 
+        {sql_literal(schema)} as SCHEMA_NAME,
+        {sql_literal(table)} as TABLE_NAME,
+        *
+    FROM (SELECT HASH(*) AS ROW_KEY, {quote_identifier(table)}.*
+          FROM {qualified_name(database, schema, table)}{where_clause})
+    WHERE ROW_KEY IN ({key_list})
+    """, params
+
+class SearchHistory:
+    """Thread-safe record of executed searches: per table, how often it was searched, the time
+    spent and how often each column was searched. Shared by every session of the app."""
+    
+    def __init__(self, max_tables=SEARCH_HISTORY_MAX_TABLES):
+        self.max_tables = max_tables
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def record(self, database, schema, table, columns, seconds):
+        """Count one executed search of the given columns of database.schema.table"""
+        with self._lock:
+            entry = self._tables.pop((database, schema, table), None)
+            if entry is None:
+                entry = {'searches': 0, 'seconds': 0.0, 'columns': {}}
+            entry['searches'] += 1
+            entry['seconds'] += seconds
+            for column in columns:
+                entry['columns'][column] = entry['columns'].get(column, 0) + 1
+            self._tables[(database, schema, table)] = entry
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+    
+    def top_tables(self, min_searches=1):
+        """Return [(database, schema, table, searches, seconds, {column: count})], most searched first"""
+        with self._lock:
+            rows = [(database, schema, table, entry['searches'], entry['seconds'], dict(entry['columns']))
+                    for (database, schema, table), entry in self._tables.items()
+                    if entry['searches'] >= min_searches]
+        return sorted(rows, key=lambda row: (-row[3], -row[4]))
+    
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+def build_search_optimization_statements(history, search_optimization, max_columns=SEARCH_OPTIMIZATION_MAX_COLUMNS):
+    """ALTER TABLE statements adding FULL_TEXT search optimization for SearchHistory.top_tables() rows.
+    
+    Each table gets its most searched columns (up to max_columns) that no active FULL_TEXT
+    index covers yet; search_optimization maps database to load_search_optimization() output.
+    Returns [(database, schema, table, columns, statement)].
+    """
+    statements = []
+    for database, schema, table, _, _, column_counts in history:
+        covered = search_optimization.get(database, {}).get(format_table_key(schema, table), {}).get('full_text_columns', ())
+        if '*' in covered:
+            continue
+        columns = [column for column, _ in sorted(column_counts.items(), key=lambda item: (-item[1], item[0]))
+                   if column not in covered][:max_columns]
+        if columns:
+            statements.append((database, schema, table, columns,
+                               f"ALTER TABLE {qualified_name(database, schema, table)} ADD SEARCH OPTIMIZATION "
+                               f"ON FULL_TEXT({', '.join(map(quote_identifier, columns))})"))
+    return statements
+
+def parse_name_patterns(text):
+    """Split a comma-separated list of name patterns, where * matches any run of characters and ? one character"""
+    return [pattern.strip() for pattern in text.split(',') if pattern.strip()]
+
+def filter_names(names, include=(), exclude=()):
+    """Names matching any include pattern (all names when there are none) and no exclude pattern, ignoring case"""
+    def matches(name, patterns):
+        return any(fnmatch.fnmatchcase(name.upper(), pattern.upper()) for pattern in patterns)
+    return [name for name in names if (not include or matches(name, include)) and not matches(name, exclude)]
+
+def like_pattern(pattern):
+    """SQL string literal for a * / ? name pattern, for use with ILIKE ... ESCAPE '^'"""
+    escaped = pattern.replace('^', '^^').replace('%', '^%').replace('_', '^_')
+    return sql_literal(escaped.replace('*', '%').replace('?', '_'))
+
+def name_pattern_conditions(column, include=(), exclude=()):
+    """AND-ed WHERE conditions applying include and exclude name patterns to a column"""
+    conditions = ""
+    if include:
+        conditions += f"\n    AND {column} ILIKE ANY ({', '.join(map(like_pattern, include))}) ESCAPE '^'"
+    if exclude:
+        conditions += f"\n    AND NOT {column} ILIKE ANY ({', '.join(map(like_pattern, exclude))}) ESCAPE '^'"
+    return conditions
+
+def build_database_columns_query(database, name_filters):
+    """Searchable columns of every base table in one database, restricted by schema and table patterns.
+    
+    name_filters maps 'schemas' and 'tables' to (include, exclude) pattern lists.
+    """
+    name_conditions = (name_pattern_conditions('c.TABLE_SCHEMA', *name_filters['schemas'])
+                       + name_pattern_conditions('c.TABLE_NAME', *name_filters['tables']))
+    return f"""
+    SELECT {sql_literal(database)} AS TABLE_CATALOG, c.TABLE_SCHEMA, c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE
+    FROM {quote_identifier(database)}.INFORMATION_SCHEMA.COLUMNS c
+    JOIN {quote_identifier(database)}.INFORMATION_SCHEMA.TABLES t
+        ON c.TABLE_SCHEMA = t.TABLE_SCHEMA AND c.TABLE_NAME = t.TABLE_NAME
+    WHERE t.TABLE_TYPE = 'BASE TABLE'
+    AND c.TABLE_SCHEMA <> 'INFORMATION_SCHEMA'
+    AND c.DATA_TYPE IN ({sql_list(SEARCHABLE_DATA_TYPES)}){name_conditions}
+    ORDER BY c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION
+    """
+
+def build_account_columns_query(databases, name_filters):
+    """Searchable columns of every base table in the given databases from SNOWFLAKE.ACCOUNT_USAGE, in one query"""
+    name_conditions = (name_pattern_conditions('c.TABLE_SCHEMA', *name_filters['schemas'])
+                       + name_pattern_conditions('c.TABLE_NAME', *name_filters['tables']))
+    return f"""
+    SELECT c.TABLE_CATALOG, c.TABLE_SCHEMA, c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE
+    FROM SNOWFLAKE.ACCOUNT_USAGE.COLUMNS c
+    JOIN SNOWFLAKE.ACCOUNT_USAGE.TABLES t
+        ON c.TABLE_ID = t.TABLE_ID
+    WHERE c.DELETED IS NULL AND t.DELETED IS NULL
+    AND t.TABLE_TYPE = 'BASE TABLE'
+    AND c.TABLE_CATALOG IN ({sql_list(databases)})
+    AND c.TABLE_SCHEMA <> 'INFORMATION_SCHEMA'
+    AND c.DATA_TYPE IN ({sql_list(SEARCHABLE_DATA_TYPES)}){name_conditions}
+    ORDER BY c.TABLE_CATALOG, c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION
+    """
+
+def discover_account_columns(session, databases, name_filters, use_account_usage=False,
+                             max_concurrency=SEARCH_MAX_CONCURRENCY, recorder=None):
+    """Searchable columns across databases as (database, schema, table, column, data_type) tuples.
+    
+    Reads SNOWFLAKE.ACCOUNT_USAGE.COLUMNS in one query (which can lag by up to a few hours), or
+    queries each database's INFORMATION_SCHEMA concurrently. Returns (columns, {database: Exception})
+    so one unreadable database doesn't stop the others.
+    """
+    if use_account_usage:
+        queries = {'ACCOUNT_USAGE': build_account_columns_query(databases, name_filters)}
+    else:
+        queries = {database: build_database_columns_query(database, name_filters) for database in databases}
+    
+    database_rows = {}
+    errors = {}
+    for key, result, _ in run_queries_concurrently(session, queries, max_concurrency=max_concurrency,
+                                                   recorder=recorder, stage='account.discover'):
+        if isinstance(result, Exception):
+            errors[key] = result
+        else:
+            database_rows[key] = result
+    
+    columns = [(sys.intern(row['TABLE_CATALOG']), sys.intern(row['TABLE_SCHEMA']), sys.intern(row['TABLE_NAME']),
+                row['COLUMN_NAME'], sys.intern(row['DATA_TYPE']))
+               for key in sorted(database_rows) for row in database_rows[key]]
+    return columns, errors
+
+def build_account_table_specs(columns, force_wildcard=False):
+    """build_table_specs() for (database, schema, table, column, data_type) tuples from several databases.
+    
+    Returns [(database, schema, table, search_clause, wildcard_reason)].
+    """
+    database_columns = {}
+    for database, schema, table, column, data_type in columns:
+        database_columns.setdefault(database, []).append((schema, table, column, data_type))
+    return [(database,) + spec for database, selected in database_columns.items()
+            for spec in build_table_specs(selected, force_wildcard)]
+
+def run_account_search(session, search_string, account_specs, page_size=SEARCH_PAGE_SIZE,
+                       max_concurrency=SEARCH_MAX_CONCURRENCY, timeout=SEARCH_TABLE_TIMEOUT_SECONDS,
+                       job_registry=None, recorder=None):
+    """Search tables from any number of databases through one pool bounded by max_concurrency.
+    
+    Yields ((database, schema, table), first results page | None | Exception, elapsed_seconds)
+    as each table finishes.
+    """
+    search_clauses = {(database, schema, table): search_clause
+                      for database, schema, table, search_clause, _ in account_specs}
+    queries = {
+        key: build_search_query(*key, search_clause, search_string, limit=page_size + 1)
+        for key, search_clause in search_clauses.items()
+    }
+    for key, result, elapsed in run_queries_concurrently(
+        session, queries, max_concurrency=max_concurrency, timeout=timeout, job_registry=job_registry,
+        result_format='pandas', recorder=recorder, stage='account.search'
+    ):
+        if isinstance(result, Exception) or result.empty:
+            yield key, (result if isinstance(result, Exception) else None), elapsed
+        else:
+            yield key, to_results_page(result, search_clauses[key], 0, page_size), elapsed
+
+def quote_identifier(name):
+    """Double-quoted identifier matching name exactly, whatever its case or characters"""
+    return '"' + name.replace('"', '""') + '"'
+
+def qualified_name(*parts):
+    """Dotted name (database.schema.table or a prefix of it) with every part quoted"""
+    return '.'.join(map(quote_identifier, parts))
+
+def sql_literal(value):
+    """Single-quoted SQL string literal; Snowflake reads backslashes in literals as escapes"""
+    return "'" + str(value).replace('\\', '\\\\').replace("'", "''") + "'"
+
+def sql_list(values):
+    """Comma-separated string literals for an IN list"""
+    return ', '.join(map(sql_literal, values))
+
+def identifier_label(name):
+    """Name as shown in table keys and labels, double-quoted when it isn't a plain identifier"""
+    if SIMPLE_IDENTIFIER.fullmatch(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+def format_table_key(schema, table):
+    """Key and display name for a table; names containing dots are quoted so the key stays unambiguous"""
+    return f"{identifier_label(schema)}.{identifier_label(table)}"
+
+def parse_table_key(table_key):
+    """Split a key from format_table_key back into (schema, table)"""
+    schema, table = (
+        match.group(2) if match.group(1) is None else match.group(1).replace('""', '"')
+        for match in TABLE_KEY_PART.finditer(table_key)
+    )
+    return schema, table
+
+def column_label(schema, table, column, data_type):
+    """Display label for a column in the column picker"""
+    return f"{format_table_key(schema, table)}.{identifier_label(column)} ({data_type})"
+
+class LabelIndex:
+    """Display labels for a list of metadata tuples, built once per metadata load.
+    
+    Maps labels to tuples in constant time, and filters labels for type-ahead search without
+    rebuilding them. Besides the label list the pickers need, it keeps one dict from label to
+    position and one casefolded string of every label, with an array of where each starts, rather
+    than a second string object per label; labels for tuples are formatted again on demand.
+    """
+    
+    def __init__(self, keys, format_label):
+        self.keys = keys
+        self.labels = [format_label(*key) for key in keys]
+        self._format_label = format_label
+        self._label_positions = {label: position for position, label in enumerate(self.labels)}
+        # Labels are separated by NUL, which can't occur in typed text, so a match never spans two labels;
+        # offsets come from the casefolded labels, since casefolding can change a label's length
+        folded = [label.casefold() for label in self.labels]
+        self._folded = '\0'.join(folded)
+        self._starts = array('q', itertools.accumulate((len(label) + 1 for label in folded[:-1]), initial=0))
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def __contains__(self, label):
+        return label in self._label_positions
+    
+    def keys_for(self, labels):
+        """Tuples for the given labels, skipping labels no longer in the index"""
+        return [self.keys[self._label_positions[label]] for label in labels if label in self._label_positions]
+    
+    def labels_for(self, keys):
+        """Labels for the given tuples, skipping tuples no longer in the index"""
+        labels = (self._format_label(*key) for key in keys)
+        return [label for label in labels if label in self._label_positions]
+    
+    def filter(self, text, limit=None):
+        """Labels containing every whitespace-separated fragment of text, ignoring case, in list order"""
+        fragments = sorted(text.casefold().split(), key=len, reverse=True)
+        if not fragments:
+            return self.labels[:limit]
+        matches = []
+        # Find labels containing the longest fragment, then check the others within each of them
+        found = self._folded.find(fragments[0])
+        while found != -1 and (limit is None or len(matches) < limit):
+            position = bisect.bisect_right(self._starts, found) - 1
+            end = self._starts[position + 1] - 1 if position + 1 < len(self._starts) else len(self._folded)
+            if all(self._folded.find(fragment, self._starts[position], end) != -1 for fragment in fragments[1:]):
+                matches.append(self.labels[position])
+            found = self._folded.find(fragments[0], end + 1) if end < len(self._folded) else -1
+        return matches
+
+def format_bytes(num_bytes):
+    """Human-readable size for plan and cache displays"""
+    if num_bytes is None:
+        return "unknown"
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if num_bytes < 1024 or unit == 'TB':
+            return f"{num_bytes:,.0f} {unit}" if unit == 'B' else f"{num_bytes:,.1f} {unit}"
+        num_bytes /= 1024
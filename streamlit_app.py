@@ -1,10 +1,42 @@
+import csv
+import itertools
+import time
+
 import streamlit as st
 import pandas as pd
 from snowflake.snowpark.context import get_active_session
 
+from data_access import (
+    ACCOUNT_SEARCH_MAX_TABLES, BATCH_TERMS_MAX, EXPORT_FORMATS, RESULT_PREVIEW_CHARS, SEARCH_MAX_CONCURRENCY, SEARCH_PAGE_SIZE, SEARCH_SAMPLE_PERCENT,
+    SEARCH_TABLE_TIMEOUT_SECONDS, SUMMARY_SAMPLE_ROWS, CatalogPrefetcher, LabelIndex, PerfRecorder, SearchHistory, TTLCache,
+    build_export_file,
+    build_search_plan, build_account_table_specs, build_projection, build_term_hit_matrix, build_indexed_rows_query, build_search_optimization_statements,
+    build_order_by, build_search_query, build_table_specs, cancel_job, column_label, dataframe_size, discover_account_columns,
+    filter_names, format_bytes, format_table_key, index_search_columns, is_stage_location, load_columns, load_databases, load_primary_keys, load_query_stats, load_schemas,
+    load_search_index_state, load_search_optimization, load_table_stats, load_tables, normalize_search_string,
+    parse_name_patterns, parse_search_terms, parse_table_key, read_term_file, refresh_search_index, run_account_search, run_batched_search,
+    run_index_search, run_match_summaries, run_queries_concurrently, run_term_search, search_index_state_table, search_optimization_coverage,
+    to_results_page, unique_search_terms, unload_to_stage
+)
+
 # Get the active Snowflake session
 session = get_active_session()
 
+# Metadata cache shared by all sessions of this app instance
+METADATA_CACHE_TTL_SECONDS = 600
+METADATA_CACHE_MAX_ENTRIES = 500
+
+# Search planning: table statistics drive ordering, sampling and scan budgets
+SEARCH_SCAN_WARNING_BYTES = 100 * 1024 ** 3  # plans estimated to scan more than this get a warning
+
+# Search result cache shared by all sessions; entries are keyed by each table's LAST_ALTERED
+RESULT_CACHE_TTL_SECONDS = 3600
+RESULT_CACHE_MAX_ENTRIES = 2000
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Column picker: longer column lists get a type-ahead filter and show at most this many matches
+COLUMN_PICKER_MAX_OPTIONS = 500
+
 # Set page configuration
 st.set_page_config(
     page_title="Database Explorer & Search",
@@ -27,13 +59,107 @@ if 'available_tables' not in st.session_state:
     st.session_state.available_tables = []
 if 'available_columns' not in st.session_state:
     st.session_state.available_columns = []
+if 'search_jobs' not in st.session_state:
+    st.session_state.search_jobs = []
+if 'search_results' not in st.session_state:
+    st.session_state.search_results = None
+if 'export_file' not in st.session_state:
+    st.session_state.export_file = None
+if 'pending_search' not in st.session_state:
+    st.session_state.pending_search = None
+if 'account_search_results' not in st.session_state:
+    st.session_state.account_search_results = None
+if 'term_search_results' not in st.session_state:
+    st.session_state.term_search_results = None
+
+@st.cache_resource
+def get_metadata_cache():
+    """Metadata cache shared across all user sessions of this app instance"""
+    return TTLCache(METADATA_CACHE_TTL_SECONDS, METADATA_CACHE_MAX_ENTRIES)
+
+metadata_cache = get_metadata_cache()
+
+@st.cache_resource
+def get_result_cache():
+    """Search result cache shared across all user sessions of this app instance"""
+    return TTLCache(RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_MAX_ENTRIES,
+                    max_bytes=RESULT_CACHE_MAX_BYTES, sizeof=dataframe_size)
+
+result_cache = get_result_cache()
+
+@st.cache_resource
+def get_search_history():
+    """Executed searches shared across all user sessions, used to recommend search optimization"""
+    return SearchHistory()
+
+search_history = get_search_history()
+
+def current_role():
+    """Role of the active session; metadata visibility depends on it, so it scopes cache keys"""
+    if 'current_role' not in st.session_state:
+        st.session_state.current_role = session.get_current_role()
+    return st.session_state.current_role
+
+def perf_recorder():
+    """This session's timing span recorder"""
+    if 'perf_recorder' not in st.session_state:
+        st.session_state.perf_recorder = PerfRecorder()
+    return st.session_state.perf_recorder
+
+def cached_metadata(key, loader):
+    """Return a cached metadata result for this role, running loader() on a miss"""
+    cache_key = (current_role(),) + key
+    with perf_recorder().span(f"get_{key[0]}", cached=True) as span_fields:
+        found, value = metadata_cache.get(cache_key)
+        if found:
+            return value
+        span_fields['cached'] = False
+        value = loader()
+        metadata_cache.set(cache_key, value)
+        return value
+
+def label_index(name, keys, format_label):
+    """Label index for a metadata list, rebuilt only when the list itself has been reloaded"""
+    index = st.session_state.get(name)
+    if index is None or index.keys is not keys:
+        index = LabelIndex(keys, format_label)
+        st.session_state[name] = index
+    return index
+
+def prefetch_catalog(database):
+    """Start loading database's catalog in the background, cancelling a prefetch of another database"""
+    prefetcher = st.session_state.get('catalog_prefetcher')
+    if prefetcher is not None and prefetcher.database != database:
+        prefetcher.cancel()
+        prefetcher = st.session_state.catalog_prefetcher = None
+    if prefetcher is None and database and (current_role(), 'catalog', database) not in metadata_cache:
+        st.session_state.catalog_prefetcher = CatalogPrefetcher(session, database, recorder=perf_recorder())
+
+def prefetched_catalog(database):
+    """The prefetched catalog of database, or None while it is still loading or unavailable"""
+    prefetcher = st.session_state.get('catalog_prefetcher')
+    if prefetcher is not None and prefetcher.database == database and prefetcher.done():
+        if prefetcher.catalog is not None:
+            metadata_cache.set((current_role(), 'catalog', database), prefetcher.catalog)
+            st.session_state.catalog_prefetcher = None
+    found, catalog = metadata_cache.get((current_role(), 'catalog', database))
+    return catalog if found else None
+
+def refresh_metadata():
+    """Invalidate cached metadata for the current role and reset the cascading selections"""
+    role = current_role()
+    if st.session_state.get('catalog_prefetcher') is not None:
+        st.session_state.catalog_prefetcher.cancel()
+        st.session_state.catalog_prefetcher = None
+    metadata_cache.invalidate(lambda key: key[0] == role)
+    st.session_state.available_schemas = []
+    st.session_state.available_tables = []
+    st.session_state.available_columns = []
 
 def get_databases():
     """Get all databases accessible to the user"""
     try:
-        query = "SHOW DATABASES"
-        result = session.sql(query).collect()
-        return [row['name'] for row in result]
+        return cached_metadata(('databases',), lambda: load_databases(session, perf_recorder()))
     except Exception as e:
         st.error(f"Error fetching databases: {str(e)}")
         return []
@@ -43,15 +169,13 @@ def get_schemas(database):
     if not database:
         return []
     
+    catalog = prefetched_catalog(database)
     try:
-        query = f"""
-        SELECT SCHEMA_NAME 
-        FROM {database}.INFORMATION_SCHEMA.SCHEMATA 
-        WHERE SCHEMA_NAME NOT IN ('INFORMATION_SCHEMA')
-        ORDER BY SCHEMA_NAME
-        """
-        result = session.sql(query).collect()
-        return [row['SCHEMA_NAME'] for row in result]
+        return cached_metadata(
+            ('schemas', database),
+            lambda: catalog['schemas'] if catalog and catalog['schemas'] is not None
+            else load_schemas(session, database, perf_recorder())
+        )
     except Exception as e:
         st.error(f"Error fetching schemas from {database}: {str(e)}")
         return []
@@ -61,17 +185,15 @@ def get_tables(database, schemas):
     if not database or not schemas:
         return []
     
+    catalog = prefetched_catalog(database)
     try:
-        schema_list = "', '".join(schemas)
-        query = f"""
-        SELECT DISTINCT TABLE_SCHEMA, TABLE_NAME 
-        FROM {database}.INFORMATION_SCHEMA.TABLES 
-        WHERE TABLE_SCHEMA IN ('{schema_list}')
-        AND TABLE_TYPE = 'BASE TABLE'
-        ORDER BY TABLE_SCHEMA, TABLE_NAME
-        """
-        result = session.sql(query).collect()
-        return [(row['TABLE_SCHEMA'], row['TABLE_NAME']) for row in result]
+        schema_set = set(schemas)
+        return cached_metadata(
+            ('tables', database, tuple(sorted(schemas))),
+            lambda: [table for table in catalog['tables'] if table[0] in schema_set]
+            if catalog and catalog['tables'] is not None
+            else load_tables(session, database, schemas, perf_recorder())
+        )
     except Exception as e:
         st.error(f"Error fetching tables from {database}: {str(e)}")
         return []
@@ -81,89 +203,581 @@ def get_columns(database, tables):
     if not database or not tables:
         return []
     
+    catalog = prefetched_catalog(database)
     try:
-        table_conditions = []
-        for schema, table in tables:
-            table_conditions.append(f"(TABLE_SCHEMA = '{schema}' AND TABLE_NAME = '{table}')")
-        
-        where_clause = " OR ".join(table_conditions)
-        
-        query = f"""
-        SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, DATA_TYPE
-        FROM {database}.INFORMATION_SCHEMA.COLUMNS 
-        WHERE ({where_clause})
-        AND data_type in ('VARCHAR', 'VARIANT', 'ARRAY', 'TEXT', 'OBJECT') 
-        ORDER BY TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION
-        """
-        result = session.sql(query).collect()
-        return [(row['TABLE_SCHEMA'], row['TABLE_NAME'], row['COLUMN_NAME'], row['DATA_TYPE']) for row in result]
+        table_set = set(tables)
+        return cached_metadata(
+            ('columns', database, tuple(sorted(tables))),
+            lambda: [column for column in catalog['columns'] if column[:2] in table_set]
+            if catalog and catalog['columns'] is not None
+            else load_columns(session, database, tables, recorder=perf_recorder())
+        )
     except Exception as e:
         st.error(f"Error fetching columns from {database}: {str(e)}")
         return []
 
-def perform_search(database, search_string, selected_columns, selected_tables, force_wildcard=False):
-    """Perform search using Snowflake SEARCH function, returns results grouped by table"""
-    if not database or not search_string.strip() or not selected_columns:
+def get_account_columns(databases, name_filters, use_account_usage, max_concurrency=SEARCH_MAX_CONCURRENCY):
+    """Searchable columns across databases for an account-wide search, as (columns, {database: Exception})"""
+    filter_key = tuple((kind, tuple(include), tuple(exclude)) for kind, (include, exclude) in sorted(name_filters.items()))
+    key = ('account_columns', tuple(databases), filter_key, use_account_usage)
+    columns, errors = cached_metadata(
+        key,
+        lambda: discover_account_columns(session, databases, name_filters, use_account_usage,
+                                         max_concurrency=max_concurrency, recorder=perf_recorder())
+    )
+    if errors:
+        # Retry unreadable databases on the next search instead of caching the failure
+        metadata_cache.invalidate(lambda cache_key: cache_key[1:] == key)
+    return columns, errors
+
+def get_search_optimization(database, tables):
+    """Search optimization status and FULL_TEXT columns of (schema, table) tuples, keyed by table key"""
+    if not database or not tables:
         return {}
+    return cached_metadata(
+        ('search_optimization', database, tuple(sorted(tables))),
+        lambda: load_search_optimization(session, database, tables, recorder=perf_recorder())
+    )
+
+def get_primary_keys(database):
+    """Fetch primary key columns per table in a database with caching"""
+    return cached_metadata(('primary_keys', database),
+                           lambda: load_primary_keys(session, database, recorder=perf_recorder()))
+
+def get_page_orders(database, table_keys):
+    """ORDER BY lists that keep each table's result pages in a stable order, {table_key: order_by}"""
+    try:
+        primary_keys = get_primary_keys(database)
+    except Exception:
+        # HASH(*) alone still gives a stable order
+        primary_keys = {}
+    return {table_key: build_order_by(primary_keys.get(table_key, ())) for table_key in table_keys}
+
+def build_projections(database, selected_columns, preview_chars=None):
+    """SELECT lists returning only each table's primary key and searched columns, {table_key: projection}"""
+    try:
+        primary_keys = get_primary_keys(database)
+    except Exception as e:
+        st.warning(f"Primary keys unavailable for {database}; results show searched columns only: {str(e)}")
+        primary_keys = {}
+    table_columns = {}
+    for schema, table, column, data_type in selected_columns:
+        table_columns.setdefault(format_table_key(schema, table), []).append((column, data_type))
+    return {table_key: build_projection(columns, primary_keys.get(table_key, ()), preview_chars)
+            for table_key, columns in table_columns.items()}
+
+def result_cache_key(database, search_string, table_key, search_clause, page, page_size, data_version,
+                     sample_percent=None, projection=None, order_by=None):
+    """Key for one page of one table's search results"""
+    return (current_role(), database, normalize_search_string(search_string), table_key, search_clause,
+            sample_percent, projection, order_by, page, page_size, data_version)
+
+def get_cached_page(cache_key):
+    """Look up a cached results page, returning (found, DataFrame | None)"""
+    found, df = result_cache.get(cache_key)
+    # Hand out a shallow copy so callers can adjust attrs without touching the shared entry
+    return found, (df.copy(deep=False) if df is not None else None)
+
+def cancel_pending_searches():
+    """Cancel search queries still running from a previous search in this session"""
+    for job in st.session_state.search_jobs:
+        cancel_job(job)
+    st.session_state.search_jobs = []
+
+def fetch_results_page(database, search_string, table_key, search_clause, page, page_size=SEARCH_PAGE_SIZE,
+                       data_version=None, sample_percent=None, projection=None, order_by=None):
+    """Fetch one page of a table's matches with server-side OFFSET paging, in order_by order"""
+    cache_key = None
+    if data_version is not None:
+        cache_key = result_cache_key(database, search_string, table_key, search_clause, page, page_size,
+                                     data_version, sample_percent, projection, order_by)
+        found, df = get_cached_page(cache_key)
+        if found:
+            return df
+    
+    schema, table = parse_table_key(table_key)
+    query, params = build_search_query(database, schema, table, search_clause, search_string,
+                                       limit=page_size + 1, offset=page * page_size, sample_percent=sample_percent,
+                                       projection=projection, order_by=order_by)
+    with perf_recorder().span('search.page', key=table_key, page=page) as span_fields:
+        df = to_results_page(session.sql(query, params=params).to_pandas(), search_clause, page, page_size,
+                             sample_percent, projection, order_by)
+        span_fields['rows'] = len(df)
+    df.attrs['data_version'] = data_version
+    if cache_key is not None:
+        result_cache.set(cache_key, df.copy(deep=False))
+    return df
+
+def fetch_full_rows(database, search_string, table_key, df, index):
+    """Fetch the complete row behind one row of trimmed results.
     
+    The row is looked up among the rows matching the search, and by its primary key when the
+    table declares one, so only those rows are hashed to find its ROW_KEY.
+    """
+    schema, table = parse_table_key(table_key)
     try:
-        # Group columns by table
-        tables_columns = {}
-        for schema, table, column, data_type in selected_columns:
-            table_key = f"{schema}.{table}"
-            if table_key not in tables_columns:
-                tables_columns[table_key] = []
-            tables_columns[table_key].append(column)
+        key_columns = get_primary_keys(database).get(table_key, ())
+    except Exception:
+        key_columns = ()
+    key_values = {column: df.at[index, column] for column in key_columns
+                  if column in df.columns and not pd.isna(df.at[index, column])}
+    # Bind plain Python values rather than numpy scalars
+    key_values = {column: value.item() if hasattr(value, 'item') else value for column, value in key_values.items()}
+    query, params = build_indexed_rows_query(database, schema, table, [df.at[index, 'ROW_KEY']],
+                                             df.attrs['search_clause'], search_string, key_values)
+    with perf_recorder().span('search.full_rows', key=table_key) as span_fields:
+        rows = session.sql(query, params=params).to_pandas()
+        span_fields['rows'] = len(rows)
+    return rows
+
+def fetch_indexed_rows(database, table_key, df):
+    """Replace a table's search index hits with the full rows they point to"""
+    schema, table = parse_table_key(table_key)
+    query, params = build_indexed_rows_query(database, schema, table, df['ROW_KEY'])
+    with perf_recorder().span('index.rows', key=table_key) as span_fields:
+        rows = session.sql(query, params=params).to_pandas()
+        span_fields['rows'] = len(rows)
+    rows.attrs.update({'search_clause': df.attrs['search_clause'], 'sample_percent': None, 'page': 0,
+                       'page_size': len(rows), 'has_more': False, 'data_version': df.attrs.get('data_version')})
+    return rows
+
+def search_index_lookup(database, search_string, selected_columns, planned, index_table, page_size=SEARCH_PAGE_SIZE):
+    """Answer the planned tables that are current in a search index with one lookup.
+    
+    Returns the plan entries left to search directly and {table_key: (page | None, elapsed)} for
+    the tables answered from the index. Tables changed since they were indexed, or indexed
+    without one of the searched columns (every searchable column for wildcard searches), are
+    searched directly.
+    """
+    try:
+        state = load_search_index_state(session, index_table, database, perf_recorder())
+    except Exception as e:
+        st.warning(f"Search index {index_table} unavailable, searching tables directly: {str(e)}")
+        return planned, {}
+    
+    # Wildcard searches look in every searchable column, so the index must hold all of them
+    wildcard_tables = [(entry['schema'], entry['table']) for entry in planned
+                       if entry['wildcard_reason'] and entry['table_key'] in state]
+    table_columns = get_columns(database, wildcard_tables) if wildcard_tables else []
+    lookup_columns = index_search_columns(planned, selected_columns, state, table_columns)
+    indexed = [entry for entry in planned if entry['table_key'] in lookup_columns]
+    if not indexed:
+        return planned, {}
+    
+    started = time.monotonic()
+    try:
+        hits = run_index_search(
+            session, index_table, database, search_string,
+            [(entry['schema'], entry['table'], column) for entry in indexed for column in lookup_columns[entry['table_key']]],
+            limit=page_size + 1, recorder=perf_recorder()
+        )
+    except Exception as e:
+        st.warning(f"Error searching the index {index_table}, searching tables directly: {str(e)}")
+        return planned, {}
+    elapsed = time.monotonic() - started
+    st.info(f"🗂️ {len(indexed)} of {len(planned)} table(s) answered from the search index {index_table}")
+    
+    index_results = {}
+    for entry in indexed:
+        df = hits.get(entry['table_key'])
+        if df is not None:
+            df = to_results_page(df, entry['search_clause'], 0, page_size)
+            df.attrs.update({'index_table': index_table, 'data_version': entry['data_version']})
+        index_results[entry['table_key']] = (df, elapsed)
+    return [entry for entry in planned if entry['table_key'] not in index_results], index_results
+
+def plan_search(database, selected_columns, force_wildcard=False, byte_budget=None,
+                sample_over_bytes=None, sample_percent=SEARCH_SAMPLE_PERCENT):
+    """Build a search plan from INFORMATION_SCHEMA.TABLES statistics, planning without them if the lookup fails"""
+    table_specs = build_table_specs(selected_columns, force_wildcard)
+    try:
+        table_stats = load_table_stats(session, database, [(schema, table) for schema, table, _, _ in table_specs],
+                                       perf_recorder())
+    except Exception as e:
+        st.warning(f"Table statistics unavailable, searching without a size-based plan: {str(e)}")
+        table_stats = {}
+    try:
+        search_optimization = get_search_optimization(database, sorted({column[:2] for column in selected_columns}))
+    except Exception as e:
+        st.warning(f"Search optimization status unavailable, planning every table as a full scan: {str(e)}")
+        search_optimization = {}
+    # Wildcard searches cover every searchable column, so coverage is checked against all of them
+    wildcard_tables = [(schema, table) for schema, table, _, wildcard_reason in table_specs if wildcard_reason]
+    table_columns = get_columns(database, wildcard_tables) if search_optimization and wildcard_tables else []
+    coverage = search_optimization_coverage(selected_columns, search_optimization, table_specs, table_columns)
+    return build_search_plan(table_specs, table_stats, byte_budget, sample_over_bytes, sample_percent, coverage)
+
+def show_search_plan(plan):
+    """Display a search plan with its scan estimate"""
+    planned = [entry for entry in plan if entry['skip_reason'] is None]
+    estimated_total = sum(entry['estimated_bytes'] or 0 for entry in planned)
+    st.write(f"**{len(planned)} of {len(plan)} table(s) planned, estimated scan {format_bytes(estimated_total)}**")
+    if estimated_total > SEARCH_SCAN_WARNING_BYTES:
+        st.warning(f"⚠️ This search is estimated to scan {format_bytes(estimated_total)}. "
+                   "Consider narrowing the scope, sampling large tables or setting a scan budget.")
+    st.dataframe(
+        pd.DataFrame([{
+            'Table': entry['table_key'],
+            'Rows': entry['row_count'],
+            'Size': format_bytes(entry['bytes']),
+            'Sample': f"{entry['sample_percent']}%" if entry['sample_percent'] else "",
+            'Estimated scan': format_bytes(entry['estimated_bytes']),
+            'Search optimization': {'full': "FULL_TEXT", 'partial': "partial FULL_TEXT"}.get(entry['search_optimization'], ""),
+            'Status': f"skipped ({entry['skip_reason']})" if entry['skip_reason'] else "planned"
+        } for entry in plan]),
+        use_container_width=True,
+        hide_index=True
+    )
+
+def iter_search(database, search_string, selected_columns, force_wildcard=False,
+                max_concurrency=SEARCH_MAX_CONCURRENCY, timeout=SEARCH_TABLE_TIMEOUT_SECONDS,
+                batched=False, page_size=SEARCH_PAGE_SIZE, plan=None, row_budget=None, match_target=None,
+                search_index=None, projections=None):
+    """Search tables with the SEARCH function, yielding each table's outcome as soon as it is known.
+    
+    Yields (table_key, result, timing) where result is the table's first results page, None when
+    the table has no matches, or the Exception its query raised; timing is a dict with the
+    table's 'elapsed' seconds, result 'rows' and whether it was 'cached'. Tables run in plan order
+    (a default plan is built when none is given) and the search stops early, cancelling running
+    queries, once row_budget result rows have been returned. With match_target set the search
+    runs in first-matches mode and ends with a summary of tables with and without hits. With
+    search_index set, tables current in that index table are answered by one index lookup first.
+    projections ({table_key: build_projection() SELECT list}) trims per-table results to those
+    columns; batched searches always return whole rows. Result pages are ordered by each table's
+    primary key or row hash so later pages follow on from the first, except in first-matches mode,
+    where the probes take whichever rows the warehouse finds first and are not paged.
+    """
+    if not database or not search_string.strip() or not selected_columns:
+        return
+    
+    # A new search supersedes anything still running from the previous one
+    cancel_pending_searches()
+    
+    if plan is None:
+        with perf_recorder().span('plan_search', tables=len({column[:2] for column in selected_columns})):
+            plan = plan_search(database, selected_columns, force_wildcard)
+    
+    for entry in plan:
+        if entry['wildcard_reason'] == 'forced':
+            st.info(f"🔍 Using wildcard search for {entry['table_key']} (user selected wildcard option)")
+        elif entry['wildcard_reason'] == 'many columns':
+            st.info(f"🔍 Using wildcard search for {entry['table_key']} - this searches all columns in the table")
+    
+    over_budget = [entry['table_key'] for entry in plan if entry['skip_reason']]
+    if over_budget:
+        st.info(f"⏭️ Skipped {len(over_budget)} table(s) over the scan budget: {', '.join(over_budget)}")
+    planned = [entry for entry in plan if not entry['skip_reason']]
+    
+    cache_keys = {}
+    completed = {}
+    finished = set()
+    to_search, index_results = planned, {}
+    if search_index:
+        to_search, index_results = search_index_lookup(database, search_string, selected_columns, planned,
+                                                       search_index, page_size)
+        for table_key, (index_df, _) in index_results.items():
+            finished.add(table_key)
+            if index_df is not None:
+                completed[table_key] = index_df
+    
+    projections = {} if batched or projections is None else projections
+    page_orders = {} if match_target else get_page_orders(database, [entry['table_key'] for entry in to_search])
+    
+    # Tables whose data hasn't changed since an identical search are answered from the result cache
+    specs_to_run = []
+    for entry in to_search:
+        table_key = entry['table_key']
+        if entry['data_version'] is not None:
+            cache_keys[table_key] = result_cache_key(database, search_string, table_key, entry['search_clause'],
+                                                     0, page_size, entry['data_version'], entry['sample_percent'],
+                                                     projections.get(table_key), page_orders.get(table_key))
+            found, cached_df = get_cached_page(cache_keys[table_key])
+            if found:
+                finished.add(table_key)
+                if cached_df is not None:
+                    completed[table_key] = cached_df
+                continue
+        specs_to_run.append((entry['schema'], entry['table'], entry['search_clause'], entry['sample_percent']))
+    
+    if len(specs_to_run) < len(to_search):
+        st.info(f"⚡ {len(to_search) - len(specs_to_run)} of {len(to_search)} table(s) answered from the result cache")
+    
+    if batched:
+        search_events = run_batched_search(
+            session, database, search_string, specs_to_run, limit=page_size,
+            max_concurrency=max_concurrency, timeout=timeout, job_registry=st.session_state.search_jobs,
+            recorder=perf_recorder(), order_by=page_orders
+        )
+    else:
+        # Build one search query per table, fetching one extra row to know whether more pages exist
+        search_queries = {
+            format_table_key(schema, table): build_search_query(
+                database, schema, table, search_clause, search_string, limit=page_size + 1,
+                sample_percent=sample_percent, projection=projections.get(format_table_key(schema, table)),
+                order_by=page_orders.get(format_table_key(schema, table))
+            )
+            for schema, table, search_clause, sample_percent in specs_to_run
+        }
+        search_events = run_queries_concurrently(
+            session, search_queries, max_concurrency=max_concurrency, timeout=timeout,
+            job_registry=st.session_state.search_jobs, result_format='pandas',
+            recorder=perf_recorder(), stage='search'
+        )
+    
+    entries = {entry['table_key']: entry for entry in plan}
+    searched_columns = {}
+    for schema, table, column, _ in selected_columns:
+        searched_columns.setdefault(format_table_key(schema, table), []).append(column)
+    rows_returned = sum(len(df) for df in completed.values())
+    stop_after = match_target or row_budget
+    
+    try:
+        for table_key, (index_df, elapsed) in index_results.items():
+            yield table_key, index_df, {'elapsed': elapsed, 'rows': 0 if index_df is None else len(index_df),
+                                        'cached': False}
         
-        table_results = {}
+        for entry in to_search:
+            if entry['table_key'] in finished:
+                cached_df = completed.get(entry['table_key'])
+                yield entry['table_key'], cached_df, {
+                    'elapsed': 0.0, 'rows': 0 if cached_df is None else len(cached_df), 'cached': True
+                }
         
-        for table_key, columns in tables_columns.items():
-            schema, table = table_key.split('.')
-            
-            # Use wildcard syntax if forced, or if there are many columns (> 15) to improve performance 
-            # and avoid "too many columns" errors
-            if force_wildcard or len(columns) > 15:
-                search_clause = f"{table}.*"
-                if force_wildcard:
-                    st.info(f"🔍 Using wildcard search for {table_key} (user selected wildcard option)")
-                else:
-                    st.info(f"🔍 Using wildcard search for {table_key} ({len(columns)} columns) - this searches all columns in the table")
+        if stop_after and rows_returned >= stop_after:
+            # Cached results already satisfy the request, so no query is started
+            search_events.close()
+        
+        for table_key, result, elapsed in search_events:
+            finished.add(table_key)
+            entry = entries[table_key]
+            timing = {'elapsed': elapsed, 'rows': 0, 'cached': False}
+            if isinstance(result, Exception):
+                yield table_key, result, timing
+                continue
+            search_history.record(database, entry['schema'], entry['table'], searched_columns[table_key], elapsed)
+            if result is None or result.empty:
+                if table_key in cache_keys:
+                    result_cache.set(cache_keys[table_key], None)
+                yield table_key, None, timing
+                continue
+            if 'match_count' in result.attrs:
+                # Batched results carry the total match count instead of an extra row
+                match_count = result.attrs['match_count']
+                result = to_results_page(result, entry['search_clause'], 0, page_size, entry['sample_percent'],
+                                         order_by=page_orders.get(table_key))
+                result.attrs.update({'match_count': match_count, 'has_more': match_count > page_size})
             else:
-                # Create column list for SEARCH function for specific columns
-                column_list = ', '.join([f'{col}' for col in columns])
-                search_clause = column_list
-            
-            # Build the search query
-            search_query = f"""
-            SELECT 
-                '{schema}' as SCHEMA_NAME,
-                '{table}' as TABLE_NAME,
-                *
-            FROM {database}.{schema}.{table}
-            WHERE SEARCH(({search_clause}), '{search_string}')
-            LIMIT 1000
-            """
+                result = to_results_page(result, entry['search_clause'], 0, page_size, entry['sample_percent'],
+                                         projections.get(table_key), page_orders.get(table_key))
+            result.attrs['data_version'] = entry['data_version']
+            if table_key in cache_keys:
+                result_cache.set(cache_keys[table_key], result.copy(deep=False))
+            completed[table_key] = result
+            rows_returned += len(result)
+            timing['rows'] = len(result)
+            yield table_key, result, timing
             
-            try:
-                result = session.sql(search_query).collect()
-                if result:
-                    df = pd.DataFrame([row.asDict() for row in result])
-                    table_results[table_key] = df
-            except Exception as table_error:
-                st.warning(f"Error searching in {table_key}: {str(table_error)}")
+            if stop_after and rows_returned >= stop_after:
+                break
+    finally:
+        # Closing the event stream cancels the queries still running
+        search_events.close()
+        st.session_state.search_jobs = []
+    
+    unfinished = [entry['table_key'] for entry in planned if entry['table_key'] not in finished]
+    if match_target:
+        no_hits = [entry['table_key'] for entry in planned
+                   if entry['table_key'] in finished and entry['table_key'] not in completed]
+        st.info(
+            f"🎯 {rows_returned:,} match(es) found in {len(completed)} table(s)"
+            + (f", reaching the target of {match_target:,}" if rows_returned >= match_target else "")
+            + (f". No matches in: {', '.join(no_hits)}" if no_hits else "")
+            + (f". Skipped {len(unfinished)} table(s): {', '.join(unfinished)}" if unfinished else "")
+        )
+    elif unfinished:
+        st.warning(f"Row budget of {row_budget:,} reached after {rows_returned:,} row(s); "
+                   f"{len(unfinished)} table(s) not searched: {', '.join(unfinished)}")
+
+def iter_match_summaries(database, search_string, selected_columns, plan, sample_rows=SUMMARY_SAMPLE_ROWS,
+                         max_concurrency=SEARCH_MAX_CONCURRENCY, timeout=SEARCH_TABLE_TIMEOUT_SECONDS):
+    """Count matches per table and column in the warehouse, yielding each table's outcome as it finishes.
+    
+    Yields (table_key, summary, timing) like iter_search, where summary is the table's
+    run_match_summaries() dict, None when the table has no matches, or the Exception its query raised.
+    """
+    if not database or not search_string.strip() or not selected_columns:
+        return
+    
+    cancel_pending_searches()
+    
+    over_budget = [entry['table_key'] for entry in plan if entry['skip_reason']]
+    if over_budget:
+        st.info(f"⏭️ Skipped {len(over_budget)} table(s) over the scan budget: {', '.join(over_budget)}")
+    
+    searched_columns = {}
+    for schema, table, column, _ in selected_columns:
+        searched_columns.setdefault(format_table_key(schema, table), []).append(column)
+    entries = {entry['table_key']: entry for entry in plan if not entry['skip_reason']}
+    summary_specs = [(entry['schema'], entry['table'], entry['search_clause'], entry['sample_percent'],
+                      searched_columns[table_key])
+                     for table_key, entry in entries.items()]
+    
+    try:
+        for table_key, summary, elapsed in run_match_summaries(
+            session, database, search_string, summary_specs, sample_rows,
+            max_concurrency=max_concurrency, timeout=timeout, job_registry=st.session_state.search_jobs,
+            recorder=perf_recorder()
+        ):
+            timing = {'elapsed': elapsed, 'rows': 0, 'cached': False}
+            if isinstance(summary, Exception):
+                yield table_key, summary, timing
                 continue
-        
-        return table_results
-            
-    except Exception as e:
-        st.error(f"Error performing search: {str(e)}")
-        return {}
+            entry = entries[table_key]
+            search_history.record(database, entry['schema'], entry['table'], searched_columns[table_key], elapsed)
+            summary['search_clause'] = entry['search_clause']
+            summary['sample_percent'] = entry['sample_percent']
+            summary['data_version'] = entry['data_version']
+            timing['rows'] = summary['match_count']
+            yield table_key, summary if summary['match_count'] else None, timing
+    finally:
+        st.session_state.search_jobs = []
+
+def order_results(table_results, selected_columns):
+    """Put results in selection order, independent of plan order and query completion order"""
+    table_order = [format_table_key(schema, table) for schema, table, _, _ in build_table_specs(selected_columns)]
+    return {table_key: table_results[table_key] for table_key in table_order if table_key in table_results}
+
+def show_match_summaries(summaries):
+    """Overview of match counts per table with each table's matches per searched column"""
+    st.dataframe(
+        pd.DataFrame([
+            {
+                'Table': table_key,
+                'Matches': summary['match_count'],
+                'Matches by column': ", ".join(f"{column}: {count:,}"
+                                               for column, count in summary['column_matches'].items() if count),
+                'Sampled': f"{summary['sample_percent']}%" if summary['sample_percent'] else ""
+            }
+            for table_key, summary in summaries.items()
+        ]),
+        use_container_width=True,
+        hide_index=True
+    )
+
+def render_match_summary(search_results, table_key, summary, page_size=SEARCH_PAGE_SIZE):
+    """Display one table's match counts and sample rows, with a button to fetch the matching rows"""
+    st.subheader(f"📋 Matches in {table_key}")
+    st.write(f"**{summary['match_count']:,} matching row(s)**")
+    if summary['search_clause'].endswith('.*'):
+        st.caption("Searched every searchable column; counts by column cover the selected columns only")
+    if not summary['samples'].empty:
+        st.dataframe(summary['samples'], use_container_width=True)
+    if st.button("Fetch matching rows", key=f"summary_rows_{table_key}"):
+        try:
+            with st.spinner(f"Loading rows of {table_key}..."):
+                df = fetch_results_page(search_results['database'], search_results['search_string'], table_key,
+                                        summary['search_clause'], 0, page_size,
+                                        data_version=summary['data_version'], sample_percent=summary['sample_percent'],
+                                        order_by=get_page_orders(search_results['database'], [table_key])[table_key])
+            df.attrs['match_count'] = summary['match_count']
+            search_results['tables'][table_key] = df
+            st.session_state.export_file = None
+            st.rerun()
+        except Exception as rows_error:
+            st.warning(f"Error loading rows of {table_key}: {str(rows_error)}")
+    st.markdown("---")
+
+def render_table_results(search_results, table_key, df):
+    """Display one table's results page with its paging controls"""
+    st.subheader(f"📋 Results from {table_key}")
+    page = df.attrs.get('page', 0)
+    table_page_size = df.attrs.get('page_size', len(df))
+    first_row = page * table_page_size + 1
+    if page > 0 or df.attrs.get('has_more'):
+        total_label = f" of {df.attrs['match_count']}" if 'match_count' in df.attrs else ""
+        st.write(f"**Page {page + 1}: record(s) {first_row}–{first_row + len(df) - 1}{total_label}**")
+    else:
+        st.write(f"**{len(df)} record(s) found**")
+    if df.attrs.get('sample_percent'):
+        st.caption(f"Searched a {df.attrs['sample_percent']}% block sample of this table; matches outside the sample are not shown")
+    if df.attrs.get('index_table'):
+        st.caption(f"Matching values from the search index {df.attrs['index_table']}"
+                   + (f"; showing the first {len(df)}" if df.attrs.get('has_more') else ""))
+    if df.attrs.get('projection'):
+        st.caption("Showing key and searched columns, long values possibly cut to a preview; "
+                   "open 🔎 Full record to load a complete row")
+    
+    # Display table results
+    st.dataframe(
+        df,
+        use_container_width=True,
+        height=min(400, max(200, len(df) * 35 + 50))  # Dynamic height based on rows
+    )
+    
+    if df.attrs.get('projection') and not df.empty:
+        with st.expander("🔎 Full record"):
+            record = st.selectbox("Record:", list(df.index), format_func=lambda index: f"Row {index + 1}",
+                                  key=f"record_{table_key}")
+            if st.button("Load full record", key=f"full_row_{table_key}"):
+                try:
+                    with st.spinner(f"Loading record from {table_key}..."):
+                        st.dataframe(fetch_full_rows(search_results['database'], search_results['search_string'],
+                                                     table_key, df, record).drop(columns=['ROW_KEY']),
+                                     use_container_width=True, hide_index=True)
+                except Exception as row_error:
+                    st.warning(f"Error loading record from {table_key}: {str(row_error)}")
+    
+    if df.attrs.get('index_table'):
+        if st.button("Fetch full rows", key=f"rows_{table_key}"):
+            try:
+                with st.spinner(f"Loading rows of {table_key}..."):
+                    search_results['tables'][table_key] = fetch_indexed_rows(search_results['database'], table_key, df)
+                st.session_state.export_file = None
+                st.rerun()
+            except Exception as rows_error:
+                st.warning(f"Error loading rows of {table_key}: {str(rows_error)}")
+    
+    elif df.attrs.get('has_more') and not df.attrs.get('order_by'):
+        st.caption("More matches exist; run an All matches search to page through them")
+    
+    # Server-side paging: only the current page of each table is held in memory
+    elif page > 0 or df.attrs.get('has_more'):
+        prev_col, next_col = st.columns([1, 1])
+        new_page = None
+        with prev_col:
+            if st.button("◀ Previous page", key=f"prev_{table_key}", disabled=page == 0):
+                new_page = page - 1
+        with next_col:
+            if st.button("Next page ▶", key=f"next_{table_key}", disabled=not df.attrs.get('has_more')):
+                new_page = page + 1
+        if new_page is not None:
+            try:
+                with st.spinner(f"Loading page {new_page + 1} of {table_key}..."):
+                    new_df = fetch_results_page(search_results['database'], search_results['search_string'], table_key,
+                                                df.attrs['search_clause'], new_page, table_page_size,
+                                                data_version=df.attrs.get('data_version'),
+                                                sample_percent=df.attrs.get('sample_percent'),
+                                                projection=df.attrs.get('projection'),
+                                                order_by=df.attrs.get('order_by'))
+                if 'match_count' in df.attrs:
+                    new_df.attrs['match_count'] = df.attrs['match_count']
+                search_results['tables'][table_key] = new_df
+                st.session_state.export_file = None
+                st.rerun()
+            except Exception as page_error:
+                st.warning(f"Error loading page {new_page + 1} of {table_key}: {str(page_error)}")
+    
+    st.markdown("---")
+
 
 # Sidebar for selections
 st.sidebar.header("📋 Database Selection")
 
 # Database selection
 st.sidebar.subheader("1. Select Database")
+if st.sidebar.button("🔄 Refresh metadata", help="Reload databases, schemas, tables and columns from Snowflake"):
+    refresh_metadata()
+    st.rerun()
 available_databases = get_databases()
 
 if available_databases:
@@ -189,6 +803,22 @@ if available_databases:
         st.session_state.available_columns = []
         st.session_state.selected_columns = []
         st.rerun()
+    
+    # Load the whole catalog of the selected database in the background so later selections resolve from memory
+    prefetch_catalog(selected_database)
+    prefetcher = st.session_state.get('catalog_prefetcher')
+    catalog = prefetched_catalog(selected_database)
+    if catalog is not None:
+        st.sidebar.caption(
+            f"⚡ Catalog in memory: {len(catalog['schemas'] or [])} schema(s)"
+            + (f", {len(catalog['tables']):,} table(s)" if catalog['tables'] is not None else ", tables loaded per selection")
+            + (f", {len(catalog['columns']):,} searchable column(s)" if catalog['columns'] is not None
+               else ", columns loaded per selection")
+        )
+    elif prefetcher is not None and prefetcher.error is not None:
+        st.sidebar.caption(f"Catalog prefetch failed, loading per selection: {str(prefetcher.error)}")
+    elif prefetcher is not None:
+        st.sidebar.caption(f"⏳ Prefetching the {selected_database} catalog in the background...")
 else:
     st.sidebar.error("No databases found or accessible")
     selected_database = None
@@ -236,20 +866,17 @@ if selected_database and selected_schemas:
         st.session_state.available_tables = get_tables(selected_database, selected_schemas)
     
     if st.session_state.available_tables:
-        # Create display names for tables (schema.table)
-        table_display_names = [f"{schema}.{table}" for schema, table in st.session_state.available_tables]
+        # Display names (schema.table) are built once per table list load
+        table_index = label_index('table_index', st.session_state.available_tables, format_table_key)
         
         selected_table_displays = st.sidebar.multiselect(
             "Choose tables:",
-            table_display_names,
+            table_index.labels,
             key="table_multiselect"
         )
         
         # Convert back to tuple format
-        selected_tables = []
-        for display_name in selected_table_displays:
-            schema, table = display_name.split('.')
-            selected_tables.append((schema, table))
+        selected_tables = table_index.keys_for(selected_table_displays)
         
         # Update session state and fetch columns when tables change
         if selected_tables != st.session_state.selected_tables:
@@ -317,23 +944,36 @@ if selected_database and selected_tables:
         if select_all_columns:
             selected_columns = st.session_state.available_columns
         else:
-            # Create display names for columns (schema.table.column)
-            column_display_names = [f"{schema}.{table}.{column} ({data_type})" 
-                                  for schema, table, column, data_type in st.session_state.available_columns]
+            # Display names (schema.table.column) are built once per column list load
+            column_index = label_index('column_index', st.session_state.available_columns, column_label)
+            
+            if len(column_index) > COLUMN_PICKER_MAX_OPTIONS:
+                # Filter on the server so the browser only receives the matching options
+                column_filter = st.sidebar.text_input(
+                    "Filter columns:",
+                    placeholder="e.g. customer email",
+                    help="Shows columns whose name contains every word typed here",
+                    key="column_filter"
+                )
+                chosen = [label for label in st.session_state.get('column_multiselect', []) if label in column_index]
+                matching = column_index.filter(column_filter, COLUMN_PICKER_MAX_OPTIONS)
+                column_options = chosen + [label for label in matching if label not in set(chosen)]
+                if len(matching) == COLUMN_PICKER_MAX_OPTIONS:
+                    st.sidebar.caption(f"Showing the first {COLUMN_PICKER_MAX_OPTIONS} of {len(column_index):,} "
+                                       "columns; type to narrow the list")
+            else:
+                chosen = []
+                column_options = column_index.labels
             
             selected_column_displays = st.sidebar.multiselect(
                 "Choose specific columns:",
-                column_display_names,
+                column_options,
+                default=chosen,
                 key="column_multiselect"
             )
             
             # Convert back to tuple format
-            selected_columns = []
-            for display_name in selected_column_displays:
-                for schema, table, column, data_type in st.session_state.available_columns:
-                    if display_name.startswith(f"{schema}.{table}.{column}"):
-                        selected_columns.append((schema, table, column, data_type))
-                        break
+            selected_columns = column_index.keys_for(selected_column_displays)
     else:
         st.sidebar.info("No columns found in selected table(s)")
         selected_columns = []
@@ -341,6 +981,98 @@ else:
     st.sidebar.info("Please select database, schema(s), and table(s) first")
     selected_columns = []
 
+# Search execution settings
+with st.sidebar.expander("⚙️ Search Settings"):
+    max_concurrency = st.number_input(
+        "Max concurrent table queries",
+        min_value=1,
+        max_value=32,
+        value=SEARCH_MAX_CONCURRENCY,
+        help="How many tables are searched at the same time"
+    )
+    table_timeout = st.number_input(
+        "Per-table timeout (seconds)",
+        min_value=5,
+        max_value=3600,
+        value=SEARCH_TABLE_TIMEOUT_SECONDS,
+        help="Table queries running longer than this are cancelled and reported as warnings"
+    )
+    page_size = st.number_input(
+        "Rows per page",
+        min_value=10,
+        max_value=100_000,
+        value=SEARCH_PAGE_SIZE,
+        step=100,
+        help="Rows fetched per table at a time; use the page buttons under each table to see more"
+    )
+    review_plan = st.checkbox(
+        "Review search plan before running",
+        help="Shows table sizes and the estimated scan before any table is searched"
+    )
+    scan_budget_gb = st.number_input(
+        "Scan budget (GB, 0 = unlimited)",
+        min_value=0.0,
+        value=0.0,
+        help="Tables are planned smallest first; tables that would push the estimated scan past this are skipped"
+    )
+    row_budget = st.number_input(
+        "Row budget (0 = unlimited)",
+        min_value=0,
+        value=0,
+        step=1000,
+        help="Stops searching further tables once this many result rows have been returned"
+    )
+    sample_over_gb = st.number_input(
+        "Sample tables larger than (GB, 0 = never)",
+        min_value=0.0,
+        value=0.0,
+        help="Large tables are searched on a block sample instead of a full scan"
+    )
+    sample_percent = st.slider("Sample size (%)", min_value=1, max_value=99, value=SEARCH_SAMPLE_PERCENT)
+    trim_results = st.checkbox(
+        "Return only key and searched columns",
+        help="Search results hold each table's primary key and searched columns instead of SELECT *; "
+             "full rows are loaded one record at a time from the results"
+    )
+    preview_chars = st.number_input(
+        "Preview length (characters, 0 = full values)",
+        min_value=0,
+        value=RESULT_PREVIEW_CHARS,
+        step=50,
+        disabled=not trim_results,
+        help="Searched text and semi-structured values are cut to this length in Snowflake before they are sent"
+    )
+    batched_search = st.checkbox(
+        "Batch tables into combined queries",
+        help="Searches many tables with a few UNION ALL statements instead of one query per table. "
+             "Faster when per-query overhead dominates; rows are returned as JSON objects with columns in alphabetical order"
+    )
+    search_index_table = st.text_input(
+        "Search index table",
+        placeholder="MY_DATABASE.SEARCH.SEARCH_INDEX",
+        help="Table built under 🗂️ Search Index holding the searchable values of many tables"
+    ).strip()
+    use_search_index = st.checkbox(
+        "Answer from the search index",
+        disabled=not search_index_table,
+        help="Tables indexed since their last change are answered by one lookup in the index table "
+             "instead of one SEARCH query each"
+    )
+    cache_stats = metadata_cache.stats()
+    st.caption(
+        f"Metadata cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es), "
+        f"{cache_stats['entries']} entr{'y' if cache_stats['entries'] == 1 else 'ies'}"
+    )
+    result_stats = result_cache.stats()
+    lookups = result_stats['hits'] + result_stats['misses']
+    st.caption(
+        f"Result cache: {result_stats['hits'] / lookups:.0%} hit rate over {lookups} lookup(s), "
+        f"{result_stats['entries']} page(s), {result_stats['bytes'] / 1024 / 1024:.1f} MB"
+        if lookups else "Result cache: no lookups yet"
+    )
+    if st.button("Clear result cache"):
+        result_cache.invalidate()
+
 # Main content area
 col1, col2 = st.columns([1, 1])
 
@@ -355,14 +1087,17 @@ with col1:
         st.write("**Available Schemas:**", ", ".join(selected_schemas))
     
     if selected_tables:
-        table_names = [f"{schema}.{table}" for schema, table in selected_tables]
+        table_names = [format_table_key(schema, table) for schema, table in selected_tables]
         st.write("**Available Tables:**", ", ".join(table_names))
     
     if selected_columns:
         st.write(f"**Available Columns:** {len(selected_columns)} column(s)")
         with st.expander("View available columns"):
-            for schema, table, column, data_type in selected_columns:
-                st.write(f"• {schema}.{table}.{column} ({data_type})")
+            st.dataframe(
+                pd.DataFrame(selected_columns, columns=['Schema', 'Table', 'Column', 'Type']),
+                use_container_width=True,
+                hide_index=True
+            )
 
 with col2:
     st.subheader("🎯 Search Filters")
@@ -386,7 +1121,8 @@ with col2:
         # Filter tables to only show those in selected search schemas
         filtered_tables = [(schema, table) for schema, table in selected_tables if schema in search_schemas]
         if filtered_tables:
-            table_display_names = [f"{schema}.{table}" for schema, table in filtered_tables]
+            table_index = label_index('table_index', st.session_state.available_tables, format_table_key)
+            table_display_names = table_index.labels_for(filtered_tables)
             selected_search_table_displays = st.multiselect(
                 "📋 Limit search to specific tables:",
                 table_display_names,
@@ -396,10 +1132,7 @@ with col2:
             )
             
             # Convert back to tuple format
-            search_tables = []
-            for display_name in selected_search_table_displays:
-                schema, table = display_name.split('.')
-                search_tables.append((schema, table))
+            search_tables = table_index.keys_for(selected_search_table_displays)
     elif selected_tables and not search_schemas:
         st.info("Please select schemas first to enable table filtering")
 
@@ -413,6 +1146,28 @@ search_string = st.text_input(
     help="This will use Snowflake's SEARCH function to find matches across selected columns"
 )
 
+# Search mode
+search_mode = st.radio(
+    "Search mode:",
+    ["All matches", "First matches only", "Match counts only"],
+    horizontal=True,
+    help="First matches only answers \"where does this appear at all?\": each table is asked for a few rows "
+         "and the remaining tables are cancelled once enough matches have been found. Match counts only "
+         "counts matches per table and column in the warehouse and returns a few sample rows; fetch a "
+         "table's rows from its panel"
+)
+match_target = None
+probe_rows = None
+summary_rows = None
+if search_mode == "Match counts only":
+    summary_rows = st.number_input("Sample rows per table:", min_value=0, max_value=100, value=SUMMARY_SAMPLE_ROWS)
+elif search_mode == "First matches only":
+    target_col, probe_col = st.columns([1, 1])
+    with target_col:
+        match_target = st.number_input("Stop after this many matches:", min_value=1, value=10)
+    with probe_col:
+        probe_rows = st.number_input("Rows to fetch per table:", min_value=1, value=1)
+
 # Search button
 search_button = st.button("🔍 Search", type="primary", use_container_width=True)
 
@@ -420,6 +1175,7 @@ search_button = st.button("🔍 Search", type="primary", use_container_width=Tru
 st.markdown("---")
 st.subheader("📊 Search Results")
 
+run_search_request = None
 if search_button and search_string.strip():
     if not selected_database:
         st.warning("Please select a database first.")
@@ -444,64 +1200,609 @@ if search_button and search_string.strip():
             with search_scope_col1:
                 st.info(f"🎯 Searching in {len(search_schemas)} schema(s): {', '.join(search_schemas)}")
             with search_scope_col2:
-                table_names = [f"{schema}.{table}" for schema, table in search_tables]
+                table_names = [format_table_key(schema, table) for schema, table in search_tables]
                 st.info(f"📋 Searching {len(search_tables)} table(s): {', '.join(table_names)}")
             
             st.info(f"🔍 Searching across {len(filtered_columns)} column(s) for: '{search_string}'")
             
-            with st.spinner("Searching..."):
-                table_results = perform_search(selected_database, search_string, filtered_columns, search_tables, force_wildcard)
-            
-            if table_results:
-                # Calculate total results
-                total_results = sum(len(df) for df in table_results.values())
-                st.success(f"Found {total_results} result(s) containing '{search_string}' across {len(table_results)} table(s)")
-                
-                # Create combined DataFrame for download
-                all_dfs = list(table_results.values())
-                combined_df = pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
-                
-                # Download button for all results
-                if not combined_df.empty:
-                    csv = combined_df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download All Results as CSV",
-                        data=csv,
-                        file_name=f"search_results_all_{search_string}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
-                
-                st.markdown("---")
-                
-                # Display results for each table separately
-                for table_key, df in table_results.items():
-                    st.subheader(f"📋 Results from {table_key}")
-                    st.write(f"**{len(df)} record(s) found**")
-                    
-                    # Display table results
-                    st.dataframe(
-                        df,
-                        use_container_width=True,
-                        height=min(400, max(200, len(df) * 35 + 50))  # Dynamic height based on rows
-                    )
-                    
-                    # Individual table download button
-                    table_csv = df.to_csv(index=False)
-                    st.download_button(
-                        label=f"📥 Download {table_key} Results",
-                        data=table_csv,
-                        file_name=f"search_results_{table_key.replace('.', '_')}_{search_string}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv",
-                        key=f"download_{table_key}"
-                    )
-                    
-                    st.markdown("---")
+            with perf_recorder().span('plan_search', tables=len(search_tables)):
+                search_plan = plan_search(
+                    selected_database, filtered_columns, force_wildcard,
+                    byte_budget=scan_budget_gb * 1024 ** 3 or None,
+                    sample_over_bytes=sample_over_gb * 1024 ** 3 or None,
+                    sample_percent=sample_percent
+                )
+            search_request = {
+                'database': selected_database,
+                'search_string': search_string,
+                'columns': filtered_columns,
+                'tables': search_tables,
+                'force_wildcard': force_wildcard,
+                'plan': search_plan,
+                'match_target': match_target,
+                'probe_rows': probe_rows,
+                'summary_rows': summary_rows,
+                'projections': (build_projections(selected_database, filtered_columns, preview_chars or None)
+                                if trim_results else None)
+            }
+            if review_plan:
+                st.session_state.pending_search = search_request
             else:
-                st.info(f"No results found for '{search_string}' in the selected schemas and tables.")
+                with st.expander("🧭 Search plan"):
+                    show_search_plan(search_plan)
+                run_search_request = search_request
             
 elif search_button and not search_string.strip():
     st.warning("Please enter a search string.")
 
+# Plans awaiting confirmation stay on screen until the user runs or discards them
+if st.session_state.pending_search is not None:
+    pending_search = st.session_state.pending_search
+    st.markdown(f"#### 🧭 Search plan for '{pending_search['search_string']}'")
+    show_search_plan(pending_search['plan'])
+    run_col, cancel_col = st.columns([1, 1])
+    with run_col:
+        if st.button("▶ Run search", type="primary", use_container_width=True):
+            run_search_request = pending_search
+            st.session_state.pending_search = None
+    with cancel_col:
+        if st.button("Discard plan", use_container_width=True):
+            st.session_state.pending_search = None
+            st.rerun()
+
+# Summary and export controls are filled in above the per-table panels
+results_summary = st.container()
+rendered_live = False
+
+if run_search_request is not None:
+    # Keep results across reruns so paging and downloads don't discard them
+    search_results = {
+        'database': run_search_request['database'],
+        'search_string': run_search_request['search_string'],
+        'tables': {},
+        'timings': []
+    }
+    if run_search_request.get('summary_rows') is not None:
+        search_results['summaries'] = {}
+    st.session_state.search_results = search_results
+    st.session_state.export_file = None
+    
+    search_plan = run_search_request['plan']
+    tables_total = sum(1 for entry in search_plan if not entry['skip_reason'])
+    search_started = time.monotonic()
+    search_progress = st.progress(0.0, text=f"Searching {tables_total} table(s)...")
+    timing_display = st.empty()
+    
+    if 'summaries' in search_results:
+        search_events = iter_match_summaries(run_search_request['database'], run_search_request['search_string'],
+                                             run_search_request['columns'], search_plan,
+                                             run_search_request['summary_rows'],
+                                             max_concurrency=max_concurrency, timeout=table_timeout)
+    else:
+        search_events = iter_search(run_search_request['database'], run_search_request['search_string'],
+                                    run_search_request['columns'], run_search_request['force_wildcard'],
+                                    max_concurrency=max_concurrency, timeout=table_timeout,
+                                    batched=batched_search,
+                                    page_size=run_search_request['probe_rows'] or page_size,
+                                    plan=search_plan, row_budget=row_budget or None,
+                                    match_target=run_search_request['match_target'],
+                                    search_index=search_index_table if use_search_index else None,
+                                    projections=run_search_request.get('projections'))
+    
+    # Each table's panel appears as soon as its query finishes
+    for table_key, result, timing in search_events:
+        if isinstance(result, Exception):
+            st.warning(f"Error searching in {table_key}: {str(result)}")
+            status = "error"
+        elif result is None:
+            status = "no matches"
+        elif 'summaries' in search_results:
+            # Counts are shown together once every table has reported
+            search_results['summaries'][table_key] = result
+            status = "matches"
+        else:
+            search_results['tables'][table_key] = result
+            with perf_recorder().span('render', key=table_key, rows=len(result)):
+                render_table_results(search_results, table_key, result)
+            status = "matches"
+        
+        search_results['timings'].append({
+            'Table': table_key,
+            'Status': status + (" (cached)" if timing['cached'] else ""),
+            'Rows': timing['rows'],
+            'Seconds': round(timing['elapsed'], 2)
+        })
+        tables_done = len(search_results['timings'])
+        search_progress.progress(
+            min(tables_done / max(tables_total, 1), 1.0),
+            text=f"Searched {tables_done} of {tables_total} table(s) in {time.monotonic() - search_started:.1f}s"
+        )
+        timing_display.dataframe(pd.DataFrame(search_results['timings']), use_container_width=True, hide_index=True)
+    
+    search_progress.empty()
+    timing_display.empty()
+    search_results['tables'] = order_results(search_results['tables'], run_search_request['columns'])
+    if 'summaries' in search_results:
+        search_results['summaries'] = order_results(search_results['summaries'], run_search_request['columns'])
+    else:
+        rendered_live = True
+
+search_results = st.session_state.search_results
+if search_results is not None:
+    table_results = search_results['tables']
+    results_search_string = search_results['search_string']
+    
+    with results_summary:
+        if search_results['timings']:
+            with st.expander("⏱️ Per-table timings"):
+                st.dataframe(pd.DataFrame(search_results['timings']), use_container_width=True, hide_index=True)
+        
+        summaries = search_results.get('summaries')
+        if summaries:
+            total_matches = sum(summary['match_count'] for summary in summaries.values())
+            st.success(f"{total_matches:,} row(s) containing '{results_search_string}' across {len(summaries)} table(s)")
+            show_match_summaries(summaries)
+            st.markdown("---")
+        elif summaries is not None:
+            st.info(f"No results found for '{results_search_string}' in the selected schemas and tables.")
+        elif table_results:
+            # Calculate total results
+            total_results = sum(len(df) for df in table_results.values())
+            more_available = any(df.attrs.get('has_more') for df in table_results.values())
+            st.success(f"Found {total_results}{'+' if more_available else ''} result(s) containing '{results_search_string}' across {len(table_results)} table(s)")
+            
+            # Files are only built when an export is requested
+            with st.expander("📥 Export results"):
+                export_tables = st.multiselect(
+                    "Tables to export:",
+                    list(table_results),
+                    default=list(table_results),
+                    key="export_tables"
+                )
+                export_format = st.selectbox("Format:", list(EXPORT_FORMATS), key="export_format")
+                export_all_rows = st.checkbox(
+                    "Include all matching rows",
+                    help="Re-runs the search without paging and streams every match into the file; "
+                         "otherwise only the currently loaded page of each table is exported",
+                    key="export_all_rows"
+                )
+                export_destination = st.radio(
+                    "Destination:",
+                    ["Download", "Snowflake stage"],
+                    horizontal=True,
+                    help="Unloading to a stage runs COPY INTO in Snowflake, so large result sets never pass through the app",
+                    key="export_destination"
+                )
+                
+                if export_destination == "Download":
+                    if st.button("Prepare download", disabled=not export_tables):
+                        with st.spinner("Building export file..."), \
+                                perf_recorder().span('export.build', format=export_format, tables=len(export_tables)) as span_fields:
+                            st.session_state.export_file = build_export_file(
+                                session, search_results, export_tables, export_format, export_all_rows
+                            )
+                            span_fields['bytes'] = len(st.session_state.export_file[0])
+                    if st.session_state.export_file is not None:
+                        export_data, export_name, export_mime = st.session_state.export_file
+                        st.download_button(
+                            label=f"📥 Download {export_name}",
+                            data=export_data,
+                            file_name=export_name,
+                            mime=export_mime
+                        )
+                else:
+                    stage_location = st.text_input(
+                        "Stage location:",
+                        placeholder="@my_database.my_schema.my_stage/search_exports",
+                        key="export_stage_location"
+                    )
+                    valid_stage = is_stage_location(stage_location)
+                    if stage_location and not valid_stage:
+                        st.caption("Enter a stage as @stage, @schema.stage or @database.schema.stage, optionally "
+                                   "followed by /path (letters, digits, _ - . = only); quote names with other "
+                                   "characters in double quotes")
+                    if st.button("Unload to stage", disabled=not export_tables or not valid_stage):
+                        with st.spinner("Unloading to stage..."):
+                            for table_key, result, elapsed in unload_to_stage(session, search_results, export_tables,
+                                                                              stage_location, export_format):
+                                if isinstance(result, Exception):
+                                    st.warning(f"Error unloading {table_key}: {str(result)}")
+                                else:
+                                    st.write(f"✅ {table_key}: {result} row(s) unloaded in {elapsed:.1f}s")
+            
+            st.markdown("---")
+        else:
+            st.info(f"No results found for '{results_search_string}' in the selected schemas and tables.")
+    
+    # Panels were already drawn while the search ran
+    if search_results.get('summaries'):
+        for table_key, summary in search_results['summaries'].items():
+            if table_key in table_results:
+                render_table_results(search_results, table_key, table_results[table_key])
+            else:
+                render_match_summary(search_results, table_key, summary, page_size)
+    elif not rendered_live:
+        for table_key, df in table_results.items():
+            with perf_recorder().span('render', key=table_key, rows=len(df)):
+                render_table_results(search_results, table_key, df)
+
+# Account-wide search across databases
+st.markdown("---")
+st.subheader("🌐 Account-wide Search")
+with st.expander("Search every database at once", expanded=st.session_state.account_search_results is not None):
+    account_search_string = st.text_input(
+        "Search string:",
+        placeholder="Type your search term here...",
+        key="account_search_string"
+    )
+    
+    # Name patterns: comma-separated, * matches any characters and ? a single character
+    name_filters = {}
+    for pattern_col, kind in zip(st.columns(3), ('databases', 'schemas', 'tables')):
+        with pattern_col:
+            include_patterns = st.text_input(f"Include {kind}:", placeholder="e.g. PROD_*, SALES",
+                                             key=f"account_include_{kind}")
+            exclude_patterns = st.text_input(f"Exclude {kind}:", placeholder="e.g. *_TMP",
+                                             key=f"account_exclude_{kind}")
+        name_filters[kind] = (parse_name_patterns(include_patterns), parse_name_patterns(exclude_patterns))
+    
+    discovery_col, limit_col = st.columns([1, 1])
+    with discovery_col:
+        use_account_usage = st.radio(
+            "Column discovery:",
+            ["INFORMATION_SCHEMA per database", "SNOWFLAKE.ACCOUNT_USAGE"],
+            help="ACCOUNT_USAGE finds every column in one query but needs access to the SNOWFLAKE database "
+                 "and can lag behind recent changes by a few hours",
+            key="account_discovery_source"
+        ) == "SNOWFLAKE.ACCOUNT_USAGE"
+    with limit_col:
+        account_max_tables = st.number_input(
+            "Maximum tables to search:",
+            min_value=1,
+            value=ACCOUNT_SEARCH_MAX_TABLES,
+            step=100,
+            help="Guards against scanning the whole account by accident; tables beyond this are listed but not searched",
+            key="account_max_tables"
+        )
+    account_wildcard = st.checkbox(
+        "Use wildcard search (search all columns in each table)",
+        key="account_wildcard"
+    )
+    account_search_button = st.button("🌐 Search all databases", disabled=not account_search_string.strip())
+
+if account_search_button:
+    cancel_pending_searches()
+    account_databases = filter_names(available_databases, *name_filters['databases'])
+    with st.spinner(f"Discovering searchable columns in {len(account_databases)} database(s)..."), \
+            perf_recorder().span('account.discover', databases=len(account_databases)):
+        account_columns, discovery_errors = get_account_columns(account_databases, name_filters, use_account_usage,
+                                                                max_concurrency)
+    for database, error in discovery_errors.items():
+        st.warning(f"Error discovering columns in {database}: {str(error)}")
+    
+    account_specs = build_account_table_specs(account_columns, account_wildcard)
+    if len(account_specs) > account_max_tables:
+        st.warning(f"{len(account_specs):,} tables match the patterns; searching the first {account_max_tables:,}. "
+                   "Narrow the patterns or raise the maximum to search the rest.")
+        account_specs = account_specs[:account_max_tables]
+    
+    account_results = {
+        'search_string': account_search_string,
+        'tables': {},
+        'errors': {},
+        'searched': len(account_specs)
+    }
+    search_started = time.monotonic()
+    account_progress = st.progress(0.0, text=f"Searching {len(account_specs):,} table(s)...")
+    progress_step = max(1, len(account_specs) // 100)
+    tables_done = 0
+    try:
+        for table_key, result, elapsed in run_account_search(
+            session, account_search_string, account_specs, page_size=page_size, max_concurrency=max_concurrency,
+            timeout=table_timeout, job_registry=st.session_state.search_jobs, recorder=perf_recorder()
+        ):
+            if isinstance(result, Exception):
+                account_results['errors'][table_key] = str(result)
+            elif result is not None:
+                account_results['tables'][table_key] = result
+            tables_done += 1
+            # Update the bar about a hundred times however many tables there are
+            if tables_done % progress_step == 0 or tables_done == len(account_specs):
+                account_progress.progress(
+                    tables_done / len(account_specs),
+                    text=f"Searched {tables_done:,} of {len(account_specs):,} table(s) "
+                         f"in {time.monotonic() - search_started:.1f}s"
+                )
+    finally:
+        st.session_state.search_jobs = []
+    account_progress.empty()
+    st.session_state.account_search_results = account_results
+
+account_results = st.session_state.account_search_results
+if account_results is not None:
+    account_tables = account_results['tables']
+    if account_results['errors']:
+        with st.expander(f"⚠️ {len(account_results['errors'])} table(s) could not be searched"):
+            st.dataframe(
+                pd.DataFrame([key + (error,) for key, error in account_results['errors'].items()],
+                             columns=['Database', 'Schema', 'Table', 'Error']),
+                use_container_width=True,
+                hide_index=True
+            )
+    if account_tables:
+        total_results = sum(len(df) for df in account_tables.values())
+        more_available = any(df.attrs.get('has_more') for df in account_tables.values())
+        st.success(
+            f"Found {total_results}{'+' if more_available else ''} result(s) containing "
+            f"'{account_results['search_string']}' in {len(account_tables)} table(s) across "
+            f"{len({database for database, _, _ in account_tables})} database(s); "
+            f"{account_results['searched']:,} table(s) searched"
+        )
+        st.dataframe(
+            pd.DataFrame([key + (len(account_tables[key]), account_tables[key].attrs.get('has_more', False))
+                          for key in sorted(account_tables)],
+                         columns=['Database', 'Schema', 'Table', 'Rows', 'More rows']),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        # Results grouped database -> schema -> table
+        for database, database_keys in itertools.groupby(sorted(account_tables), key=lambda key: key[0]):
+            database_keys = list(database_keys)
+            with st.expander(f"🗄️ {database}: {len(database_keys)} table(s) with matches"):
+                for schema, schema_keys in itertools.groupby(database_keys, key=lambda key: key[1]):
+                    st.markdown(f"#### 🏗️ {schema}")
+                    for table_key in schema_keys:
+                        df = account_tables[table_key]
+                        st.write(f"**📋 {table_key[2]}**: {len(df)}{'+' if df.attrs.get('has_more') else ''} record(s)")
+                        st.dataframe(df, use_container_width=True, height=min(400, max(200, len(df) * 35 + 50)))
+    else:
+        st.info(f"No results found for '{account_results['search_string']}' in {account_results['searched']:,} table(s).")
+
+# Term list search: every term is matched against each selected table in one query per table
+st.markdown("---")
+st.subheader("🧾 Term List Search")
+with st.expander("Search the selected tables for a list of terms",
+                 expanded=st.session_state.term_search_results is not None):
+    terms_text = st.text_area(
+        "Terms:",
+        placeholder="One term per line, or separated by commas",
+        help="A row matches a term when any of its selected columns contains it as a substring, ignoring case "
+             "(12 also matches 1234). Substring matching reads every row of each table",
+        key="term_list_text"
+    )
+    terms_file = st.file_uploader("Or upload a term list (CSV or text):", type=['csv', 'txt'], key="term_list_file")
+    terms_file_header = st.checkbox("Uploaded file has a header row", key="term_list_header")
+    file_terms = []
+    if terms_file is not None:
+        try:
+            term_file_labels, term_file_rows = read_term_file(terms_file.getvalue().decode('utf-8-sig'),
+                                                              header=terms_file_header)
+        except (UnicodeDecodeError, csv.Error) as e:
+            st.error(f"Could not read {terms_file.name}: {str(e)}")
+            term_file_labels, term_file_rows = [], []
+        term_column = 0
+        if len(term_file_labels) > 1:
+            term_column = st.selectbox("Term column:", range(len(term_file_labels)),
+                                       format_func=lambda position: term_file_labels[position],
+                                       key="term_list_column")
+        file_terms = [row[term_column] for row in term_file_rows if term_column < len(row)]
+    terms = unique_search_terms(parse_search_terms(terms_text) + file_terms)
+    
+    term_table_columns = {}
+    for schema, table, column, data_type in selected_columns:
+        if schema in search_schemas and (schema, table) in search_tables:
+            term_table_columns.setdefault((schema, table), []).append((column, data_type))
+    st.write(f"**{len(terms):,} term(s)** against **{len(term_table_columns)} table(s)** "
+             "from the current selection and search filters")
+    if len(terms) > BATCH_TERMS_MAX:
+        st.warning(f"At most {BATCH_TERMS_MAX:,} terms can be searched at once; split the list into several runs.")
+    term_search_button = st.button(
+        "🧾 Search all terms",
+        disabled=not terms or not term_table_columns or len(terms) > BATCH_TERMS_MAX
+    )
+
+if term_search_button:
+    cancel_pending_searches()
+    term_results = {'database': selected_database, 'terms': terms, 'tables': {}, 'term_counts': {}, 'errors': {}}
+    term_progress = st.progress(0.0, text=f"Searching {len(term_table_columns)} table(s) for {len(terms):,} term(s)...")
+    search_started = time.monotonic()
+    try:
+        for table_key, result, elapsed in run_term_search(
+            session, selected_database, terms, term_table_columns, limit=page_size,
+            max_concurrency=max_concurrency, timeout=table_timeout, job_registry=st.session_state.search_jobs,
+            recorder=perf_recorder()
+        ):
+            if isinstance(result, Exception):
+                term_results['errors'][table_key] = str(result)
+            else:
+                term_results['term_counts'][table_key], rows = result
+                if rows is not None:
+                    term_results['tables'][table_key] = rows
+            tables_done = len(term_results['term_counts']) + len(term_results['errors'])
+            term_progress.progress(
+                tables_done / len(term_table_columns),
+                text=f"Searched {tables_done} of {len(term_table_columns)} table(s) "
+                     f"in {time.monotonic() - search_started:.1f}s"
+            )
+        st.session_state.term_search_results = term_results
+    except Exception as e:
+        st.error(f"Error searching for the term list: {str(e)}")
+    finally:
+        st.session_state.search_jobs = []
+    term_progress.empty()
+
+term_results = st.session_state.term_search_results
+if term_results is not None:
+    for table_key, error in term_results['errors'].items():
+        st.warning(f"Error searching in {table_key}: {str(error)}")
+    hit_matrix = build_term_hit_matrix(term_results['terms'], term_results['term_counts'])
+    terms_found = hit_matrix.index[hit_matrix.sum(axis=1) > 0]
+    st.success(f"{len(terms_found):,} of {len(term_results['terms']):,} term(s) found "
+               f"in {len(term_results['tables'])} table(s) of {term_results['database']}")
+    st.dataframe(hit_matrix, use_container_width=True)
+    st.download_button(
+        "📥 Download hit matrix (CSV)",
+        data=hit_matrix.to_csv().encode('utf-8'),
+        file_name="term_hits.csv",
+        mime="text/csv"
+    )
+    terms_missing = [term for term in term_results['terms'] if term not in terms_found]
+    if terms_missing:
+        with st.expander(f"🚫 {len(terms_missing):,} term(s) not found"):
+            st.write(", ".join(terms_missing))
+    for table_key, df in term_results['tables'].items():
+        match_count = sum(term_results['term_counts'][table_key].values())
+        with st.expander(f"📋 {table_key}: {len(df)} matching row(s)"
+                         + (" shown" if len(df) >= page_size else "")
+                         + f", {match_count:,} term match(es)"):
+            st.dataframe(df, use_container_width=True, height=min(400, max(200, len(df) * 35 + 50)))
+
+# Search index: one table of searchable values answers searches over many tables with a single lookup
+with st.expander("🗂️ Search Index"):
+    if not search_index_table:
+        st.info("Set a search index table (DATABASE.SCHEMA.TABLE) under ⚙️ Search Settings to build one")
+    elif not selected_database:
+        st.info("Select a database to index its tables")
+    else:
+        st.markdown(
+            f"The index `{search_index_table}` holds one row per searchable value of the indexed tables, "
+            "keyed by `HASH(*)` of its row. Refreshing only touches tables changed since they were indexed, "
+            "and within them only rows that changed. For fast lookups, add search optimization to the index: "
+            f"`ALTER TABLE {search_index_table} ADD SEARCH OPTIMIZATION ON FULL_TEXT(VALUE)`."
+        )
+        try:
+            index_state = load_search_index_state(session, search_index_table, selected_database, perf_recorder())
+        except Exception:
+            index_state = {}  # not built yet
+        force_reindex = st.checkbox("Re-index tables even if unchanged")
+        if st.button(f"Build / refresh index for {len(selected_tables)} selected table(s)", disabled=not selected_tables):
+            try:
+                index_columns = get_columns(selected_database, selected_tables)
+                index_stats = load_table_stats(session, selected_database, selected_tables, perf_recorder())
+                refresh_progress = st.progress(0.0, text=f"Indexing {len(selected_tables)} table(s)...")
+                indexed_count = 0
+                for table_key, status, elapsed in refresh_search_index(session, search_index_table, selected_database,
+                                                                        index_columns, index_stats, index_state,
+                                                                        force_reindex, perf_recorder()):
+                    indexed_count += 1
+                    if isinstance(status, Exception):
+                        st.warning(f"Error indexing {table_key}: {str(status)}")
+                    else:
+                        st.write(f"✅ {table_key}: {status}" + (f" in {elapsed:.1f}s" if status == 'refreshed' else ""))
+                    refresh_progress.progress(min(indexed_count / len(selected_tables), 1.0),
+                                              text=f"Indexed {indexed_count} of {len(selected_tables)} table(s)")
+                refresh_progress.empty()
+                index_state = load_search_index_state(session, search_index_table, selected_database, perf_recorder())
+            except Exception as e:
+                st.error(f"Error building search index {search_index_table}: {str(e)}")
+        if index_state:
+            st.write(f"**{len(index_state)} table(s) of {selected_database} in "
+                     f"{search_index_table} (watermarks in {search_index_state_table(search_index_table)})**")
+            st.dataframe(
+                pd.DataFrame([{
+                    'Table': table_key,
+                    'Columns': len(table_state['columns']),
+                    'Last altered': table_state['last_altered'],
+                    'Indexed at': table_state['indexed_at']
+                } for table_key, table_state in sorted(index_state.items())]),
+                use_container_width=True,
+                hide_index=True
+            )
+
+# Search optimization: recommend FULL_TEXT indexes for the most searched columns
+with st.expander("🚀 Search Optimization"):
+    st.markdown(
+        "Tables with FULL_TEXT search optimization on the searched columns run first and are never sampled "
+        "or skipped by the scan budget. The most searched tables since the app started are listed below "
+        "with the statements that would add search optimization for their most searched columns."
+    )
+    min_searches = st.number_input("Recommend for tables searched at least:", min_value=1, value=3, step=1)
+    history = search_history.top_tables(min_searches)
+    if history:
+        search_optimization = {}
+        for database, database_rows in itertools.groupby(sorted(history), key=lambda row: row[0]):
+            try:
+                search_optimization[database] = get_search_optimization(database, [row[1:3] for row in database_rows])
+            except Exception as e:
+                st.warning(f"Search optimization status unavailable for {database}: {str(e)}")
+        st.dataframe(
+            pd.DataFrame([{
+                'Database': database,
+                'Table': format_table_key(schema, table),
+                'Searches': searches,
+                'Search time (s)': round(seconds, 2),
+                'Most searched columns': ", ".join(sorted(column_counts, key=column_counts.get, reverse=True)[:5]),
+                'Search optimization': "ON" if search_optimization.get(database, {}).get(
+                    format_table_key(schema, table), {}).get('enabled') else "OFF"
+            } for database, schema, table, searches, seconds, column_counts in history]),
+            use_container_width=True,
+            hide_index=True
+        )
+        statements = build_search_optimization_statements(history, search_optimization)
+        if statements:
+            st.code(";\n".join(statement for *_, statement in statements) + ";", language="sql")
+            confirm_apply = st.checkbox(
+                "I understand search optimization adds storage and background maintenance costs",
+                help="Applying requires OWNERSHIP of each table, or ADD SEARCH OPTIMIZATION on its schema"
+            )
+            if st.button(f"Apply {len(statements)} statement(s)", disabled=not confirm_apply):
+                for database, schema, table, columns, statement in statements:
+                    try:
+                        session.sql(statement).collect()
+                        st.success(f"✅ Added FULL_TEXT search optimization on {database}.{schema}.{table} "
+                                   f"({', '.join(columns)})")
+                    except Exception as e:
+                        st.error(f"Error adding search optimization on {database}.{schema}.{table}: {str(e)}")
+                metadata_cache.invalidate(lambda key: key[1] == 'search_optimization')
+        else:
+            st.info("The most searched columns already have FULL_TEXT search optimization")
+    else:
+        st.info(f"No table has been searched {min_searches} time(s) yet")
+    if st.button("Clear search history"):
+        search_history.clear()
+        st.rerun()
+
+# Performance panel
+perf = perf_recorder()
+with st.expander("📈 Performance"):
+    perf.json_log = st.checkbox(
+        "Write timing spans to the app log as JSON",
+        value=perf.json_log,
+        help="Each span is logged as one JSON line on the database_explorer.perf logger, written to stderr "
+             "(the app log), for offline analysis"
+    )
+    if perf.spans:
+        st.write("**Time by stage**")
+        st.dataframe(perf.summary(), use_container_width=True)
+        st.write("**Recent spans**")
+        recent_spans = pd.DataFrame(list(perf.spans)[-200:][::-1])
+        recent_spans['at'] = pd.to_datetime(recent_spans['at'], unit='s')
+        st.dataframe(recent_spans, use_container_width=True, hide_index=True)
+        
+        query_ids = sorted({span['query_id'] for span in perf.spans if span.get('query_id')})
+        stats_col, clear_col = st.columns([1, 1])
+        with stats_col:
+            load_stats = st.button(f"Load Snowflake stats for {len(query_ids)} query(ies)",
+                                   disabled=not query_ids or not selected_database)
+        with clear_col:
+            if st.button("Clear timings"):
+                perf.clear()
+                st.rerun()
+        if load_stats:
+            try:
+                query_stats = load_query_stats(session, selected_database, query_ids)
+                st.dataframe(
+                    recent_spans.merge(query_stats, left_on='query_id', right_on='QUERY_ID', how='inner')
+                    if 'query_id' in recent_spans else query_stats,
+                    use_container_width=True,
+                    hide_index=True
+                )
+            except Exception as e:
+                st.warning(f"Error loading query statistics: {str(e)}")
+    else:
+        st.info("No timings recorded yet")
+
 # Instructions
 st.markdown("---")
 with st.expander("ℹ️ How to use this app"):
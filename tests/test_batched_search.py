@@ -0,0 +1,95 @@
+import json
+
+from data_access import build_batched_search_queries, build_batched_search_query, split_batched_results
+
+SPECS = [
+    ('PUBLIC', 'ORDERS', '"NOTES", "STATUS"', None),
+    ('PUBLIC', 'CUSTOMERS', '"CUSTOMERS".*', 10),
+    ('SALES', 'LEADS', '"EMAIL"', None),
+]
+
+
+def test_batched_query_joins_one_branch_per_table():
+    sql, params = build_batched_search_query('DB', 'acme', SPECS, limit=50)
+
+    branches = sql.split('\nUNION ALL')
+    assert len(branches) == len(SPECS)
+    assert "SELECT 'PUBLIC' AS SCHEMA_NAME, 'ORDERS' AS TABLE_NAME, MATCH_COUNT, ROW_DATA" in branches[0]
+    assert 'FROM "DB"."PUBLIC"."ORDERS"\n' in branches[0]
+    assert 'WHERE SEARCH(("NOTES", "STATUS"), ?)' in branches[0]
+    assert 'FROM "DB"."PUBLIC"."CUSTOMERS" SAMPLE SYSTEM (10) SEED (42)' in branches[1]
+    assert 'WHERE SEARCH(("CUSTOMERS".*), ?)' in branches[1]
+    assert all('COUNT(*) OVER () AS MATCH_COUNT, OBJECT_CONSTRUCT_KEEP_NULL(*) AS ROW_DATA' in branch
+               for branch in branches)
+    assert all('LIMIT 50' in branch for branch in branches)
+    assert 'acme' not in sql
+
+
+def test_batched_query_binds_search_string_once_per_table():
+    sql, params = build_batched_search_query('DB', "o'brien", SPECS)
+
+    assert params == ["o'brien"] * len(SPECS)
+    assert sql.count('?') == len(params)
+
+
+def test_batched_query_quotes_names():
+    sql, _ = build_batched_search_query('my db', 'acme', [('a.b', "it's", '"x"', None)])
+
+    assert 'FROM "my db"."a.b"."it\'s"' in sql
+    assert "SELECT 'a.b' AS SCHEMA_NAME, 'it''s' AS TABLE_NAME" in sql
+
+
+def test_batches_split_by_max_tables():
+    specs = [('S', f"T{index}", '"C"', None) for index in range(5)]
+
+    batches = build_batched_search_queries('DB', 'acme', specs, max_tables=2)
+
+    assert [table_keys for _, table_keys in batches] == [['S.T0', 'S.T1'], ['S.T2', 'S.T3'], ['S.T4']]
+    for (sql, params), table_keys in batches:
+        assert sql.count('\nUNION ALL') == len(table_keys) - 1
+        assert params == ['acme'] * len(table_keys)
+
+
+def test_batches_split_by_max_sql_chars():
+    specs = [('S', f"T{index}", '"C"', None) for index in range(5)]
+    branch_chars = len(build_batched_search_query('DB', 'acme', specs[:1])[0])
+
+    batches = build_batched_search_queries('DB', 'acme', specs, max_sql_chars=3 * branch_chars)
+
+    assert [len(table_keys) for _, table_keys in batches] == [3, 2]
+    assert all(len(sql) <= 3 * branch_chars + 2 * len('\nUNION ALL') for (sql, _), _ in batches)
+
+
+def test_oversized_table_gets_its_own_batch():
+    specs = [('S', 'T0', '"C"', None), ('S', 'T1', ', '.join(f'"C{index}"' for index in range(500)), None),
+             ('S', 'T2', '"C"', None)]
+
+    batches = build_batched_search_queries('DB', 'acme', specs, max_sql_chars=1000)
+
+    assert [table_keys for _, table_keys in batches] == [['S.T0'], ['S.T1'], ['S.T2']]
+
+
+def test_split_batched_results_rebuilds_table_frames():
+    rows = [
+        {'SCHEMA_NAME': 'PUBLIC', 'TABLE_NAME': 'ORDERS', 'MATCH_COUNT': 7,
+         'ROW_DATA': json.dumps({'ID': 1, 'NOTES': 'acme order'})},
+        {'SCHEMA_NAME': 'PUBLIC', 'TABLE_NAME': 'ORDERS', 'MATCH_COUNT': 7,
+         'ROW_DATA': json.dumps({'ID': 2, 'NOTES': None})},
+        {'SCHEMA_NAME': 'a.b', 'TABLE_NAME': 'LEADS', 'MATCH_COUNT': 1,
+         'ROW_DATA': json.dumps({'EMAIL': 'x@acme.com'})},
+    ]
+
+    tables = split_batched_results(rows)
+
+    assert set(tables) == {'PUBLIC.ORDERS', '"a.b".LEADS'}
+    orders = tables['PUBLIC.ORDERS']
+    assert list(orders.columns) == ['SCHEMA_NAME', 'TABLE_NAME', 'ID', 'NOTES']
+    assert orders['ID'].tolist() == [1, 2]
+    assert orders['NOTES'].isna().tolist() == [False, True]
+    assert orders.attrs['match_count'] == 7
+    assert tables['"a.b".LEADS'].attrs['match_count'] == 1
+    assert tables['"a.b".LEADS']['EMAIL'].tolist() == ['x@acme.com']
+
+
+def test_split_batched_results_without_rows():
+    assert split_batched_results([]) == {}
@@ -0,0 +1,101 @@
+import time
+
+import pandas as pd
+
+from data_access import TTLCache, dataframe_size
+
+
+def test_hit_and_miss_counters():
+    cache = TTLCache(ttl=60, max_entries=10)
+    cache.set('a', 1)
+
+    assert cache.get('a') == (True, 1)
+    assert cache.get('b') == (False, None)
+    assert 'a' in cache and 'b' not in cache
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1, 'bytes': 0}
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(ttl=0.05, max_entries=10)
+    cache.set('a', 1)
+    time.sleep(0.1)
+
+    assert 'a' not in cache
+    assert cache.get('a') == (False, None)
+    assert cache.stats()['entries'] == 0
+
+
+def test_storing_again_restarts_ttl():
+    cache = TTLCache(ttl=0.15, max_entries=10)
+    cache.set('a', 1)
+    time.sleep(0.1)
+    cache.set('a', 2)
+    time.sleep(0.1)
+
+    assert cache.get('a') == (True, 2)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert 'a' in cache and 'c' in cache
+    assert 'b' not in cache
+    assert cache.stats()['entries'] == 2
+
+
+def test_invalidate_matching_keys():
+    cache = TTLCache(ttl=60, max_entries=10)
+    for key in [('DB1', 'x'), ('DB1', 'y'), ('DB2', 'x')]:
+        cache.set(key, key)
+    cache.invalidate(lambda key: key[0] == 'DB1')
+
+    assert cache.stats()['entries'] == 1 and ('DB2', 'x') in cache
+    cache.invalidate()
+    assert cache.stats()['entries'] == 0
+
+
+def test_entries_are_evicted_to_fit_max_bytes():
+    cache = TTLCache(ttl=60, max_entries=10, max_bytes=10, sizeof=len)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'xxxx')
+    cache.get('a')
+    cache.set('c', 'xxxx')
+
+    assert 'a' in cache and 'c' in cache
+    assert 'b' not in cache
+    assert cache.stats()['bytes'] == 8
+
+
+def test_value_larger_than_max_bytes_is_not_cached():
+    cache = TTLCache(ttl=60, max_entries=10, max_bytes=10, sizeof=len)
+    cache.set('a', 'xxxx')
+    cache.set('big', 'x' * 11)
+
+    assert 'big' not in cache and 'a' in cache
+    assert cache.stats()['bytes'] == 4
+
+
+def test_bytes_are_released_on_replace_expiry_and_invalidate():
+    cache = TTLCache(ttl=0.05, max_entries=10, max_bytes=100, sizeof=len)
+    cache.set('a', 'xxxx')
+    cache.set('a', 'xx')
+    assert cache.stats()['bytes'] == 2
+
+    time.sleep(0.1)
+    cache.get('a')
+    assert cache.stats()['bytes'] == 0
+
+    cache.set('b', 'xxx')
+    cache.invalidate()
+    assert cache.stats()['bytes'] == 0
+
+
+def test_dataframe_size_charges_result_memory():
+    frame = pd.DataFrame({'NOTES': ['x' * 1000] * 10})
+
+    assert dataframe_size(None) == 0
+    assert dataframe_size(frame) > dataframe_size(frame.head(1)) > 1000
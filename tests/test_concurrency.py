@@ -0,0 +1,86 @@
+import time
+
+import pandas as pd
+import pytest
+
+from benchmarks.local_session import LocalSession
+from data_access import run_queries_concurrently
+
+
+class InFlightRegistry(list):
+    """Job registry that records how many submitted jobs are still running at each submission"""
+
+    def __init__(self):
+        super().__init__()
+        self.peak = 0
+
+    def append(self, job):
+        super().append(job)
+        self.peak = max(self.peak, sum(not registered.is_done() for registered in self))
+
+
+def make_session(latency):
+    session = LocalSession(latency=latency)
+    session.add_table('DB', 'PUBLIC', 'ORDERS', pd.DataFrame({'ID': [1, 2], 'NOTES': ['acme', 'other']}))
+    return session
+
+
+def table_queries(count):
+    return {f"T{index}": 'SELECT * FROM "DB"."PUBLIC"."ORDERS"' for index in range(count)}
+
+
+@pytest.mark.parametrize('max_concurrency', [1, 3])
+def test_in_flight_jobs_never_exceed_max_concurrency(max_concurrency):
+    registry = InFlightRegistry()
+    with make_session(latency=0.05) as session:
+        results = list(run_queries_concurrently(session, table_queries(7), max_concurrency=max_concurrency,
+                                                job_registry=registry))
+
+    assert sorted(key for key, _, _ in results) == sorted(table_queries(7))
+    assert all(len(result) == 2 for _, result, _ in results)
+    assert len(registry) == 7
+    assert registry.peak == max_concurrency
+
+
+def test_slow_queries_time_out_and_are_cancelled():
+    registry = []
+    with make_session(latency=5) as session:
+        started = time.monotonic()
+        [(key, result, elapsed)] = run_queries_concurrently(session, table_queries(1), timeout=0.1,
+                                                            job_registry=registry)
+        with pytest.raises(RuntimeError, match='cancelled'):
+            registry[0].result()
+
+    assert key == 'T0'
+    assert isinstance(result, TimeoutError)
+    assert 0.1 < elapsed < 5
+    assert time.monotonic() - started < 5
+
+
+def test_closing_the_generator_cancels_running_jobs():
+    registry = []
+    with make_session(latency=5) as session:
+        started = time.monotonic()
+        results = run_queries_concurrently(session, table_queries(3), max_concurrency=2, timeout=0.1,
+                                           job_registry=registry)
+        key, result, _ = next(results)
+        results.close()
+        for job in registry:
+            with pytest.raises(RuntimeError, match='cancelled'):
+                job.result()
+
+    assert isinstance(result, TimeoutError)
+    # The third query was still pending and is never submitted
+    assert len(registry) == 2
+    assert time.monotonic() - started < 5
+
+
+def test_failing_query_is_yielded_not_raised():
+    queries = {'good': table_queries(1)['T0'], 'bad': 'SELECT * FROM "DB"."PUBLIC"."MISSING"',
+               'bound': ('SELECT * FROM "DB"."PUBLIC"."ORDERS" WHERE "NOTES" = ?', ['acme'])}
+    with make_session(latency=0) as session:
+        results = {key: result for key, result, _ in run_queries_concurrently(session, queries)}
+
+    assert isinstance(results['bad'], Exception)
+    assert len(results['good']) == 2
+    assert [row['ID'] for row in results['bound']] == [1]
@@ -0,0 +1,91 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from benchmarks.local_session import FETCH_BATCH_ROWS, LocalSession
+from data_access import (
+    arrow_export_schema, build_export_file, build_search_query, file_name_part, is_stage_location, unload_to_stage,
+    write_export
+)
+
+SPARSE_CHUNKS = [pd.DataFrame({'A': [1, 2], 'B': [None, None]}), pd.DataFrame({'A': [3], 'B': ['x']})]
+
+
+def write_parquet(frames, fields=()):
+    out = io.BytesIO()
+    write_export(frames, 'Parquet', out, fields)
+    out.seek(0)
+    return pq.read_table(out)
+
+
+def test_parquet_export_keeps_values_of_column_null_in_first_chunk():
+    table = write_parquet(SPARSE_CHUNKS)
+
+    assert table.column('A').to_pylist() == [1, 2, 3]
+    assert table.column('B').to_pylist() == [None, None, 'x']
+    assert table.schema.field('B').type == pa.string()
+
+
+def test_parquet_export_types_columns_from_result_schema():
+    types = pytest.importorskip('snowflake.snowpark.types')
+    fields = [types.StructField('A', types.DecimalType(10, 2)), types.StructField('B', types.LongType())]
+    chunks = [pd.DataFrame({'A': [1.5, None], 'B': [None, None]}), pd.DataFrame({'A': [2.0], 'B': [7]})]
+
+    table = write_parquet(chunks, fields)
+
+    assert table.schema.field('A').type == pa.float64()
+    assert table.schema.field('B').type == pa.int64()
+    assert table.column('B').to_pylist() == [None, None, 7]
+
+
+def test_export_schema_falls_back_to_first_chunk_types():
+    schema = arrow_export_schema(pd.DataFrame({'A': [1], 'B': [None], 'C': [0.5]}))
+
+    assert schema.types == [pa.int64(), pa.string(), pa.float64()]
+
+
+def test_streamed_parquet_export_of_sparse_column():
+    rows = FETCH_BATCH_ROWS + 5
+    data = pd.DataFrame({
+        'NOTES': ['acme'] * rows,
+        'REFERENCE': [None] * FETCH_BATCH_ROWS + ['R1', None, 'R3', None, 'R5'],
+    })
+    with LocalSession() as session:
+        session.add_table('DB', 'PUBLIC', 'ORDERS', data)
+        query, params = build_search_query('DB', 'PUBLIC', 'ORDERS', '"NOTES"', 'acme', limit=10)
+        page = session.sql(query, params=params).to_pandas()
+        page.attrs['search_clause'] = '"NOTES"'
+        search_results = {'database': 'DB', 'search_string': 'acme', 'tables': {'PUBLIC.ORDERS': page}}
+
+        data, _, _ = build_export_file(session, search_results, ['PUBLIC.ORDERS'], 'Parquet', all_rows=True)
+
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == rows
+    assert table.column('REFERENCE').to_pylist()[-5:] == ['R1', None, 'R3', None, 'R5']
+
+
+@pytest.mark.parametrize('stage_location', [
+    '@exports', '@DB.PUBLIC.EXPORTS/search/2024', '@~/exports', '@PUBLIC.%ORDERS', '@"My Stage"/x=1',
+])
+def test_stage_location_accepts_stage_references(stage_location):
+    assert is_stage_location(stage_location)
+
+
+@pytest.mark.parametrize('stage_location', [
+    'exports', '@exports/a b', "@exports/x'; DROP TABLE T; --", '@a.b.c.d', '@exports)', '',
+])
+def test_stage_location_rejects_other_text(stage_location):
+    assert not is_stage_location(stage_location)
+
+
+def test_unload_rejects_invalid_stage_location():
+    with pytest.raises(ValueError):
+        list(unload_to_stage(None, {'tables': {}}, [], "@exports/x' --", 'CSV'))
+
+
+def test_file_name_part_replaces_unsafe_characters():
+    assert file_name_part('PUBLIC', 'ORDERS') == 'PUBLIC_ORDERS'
+    assert file_name_part('a.b', "it's/\"x\"", 'acme corp') == 'a_b_it_s_x__acme_corp'
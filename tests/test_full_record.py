@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from benchmarks.local_session import LocalSession
+from data_access import build_indexed_rows_query, build_projection, build_search_query
+
+
+@pytest.fixture
+def session():
+    data = pd.DataFrame({
+        'ID': [1, 2, 3],
+        'NOTES': ['acme ' + 'x' * 100, 'other', 'acme again'],
+        'AMOUNT': [10, 20, 30],
+    })
+    with LocalSession() as local_session:
+        local_session.add_table('DB', 'PUBLIC', 'ORDERS', data, primary_key=['ID'])
+        yield local_session
+
+
+def test_full_record_query_hashes_only_matching_rows():
+    query, params = build_indexed_rows_query('DB', 'PUBLIC', 'ORDERS', [7], '"NOTES"', 'acme', {'ID': 1})
+
+    assert 'FROM "DB"."PUBLIC"."ORDERS"\n          WHERE SEARCH(("NOTES"), ?) AND "ID" = ?)' in query
+    assert 'WHERE ROW_KEY IN (7)' in query
+    assert params == ['acme', 1]
+
+
+def test_index_rows_query_without_search_binds_nothing():
+    query, params = build_indexed_rows_query('DB', 'PUBLIC', 'ORDERS', [7, 3, 7])
+
+    assert 'SEARCH' not in query and 'WHERE ROW_KEY IN (3, 7)' in query
+    assert params == []
+
+
+@pytest.mark.parametrize('key_values', [None, {'ID': 1}])
+def test_full_record_of_trimmed_row(session, key_values):
+    projection = build_projection([('NOTES', 'TEXT')], ['ID'], preview_chars=10)
+    query, params = build_search_query('DB', 'PUBLIC', 'ORDERS', '"NOTES"', 'acme', projection=projection)
+    trimmed = session.sql(query, params=params).to_pandas()
+    row_key = trimmed.loc[trimmed['ID'] == 1, 'ROW_KEY'].item()
+
+    query, params = build_indexed_rows_query('DB', 'PUBLIC', 'ORDERS', [row_key], '"NOTES"', 'acme', key_values)
+    [record] = session.sql(query, params=params).collect()
+
+    assert record['NOTES'] == 'acme ' + 'x' * 100
+    assert record['AMOUNT'] == 10
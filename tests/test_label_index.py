@@ -0,0 +1,38 @@
+from data_access import LabelIndex, column_label
+
+COLUMNS = [('SALES', 'ORDERS', 'NOTES', 'VARCHAR'), ('SALES', 'ORDERS', 'STATUS', 'TEXT'),
+           ('SALES', 'a.b', 'Straße', 'VARCHAR'), ('HR', 'PEOPLE', 'NOTES', 'VARIANT')]
+
+
+def test_labels_map_back_to_tuples():
+    index = LabelIndex(COLUMNS, column_label)
+
+    assert index.labels == [column_label(*column) for column in COLUMNS]
+    assert index.keys_for([index.labels[2], 'gone', index.labels[0]]) == [COLUMNS[2], COLUMNS[0]]
+    assert index.labels_for([COLUMNS[3], ('X', 'Y', 'Z', 'TEXT')]) == [index.labels[3]]
+    assert index.labels[1] in index and 'gone' not in index
+    assert len(index) == len(COLUMNS)
+
+
+def test_filter_matches_every_fragment_in_list_order():
+    index = LabelIndex(COLUMNS, column_label)
+
+    assert index.filter('notes') == [index.labels[0], index.labels[3]]
+    assert index.filter('NOTES sales') == [index.labels[0]]
+    assert index.filter('orders', limit=1) == [index.labels[0]]
+    assert index.filter('  ') == index.labels
+    assert index.filter('notes status') == []
+
+
+def test_filter_after_labels_that_change_length_when_casefolded():
+    index = LabelIndex(COLUMNS, column_label)
+
+    assert index.filter('strasse') == [index.labels[2]]
+    assert index.filter('people') == [index.labels[3]]
+
+
+def test_empty_index():
+    index = LabelIndex([], column_label)
+
+    assert index.filter('notes') == []
+    assert index.keys_for(['x']) == []
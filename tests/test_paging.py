@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from benchmarks.local_session import LocalSession
+from data_access import (
+    build_order_by, build_search_query, format_table_key, run_batched_search, to_results_page
+)
+
+ROWS = 53
+PAGE_SIZE = 10
+
+
+@pytest.fixture
+def session():
+    data = pd.DataFrame({
+        'ID': [row % 40 for row in range(ROWS)],  # declared key with duplicates, as Snowflake allows
+        'NOTES': [f"order {row} for acme" if row % 3 else f"order {row}" for row in range(ROWS)],
+    })
+    with LocalSession() as local_session:
+        local_session.add_table('DB', 'PUBLIC', 'ORDERS', data, primary_key=['ID'])
+        yield local_session
+
+
+def fetch_pages(session, order_by):
+    pages = []
+    page = 0
+    while True:
+        query, params = build_search_query('DB', 'PUBLIC', 'ORDERS', '"NOTES"', 'acme', limit=PAGE_SIZE + 1,
+                                           offset=page * PAGE_SIZE, order_by=order_by)
+        df = to_results_page(session.sql(query, params=params).to_pandas(), '"NOTES"', page, PAGE_SIZE,
+                             order_by=order_by)
+        pages.append(df)
+        if not df.attrs['has_more']:
+            return pages
+        page += 1
+
+
+def test_order_by_uses_primary_key_then_row_hash():
+    assert build_order_by() == 'HASH(*)'
+    assert build_order_by(['ID', 'line no']) == '"ID", "line no", HASH(*)'
+
+
+def test_search_query_orders_before_limit():
+    query, _ = build_search_query('DB', 'PUBLIC', 'ORDERS', '"NOTES"', 'acme', limit=11, offset=10,
+                                  order_by='"ID", HASH(*)')
+
+    assert query.rstrip().endswith('ORDER BY "ID", HASH(*)\nLIMIT 11 OFFSET 10')
+
+
+@pytest.mark.parametrize('key_columns', [(), ('ID',)])
+def test_pages_neither_repeat_nor_skip_rows(session, key_columns):
+    order_by = build_order_by(key_columns)
+    query, params = build_search_query('DB', 'PUBLIC', 'ORDERS', '"NOTES"', 'acme')
+    all_matches = session.sql(query, params=params).to_pandas()
+
+    pages = fetch_pages(session, order_by)
+
+    paged = pd.concat(pages, ignore_index=True)
+    assert len(paged) == len(all_matches)
+    assert sorted(paged['NOTES']) == sorted(all_matches['NOTES'])
+    assert [page.attrs['order_by'] for page in pages] == [order_by] * len(pages)
+
+
+def test_batched_first_page_matches_paged_order(session):
+    order_by = {format_table_key('PUBLIC', 'ORDERS'): build_order_by(['ID'])}
+
+    [(table_key, batched, _)] = list(run_batched_search(session, 'DB', 'acme', [('PUBLIC', 'ORDERS', '"NOTES"', None)],
+                                                         limit=PAGE_SIZE, order_by=order_by))
+
+    first_page = fetch_pages(session, order_by[table_key])[0]
+    assert batched['NOTES'].tolist() == first_page['NOTES'].tolist()
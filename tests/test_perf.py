@@ -0,0 +1,75 @@
+import io
+import json
+import logging
+
+import pandas as pd
+import pytest
+
+from benchmarks.local_session import LocalSession
+from data_access import PERF_LOG_HANDLER, PerfRecorder, collect_rows, perf_logger
+
+
+@pytest.fixture
+def perf_log():
+    """Point the handler installed by json_log=True at a buffer for the test"""
+    PerfRecorder(json_log=True)
+    [handler] = [handler for handler in perf_logger.handlers if handler.get_name() == PERF_LOG_HANDLER]
+    out = io.StringIO()
+    previous = handler.setStream(out)
+    yield out
+    handler.setStream(previous)
+
+
+def test_json_log_emits_one_line_per_span(perf_log):
+    recorder = PerfRecorder(json_log=True)
+
+    recorder.record('search.table', 0.25, table='PUBLIC.ORDERS', rows=3)
+
+    assert perf_logger.isEnabledFor(logging.INFO)
+    [line] = perf_log.getvalue().splitlines()
+    span = json.loads(line)
+    assert span.pop('at') > 0
+    assert span == {'stage': 'search.table', 'seconds': 0.25, 'table': 'PUBLIC.ORDERS', 'rows': 3}
+
+
+def test_spans_are_not_logged_without_json_log(perf_log):
+    recorder = PerfRecorder()
+
+    recorder.record('search.table', 0.25)
+
+    assert perf_log.getvalue() == ''
+    assert len(recorder.spans) == 1
+
+
+def test_enabling_json_log_later_logs_following_spans(perf_log):
+    recorder = PerfRecorder()
+    recorder.record('before', 0.1)
+
+    recorder.json_log = True
+    recorder.record('after', 0.1)
+
+    assert [json.loads(line)['stage'] for line in perf_log.getvalue().splitlines()] == ['after']
+
+
+def test_span_keeps_fields_set_inside_the_block():
+    recorder = PerfRecorder(max_spans=2)
+    for stage in ('a', 'b', 'c'):
+        with recorder.span(stage, table='T') as fields:
+            fields['rows'] = 5
+
+    assert [span['stage'] for span in recorder.spans] == ['b', 'c']
+    assert all(span['rows'] == 5 and span['table'] == 'T' and span['seconds'] >= 0 for span in recorder.spans)
+    summary = recorder.summary()
+    assert summary.loc['b', 'count'] == 1 and set(summary.index) == {'b', 'c'}
+
+
+def test_collect_rows_records_rows_and_query_id():
+    recorder = PerfRecorder()
+    with LocalSession() as session:
+        session.add_table('DB', 'PUBLIC', 'ORDERS', pd.DataFrame({'NOTES': ['a', 'b']}))
+
+        rows = collect_rows(session, 'SELECT * FROM "DB"."PUBLIC"."ORDERS"', recorder, 'metadata.query')
+
+    [span] = recorder.spans
+    assert len(rows) == 2
+    assert span['stage'] == 'metadata.query' and span['rows'] == 2 and span['query_id']
@@ -0,0 +1,128 @@
+import pandas as pd
+import pytest
+
+from benchmarks.local_session import LocalSession
+from data_access import (
+    build_search_index_refresh, build_search_plan, build_table_specs, index_search_columns, load_columns,
+    load_search_index_state, load_table_stats, refresh_search_index
+)
+
+INDEX_TABLE = 'DB.UTIL.SEARCH_INDEX'
+
+
+class FailingSession:
+    """Wraps a session, failing the first statement that starts with fail_on"""
+
+    def __init__(self, session, fail_on):
+        self._session = session
+        self._fail_on = fail_on
+
+    def sql(self, query, params=None):
+        if self._fail_on and query.lstrip().startswith(self._fail_on):
+            self._fail_on = None
+            raise RuntimeError('statement failed')
+        return self._session.sql(query, params)
+
+
+@pytest.fixture
+def session():
+    with LocalSession() as local_session:
+        local_session.add_table('DB', 'PUBLIC', 'ORDERS', pd.DataFrame({
+            'NOTES': ['acme order', 'other order', None],
+            'STATUS': ['open', 'closed', 'open'],
+            'AMOUNT': [1, 2, 3],
+        }))
+        yield local_session
+
+
+def refresh(session, columns=None):
+    columns = columns or load_columns(session, 'DB', [('PUBLIC', 'ORDERS')])
+    stats = load_table_stats(session, 'DB', [('PUBLIC', 'ORDERS')])
+    return list(refresh_search_index(session, INDEX_TABLE, 'DB', columns, stats, {}, force=True))
+
+
+def index_entries(session):
+    rows = session.sql(f"SELECT COLUMN_NAME, ROW_KEY, VALUE FROM {INDEX_TABLE}").collect()
+    return sorted((row['COLUMN_NAME'], row['VALUE'], row['ROW_KEY']) for row in rows)
+
+
+def test_refresh_scans_the_table_once_in_one_transaction():
+    statements = build_search_index_refresh(INDEX_TABLE, 'DB', 'PUBLIC', 'ORDERS',
+                                            [('NOTES', 'TEXT'), ('STATUS', 'TEXT')], '2024-01-01')
+
+    assert statements[0] == 'BEGIN' and statements[-1] == 'COMMIT'
+    merge = statements[1]
+    assert merge.lstrip().startswith(f"MERGE INTO {INDEX_TABLE}")
+    assert merge.count('HASH(*)') == 1
+    assert merge.count('FROM "DB"."PUBLIC"."ORDERS"') == 1
+
+
+def test_refresh_indexes_non_null_values(session):
+    [(_, outcome, _)] = refresh(session)
+
+    assert outcome == 'refreshed'
+    assert [(column, value) for column, value, _ in index_entries(session)] == [
+        ('NOTES', 'acme order'), ('NOTES', 'other order'), ('STATUS', 'closed'), ('STATUS', 'open'), ('STATUS', 'open'),
+    ]
+
+
+def test_refresh_rewrites_only_changed_rows_and_dropped_columns(session):
+    refresh(session)
+    before = index_entries(session)
+    session._connection().execute("UPDATE \"DB.PUBLIC.ORDERS\" SET NOTES = 'acme rush' WHERE AMOUNT = 1")
+    columns = [column for column in load_columns(session, 'DB', [('PUBLIC', 'ORDERS')]) if column[2] != 'STATUS']
+
+    refresh(session, columns)
+
+    after = index_entries(session)
+    assert [(column, value) for column, value, _ in after] == [('NOTES', 'acme rush'), ('NOTES', 'other order')]
+    assert after[1] == before[1]
+
+
+def test_failed_refresh_rolls_back_index_and_watermark(session):
+    refresh(session)
+    before = index_entries(session)
+    session._connection().execute("DELETE FROM \"DB.PUBLIC.ORDERS\" WHERE AMOUNT = 2")
+    state = load_search_index_state(session, INDEX_TABLE, 'DB')
+
+    [(_, outcome, _)] = list(refresh_search_index(
+        FailingSession(session, 'INSERT INTO'), INDEX_TABLE, 'DB', load_columns(session, 'DB', [('PUBLIC', 'ORDERS')]),
+        load_table_stats(session, 'DB', [('PUBLIC', 'ORDERS')]), state, force=True
+    ))
+
+    assert isinstance(outcome, RuntimeError)
+    assert index_entries(session) == before
+    assert load_search_index_state(session, INDEX_TABLE, 'DB') == state
+
+
+TABLE_COLUMNS = [('S', 'T', 'NAME', 'TEXT'), ('S', 'T', 'EMAIL', 'TEXT'), ('S', 'T', 'NOTES', 'VARIANT')]
+SELECTED = TABLE_COLUMNS[:2]
+
+
+def plan(force_wildcard=False, data_version='v1'):
+    specs = build_table_specs(SELECTED, force_wildcard)
+    return build_search_plan(specs, {'S.T': {'row_count': 10, 'bytes': 100, 'last_altered': data_version}})
+
+
+def watermark(*columns, last_altered='v1'):
+    return {'S.T': {'columns': frozenset(columns), 'last_altered': last_altered, 'indexed_at': 'x'}}
+
+
+def test_index_answers_selected_columns_when_current():
+    assert index_search_columns(plan(), SELECTED, watermark('NAME', 'EMAIL')) == {'S.T': ['NAME', 'EMAIL']}
+
+
+def test_index_skips_stale_or_incomplete_tables():
+    assert index_search_columns(plan(), SELECTED, watermark('NAME')) == {}
+    assert index_search_columns(plan(), SELECTED, watermark('NAME', 'EMAIL', last_altered='v0')) == {}
+    assert index_search_columns(plan(data_version=None), SELECTED, watermark('NAME', 'EMAIL')) == {}
+
+
+def test_wildcard_search_needs_every_searchable_column_indexed():
+    wildcard_plan = plan(force_wildcard=True)
+
+    assert index_search_columns(wildcard_plan, SELECTED, watermark('NAME', 'EMAIL'), TABLE_COLUMNS) == {}
+    assert index_search_columns(wildcard_plan, SELECTED, watermark('NAME', 'EMAIL', 'NOTES')) == {}
+    assert index_search_columns(wildcard_plan, SELECTED, watermark('NAME', 'EMAIL', 'NOTES'), TABLE_COLUMNS) == {
+        'S.T': ['NAME', 'EMAIL', 'NOTES']
+    }
@@ -0,0 +1,38 @@
+from data_access import build_search_plan, build_table_specs, search_optimization_coverage
+
+TABLE_COLUMNS = [('S', 'T', 'NAME', 'TEXT'), ('S', 'T', 'EMAIL', 'TEXT'), ('S', 'T', 'NOTES', 'VARIANT')]
+SELECTED = TABLE_COLUMNS[:2]
+NAME_EMAIL_INDEXED = {'S.T': {'enabled': True, 'full_text_columns': {'NAME', 'EMAIL'}}}
+
+
+def test_selected_columns_covered():
+    specs = build_table_specs(SELECTED)
+
+    assert search_optimization_coverage(SELECTED, NAME_EMAIL_INDEXED, specs) == {'S.T': 'full'}
+
+
+def test_wildcard_search_needs_every_searchable_column_covered():
+    specs = build_table_specs(SELECTED, force_wildcard=True)
+
+    assert search_optimization_coverage(SELECTED, NAME_EMAIL_INDEXED, specs, TABLE_COLUMNS) == {'S.T': 'partial'}
+    assert search_optimization_coverage(SELECTED, NAME_EMAIL_INDEXED, specs) == {'S.T': 'partial'}
+
+
+def test_wildcard_search_covered_by_star_or_all_columns():
+    specs = build_table_specs(SELECTED, force_wildcard=True)
+    star_indexed = {'S.T': {'enabled': True, 'full_text_columns': {'*'}}}
+    all_indexed = {'S.T': {'enabled': True, 'full_text_columns': {'NAME', 'EMAIL', 'NOTES'}}}
+
+    assert search_optimization_coverage(SELECTED, star_indexed, specs) == {'S.T': 'full'}
+    assert search_optimization_coverage(SELECTED, all_indexed, specs, TABLE_COLUMNS) == {'S.T': 'full'}
+
+
+def test_partially_covered_wildcard_table_stays_under_scan_budget():
+    specs = build_table_specs(SELECTED, force_wildcard=True)
+    coverage = search_optimization_coverage(SELECTED, NAME_EMAIL_INDEXED, specs, TABLE_COLUMNS)
+
+    [entry] = build_search_plan(specs, {'S.T': {'bytes': 10_000, 'row_count': 100, 'last_altered': None}},
+                                byte_budget=1_000, search_optimization=coverage)
+
+    assert entry['search_optimization'] == 'partial'
+    assert entry['skip_reason'] == 'over scan budget'
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from benchmarks.local_session import LocalSession
+from data_access import parse_search_terms, read_term_file, run_term_search, unique_search_terms
+
+
+def test_pasted_terms_split_on_lines_and_separators():
+    assert parse_search_terms('acme\nBOB, id-17; x\t"quoted"\n\nAcme') == ['acme', 'BOB', 'id-17', 'x', 'quoted']
+
+
+def test_unique_terms_keep_first_spelling_in_order():
+    assert unique_search_terms(['Acme', ' bob ', '', 'ACME', '"x"']) == ['Acme', 'bob', 'x']
+
+
+def test_term_file_keeps_quoted_commas():
+    labels, rows = read_term_file('name,id\n"Smith, John",1\n"Doe, Jane",2\n', header=True)
+
+    assert labels == ['name', 'id']
+    assert [row[0] for row in rows] == ['Smith, John', 'Doe, Jane']
+
+
+def test_term_file_without_delimiter_is_one_term_per_line():
+    labels, rows = read_term_file('acme corp\n\nid-17\n')
+
+    assert labels == ['Column 1']
+    assert rows == [['acme corp'], ['id-17']]
+
+
+@pytest.mark.parametrize('delimiter', [';', '\t'])
+def test_term_file_sniffs_delimiter(delimiter):
+    labels, rows = read_term_file(f"acme{delimiter}1\nbob{delimiter}2\n")
+
+    assert labels == ['Column 1', 'Column 2']
+    assert rows == [['acme', '1'], ['bob', '2']]
+
+
+def test_term_file_labels_cover_ragged_rows_and_blank_headers():
+    labels, rows = read_term_file('term,\nacme,x,extra\n', header=True)
+
+    assert labels == ['term', 'Column 2', 'Column 3']
+    assert rows == [['acme', 'x', 'extra']]
+
+
+def search_terms(terms):
+    data = pd.DataFrame({'NOTES': ['order 12 for acme', 'order 1234', 'acme 1234', None]})
+    with LocalSession() as session:
+        session.add_table('DB', 'PUBLIC', 'ORDERS', data)
+        [(_, (term_counts, rows), _)] = list(run_term_search(session, 'DB', terms,
+                                                             {('PUBLIC', 'ORDERS'): [('NOTES', 'TEXT')]}))
+    return term_counts, rows
+
+
+def test_term_matches_substrings_ignoring_case():
+    term_counts, rows = search_terms(['12', 'ACME'])
+
+    assert term_counts == {'12': 3, 'ACME': 2}
+    assert sorted(rows['NOTES']) == ['acme 1234', 'order 12 for acme', 'order 1234']
+
+
+@pytest.mark.parametrize('other_terms', [['acme'], ['zzz'], ['1234', 'order']])
+def test_term_counts_do_not_depend_on_other_terms(other_terms):
+    alone, _ = search_terms(['12'])
+    batched, _ = search_terms(['12'] + other_terms)
+
+    assert alone == {'12': 3}
+    assert batched['12'] == alone['12']